@@ -0,0 +1,145 @@
+"""
+Bot Logging
+Structured, buffered logging for the per-item messages on the filter path
+(filtered, skipped, deferred, candidate, shed), so that on busy subreddits stdout
+costs a bounded amount instead of a write per item.
+
+    log = bot_logging.get_logger("english")
+    log.info("🚫 Filtered out - %s: %s...", reason, text[:100], extra={'event': 'filtered', 'reason': reason})
+    bot_logging.configure("english", level="INFO", json_lines=False, event_rate=1.0, event_burst=10)
+
+* Messages with an `event` are rate limited per event: a token bucket allows
+  event_burst messages at once and event_rate per second after that. The
+  next message let through says how many were suppressed, and
+  log_messages_suppressed_total{event} counts them. Messages without an
+  event (startup, errors) always get through.
+* Suppressed messages are dropped on the logger, before %-formatting. Those
+  let through are queued as they are, and a listener thread formats and
+  writes them. If the queue is full the message is dropped and counted in
+  log_messages_dropped_total, so a slow terminal or pipe never stalls the
+  filters.
+* json_lines=True writes one JSON object per line (ts, level, logger, event,
+  message and any extra fields) for log shippers; otherwise just the message,
+  as the prints were.
+
+Until configure() runs (replays, tests, scripts importing a bot) the loggers
+have no handlers, and INFO messages go nowhere.
+"""
+
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+import metrics
+
+suppressed = metrics.counter("log_messages_suppressed_total", "Log messages dropped by the per-event rate limit", ["event"])
+dropped = metrics.counter("log_messages_dropped_total", "Log messages dropped because the log writer fell behind")
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {'message', 'asctime', 'event'}
+_listeners = {}
+
+
+def get_logger(name):
+    return logging.getLogger(f"bot.{name}")
+
+
+class EventRateLimit(logging.Filter):
+    """Token bucket per record `event`; records without one pass untouched"""
+
+    def __init__(self, rate=1.0, burst=10, clock=time.monotonic):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._buckets = {}  # event -> [tokens, last refill, suppressed since last pass]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        event = getattr(record, 'event', None)
+        if event is None:
+            return True
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.setdefault(event, [float(self.burst), now, 0])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                suppressed.labels(event=event).inc()
+                return False
+            bucket[0] -= 1
+            record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        return record  # Formatted by the listener thread, not the caller
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped.inc()
+
+
+class _PlainFormatter(logging.Formatter):
+    def format(self, record):
+        message = record.getMessage()
+        if getattr(record, 'suppressed', 0):
+            message += f" (+{record.suppressed} similar suppressed)"
+        return message
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _stop_listener(name):
+    """Write out whatever is still queued and stop the writer thread"""
+    listener = _listeners.pop(name, None)
+    if listener is None:
+        return
+    try:
+        listener.stop()
+    except queue.Full:
+        pass  # Already hopelessly behind; the daemon thread dies with the process
+
+
+def configure(name, level="INFO", json_lines=False, event_rate=1.0, event_burst=10, max_queue=10000, stream=None):
+    """Route the bot's logger through a rate limit and a bounded queue to a writer thread"""
+    logger = get_logger(name)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    for log_filter in list(logger.filters):
+        logger.removeFilter(log_filter)
+    _stop_listener(name)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonLinesFormatter() if json_lines else _PlainFormatter())
+    records = queue.Queue(maxsize=max_queue)
+    listener = logging.handlers.QueueListener(records, output)
+    listener.start()
+    if not _listeners:
+        atexit.register(lambda: [_stop_listener(name) for name in list(_listeners)])
+    _listeners[name] = listener
+
+    if event_rate > 0:
+        logger.addFilter(EventRateLimit(event_rate, event_burst))
+    logger.addHandler(_NonBlockingQueueHandler(records))
+    return logger
@@ -0,0 +1,65 @@
+"""
+Broker
+Connects the roles of a distributed bot (BOT_ROLE). One ingest process runs
+the Reddit streams and publishes every new item to the broker; any number of
+worker processes lease items from it, run process_content and acknowledge
+them. BOT_ROLE=all keeps both in one process, as before.
+
+Brokers are chosen by URL scheme. The built-in sqlite:///queue.db broker
+(sqlite:////abs/path.db for an absolute path) is a DurableWorkQueue shared by
+every process on the host. Its leases expire, so an item held by a crashed
+worker goes to another one, and delivery is at-least-once. Since an item can
+be processed twice, and two workers can see the same user at once, leads are
+claimed in the broker before they are written (claim_lead) so each user is
+reported once.
+
+Another backend, e.g. for workers on several machines, registers a factory
+with register(scheme, factory). The factory takes the rest of the URL and
+options and returns an object with DurableWorkQueue's interface (put, get,
+get_nowait, task_done, release, qsize, mark_stage, pending_fullnames,
+pending_items, claim_lead), handing out items with a higher content.priority
+first.
+"""
+
+from contextlib import contextmanager
+import work_queue
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BROKERS = {}
+
+
+def register(scheme, factory):
+    BROKERS[scheme] = factory
+
+
+def connect(url, **options):
+    scheme, separator, rest = url.partition("://")
+    if not separator or scheme not in BROKERS:
+        raise ValueError(f"Unknown broker URL {url!r} (supported: {', '.join(sorted(BROKERS))})")
+    return BROKERS[scheme](rest, **options)
+
+
+def _sqlite_broker(path, reclaim=False, **options):
+    # sqlite:///queue.db is relative, sqlite:////var/lib/bot/queue.db absolute
+    return work_queue.DurableWorkQueue(path[1:] if path.startswith('/') else path, reclaim=reclaim, **options)
+
+
+register("sqlite", _sqlite_broker)
+
+
+@contextmanager
+def file_lock(name):
+    """Exclusive lock on <name>.lock shared by every process on the host (no-op without fcntl)"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{name}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,181 @@
+"""
+Ingestion Checkpoints
+Persists the last processed submission and comment fullname per subreddit so
+a restarted bot can backfill what it missed instead of skipping everything
+posted while it was down.
+
+On startup each stream first walks the subreddit's newest-first listing
+(paginated by praw, 100 items per request) until it reaches the checkpoint,
+then switches to the live stream. Items seen by both, or processed before a
+crash, are dropped by claim(): in-flight IDs are held in memory and processed
+IDs in a rotating Bloom filter (seen_ids.py) snapshotted next to the
+checkpoint as <name>_seen.npz.
+
+Items are processed by priority, and stale ones can be deferred behind the
+backlog, so they don't finish in the order they were posted. A subreddit's
+position is a low-water mark: it only moves up to the newest finished item
+that is older than every item still queued (registered with enqueued()), so
+backfill after a crash goes back far enough to pick up those queued items.
+
+File format:
+    {"version": 1,
+     "post": {"englishlearning": {"fullname": "t3_abc123", "created_utc": 1736935800.0}},
+     "comment": {...}}
+"""
+
+import os
+import json
+import time
+import heapq
+import atexit
+import threading
+from collections import OrderedDict
+import metrics
+import seen_ids
+
+CHECKPOINT_VERSION = 1
+CONTENT_TYPES = ('post', 'comment')
+
+duplicates_dropped = metrics.counter("ingest_duplicates_total", "Items dropped at ingestion as already queued or processed", ["source"])
+
+
+class IngestionCheckpoint:
+    """Last processed fullname per (content type, subreddit) plus processed IDs"""
+
+    def __init__(self, path, recent_ids=5000, save_interval=30.0, seen_capacity=200000, seen_error_rate=0.001):
+        self.path = path
+        self.seen_path = f"{os.path.splitext(path)[0]}_seen.npz"
+        self.recent_ids = recent_ids
+        self.save_interval = save_interval
+        self.positions = {content_type: {} for content_type in CONTENT_TYPES}
+        self.seen = seen_ids.RotatingBloomFilter.load(self.seen_path, seen_capacity, seen_error_rate)
+        self._claimed = OrderedDict()  # Queued this run, possibly not processed yet
+        self._pending = {}   # (content type, subreddit) -> {fullname: created_utc} queued, not finished
+        self._finished = {}  # (content type, subreddit) -> heap of (created_utc, fullname) above the position
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self.load()
+        atexit.register(self.save)
+
+    # ---- persistence ----
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Could not read checkpoint {self.path}, starting fresh: {e}")
+            return
+        if data.get('version') != CHECKPOINT_VERSION:
+            return
+        for content_type in CONTENT_TYPES:
+            self.positions[content_type] = data.get(content_type, {})
+        for fullname in data.get('recent', []):  # Checkpoints written before the Bloom filter
+            self.seen.add(fullname)
+
+    def save(self):
+        """Atomically write the checkpoint file if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'version': CHECKPOINT_VERSION}
+            for content_type in CONTENT_TYPES:
+                data[content_type] = dict(self.positions[content_type])
+            seen = self.seen.copy()  # add() runs under the lock; writing a live filter could tear a generation
+            self._dirty = False
+            self._last_save = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            seen.save(self.seen_path)
+        except OSError as e:
+            print(f"⚠️ Error saving checkpoint: {e}")
+
+    def has_position(self, content_type):
+        return bool(self.positions[content_type])
+
+    # ---- ingestion ----
+    @staticmethod
+    def _remember(ids, fullname, limit):
+        ids[fullname] = None
+        ids.move_to_end(fullname)
+        while len(ids) > limit:
+            ids.popitem(last=False)
+
+    def claim(self, fullname):
+        """Return False if the item was already queued or processed"""
+        with self._lock:
+            if fullname in self._claimed:
+                duplicates_dropped.labels(source='in_flight').inc()
+                return False
+            if fullname in self.seen:
+                duplicates_dropped.labels(source='processed').inc()
+                return False
+            self._remember(self._claimed, fullname, self.recent_ids)
+            return True
+
+    def enqueued(self, content_type, content):
+        """Hold the subreddit's position below an item until it is processed"""
+        key = content.subreddit.display_name.lower()
+        with self._lock:
+            self._pending.setdefault((content_type, key), {})[content.fullname] = content.created_utc
+
+    def mark_processed(self, content_type, content):
+        """Advance the subreddit's checkpoint as far as no queued item is left behind it"""
+        key = content.subreddit.display_name.lower()
+        with self._lock:
+            pending = self._pending.get((content_type, key), {})
+            pending.pop(content.fullname, None)
+            finished = self._finished.setdefault((content_type, key), [])
+            heapq.heappush(finished, (content.created_utc, content.fullname))
+            # Items finish out of order (priority, deferral, backfill vs. stream); stop below the oldest one queued
+            oldest_pending = min(pending.values(), default=float('inf'))
+            position = self.positions[content_type].get(key)
+            while finished and finished[0][0] < oldest_pending:
+                created_utc, fullname = heapq.heappop(finished)
+                if position is None or created_utc >= position['created_utc']:
+                    position = {'fullname': fullname, 'created_utc': created_utc}
+            if position is not None:
+                self.positions[content_type][key] = position
+            self.seen.add(content.fullname)
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= self.save_interval
+        if due:
+            self.save()
+
+    def adopt_position(self, content_type, subreddit, position):
+        """Take over another instance's position for a subreddit if it is newer than ours"""
+        key = subreddit.lower()
+        with self._lock:
+            current = self.positions[content_type].get(key)
+            if current is None or position['created_utc'] > current['created_utc']:
+                self.positions[content_type][key] = dict(position)
+                self._dirty = True
+
+    def backfill(self, reddit, subreddits, content_type, max_items=1000):
+        """
+        Yield items posted since the checkpoint, oldest first, for every
+        subreddit that has one. Stops paginating a subreddit at its
+        checkpointed item, or at the first older item if it was deleted.
+        """
+        for name in subreddits:
+            position = self.positions[content_type].get(name.lower())
+            if position is None:
+                continue
+            subreddit = reddit.subreddit(name)
+            listing = subreddit.new(limit=max_items) if content_type == 'post' else subreddit.comments(limit=max_items)
+            missed = []
+            try:
+                for item in listing:
+                    if item.fullname == position['fullname'] or item.created_utc < position['created_utc']:
+                        break
+                    missed.append(item)
+            except Exception as e:
+                print(f"⚠️ Error backfilling {content_type}s from r/{name}: {e}")
+            if missed:
+                print(f"⏪ Backfilling {len(missed)} {content_type}s from r/{name}")
+            yield from reversed(missed)
@@ -0,0 +1,106 @@
+"""
+Circuit Breaker
+Guards calls to an external service (Cohere embed and chat). The outcomes of
+the last `window` calls are tracked; once at least `min_calls` have been made
+and the failure rate reaches `failure_rate` the circuit opens, and calls fail
+immediately with CircuitOpenError instead of each waiting out a request to a
+service that is down. After `reset_timeout` seconds a single probe call is let
+through (half-open): success closes the circuit, failure opens it again.
+
+Metrics (labelled by circuit name):
+    circuit_state{circuit}            0 closed, 1 half-open, 2 open
+    circuit_opened_total{circuit}     times the circuit tripped
+    circuit_rejected_total{circuit}   calls failed fast while open
+"""
+
+import time
+import threading
+from collections import deque
+import metrics
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+circuit_state = metrics.gauge("circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ["circuit"])
+circuit_opened = metrics.counter("circuit_opened_total", "Times a circuit breaker tripped open", ["circuit"])
+circuit_rejected = metrics.counter("circuit_rejected_total", "Calls failed fast because the circuit was open", ["circuit"])
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_rate=0.5, window=20, min_calls=5, reset_timeout=60.0, clock=time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._failures = deque(maxlen=window)  # True per failed call, False per success
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        circuit_state.labels(circuit=name).set(STATE_VALUES[CLOSED])
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def available(self):
+        """True if a call made now would reach the service"""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and not self._probing)
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs) through the breaker; raises CircuitOpenError while open"""
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN or (state == HALF_OPEN and self._probing):
+                circuit_rejected.labels(circuit=self.name).inc()
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            probe = state == HALF_OPEN
+            self._probing = self._probing or probe
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._record(False, probe)
+            raise
+        self._record(True, probe)
+        return result
+
+    def _current_state(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def _record(self, success, probe):
+        with self._lock:
+            if probe:
+                self._probing = False
+                if success:
+                    self._failures.clear()
+                    self._set_state(CLOSED)
+                    print(f"✅ {self.name} circuit closed - service recovered")
+                else:
+                    self._trip()
+                return
+            if self._state != CLOSED:
+                return  # Calls started before the circuit opened don't count
+            self._failures.append(not success)
+            if len(self._failures) >= self.min_calls and sum(self._failures) / len(self._failures) >= self.failure_rate:
+                self._trip()
+
+    def _trip(self):
+        self._opened_at = self.clock()
+        self._failures.clear()
+        self._set_state(OPEN)
+        circuit_opened.labels(circuit=self.name).inc()
+        print(f"🔌 {self.name} circuit open - failing fast for {self.reset_timeout:.0f}s")
+
+    def _set_state(self, state):
+        self._state = state
+        circuit_state.labels(circuit=self.name).set(STATE_VALUES[state])
@@ -0,0 +1,233 @@
+"""
+Corpus
+Recorded Reddit posts and comments stored as JSON lines (optionally gzipped),
+plus lightweight stand-ins for praw Submission/Comment objects built from
+those records, so the bots' real process_content() can run without Reddit.
+
+Record format (one JSON object per line):
+    {"id": "abc123", "type": "post", "subreddit": "EnglishLearning",
+     "author": "learner123", "title": "...", "selftext": "...", "url": "...",
+     "score": 3, "created_utc": 1736935800.0, "permalink": "/r/..."}
+Comments carry "body" instead of "title"/"selftext"/"url". Hand-labelled
+records may add "label": true/false (is this a lead?), which replay.py scores
+recall and precision against.
+"""
+
+import os
+import gzip
+import json
+import queue
+import atexit
+import random
+import threading
+from datetime import datetime
+
+
+def record_from_content(content, content_type):
+    """Extract the fields the filter pipeline reads from a praw item"""
+    author = content.author
+    record = {
+        'id': content.id,
+        'type': content_type,
+        'subreddit': content.subreddit.display_name,
+        'author': str(author) if author is not None else None,
+        'score': content.score,
+        'created_utc': content.created_utc,
+        'permalink': content.permalink,
+    }
+    if content_type == 'post':
+        record.update({
+            'title': content.title,
+            'selftext': content.selftext,
+            'url': getattr(content, 'url', None),
+        })
+    else:
+        record['body'] = content.body
+    return record
+
+
+# ==== PRAW STAND-INS ====
+class StubRedditor:
+    """Compares like praw's Redditor: case-insensitively by name"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"StubRedditor(name={self.name!r})"
+
+    def __eq__(self, other):
+        return str(self).lower() == str(other).lower()
+
+    def __hash__(self):
+        return hash(self.name.lower())
+
+
+class StubSubreddit:
+    def __init__(self, display_name):
+        self.display_name = display_name
+
+    def __str__(self):
+        return self.display_name
+
+
+class _StubContent:
+    kind = None
+
+    def __init__(self, record):
+        self.id = record.get('id', '')
+        self.author = StubRedditor(record['author']) if record.get('author') else None
+        self.subreddit = StubSubreddit(record.get('subreddit', ''))
+        self.score = record.get('score', 0)
+        self.created_utc = record.get('created_utc', 0.0)
+        self.permalink = record.get('permalink', '')
+
+    @property
+    def fullname(self):
+        return f"{self.kind}_{self.id}"
+
+    def reply(self, body):
+        raise RuntimeError("Recorded items cannot be replied to")
+
+
+class StubSubmission(_StubContent):
+    kind = 't3'
+
+    def __init__(self, record):
+        super().__init__(record)
+        self.title = record.get('title', '')
+        self.selftext = record.get('selftext', '')
+        self.url = record.get('url')
+
+
+class StubComment(_StubContent):
+    kind = 't1'
+
+    def __init__(self, record):
+        super().__init__(record)
+        self.body = record.get('body', '')
+
+
+def stub_from_record(record):
+    """Return (content_type, stub) for one corpus record"""
+    if record.get('type') == 'post':
+        return 'post', StubSubmission(record)
+    return 'comment', StubComment(record)
+
+
+# ==== FILE I/O ====
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def read_corpus(path):
+    """
+    Yield records from a .jsonl or .jsonl.gz corpus file. A gzip file that
+    was still being recorded (no trailer yet) is read up to its last flush.
+    """
+    with _open(path, 'r') as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        return  # Partially flushed last line
+        except EOFError:
+            return
+
+
+def write_corpus(path, records):
+    """Write records to a .jsonl or .jsonl.gz corpus file"""
+    with _open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+# ==== RECORDING ====
+class CorpusRecorder:
+    """
+    Captures streamed items into rotating gzip JSONL files for replay.py.
+    record() only samples, extracts fields and enqueues, so the stream
+    threads never wait on compression or disk; a background thread does the
+    writing. If the writer falls behind, records are dropped (and counted)
+    rather than slowing ingestion.
+    """
+
+    def __init__(self, directory="corpus", prefix="corpus", sample_rate=1.0,
+                 rotate_bytes=64 * 1024 * 1024, flush_interval=5.0, max_pending=10000):
+        self.directory = directory
+        self.prefix = prefix
+        self.sample_rate = sample_rate
+        self.rotate_bytes = rotate_bytes
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self.dropped = 0
+        self.files_written = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._file = None
+        self._file_day = None
+        self._file_bytes = 0
+        self._closed = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="corpus-recorder", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, content, content_type):
+        """Sample and enqueue one praw item; never blocks"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait(record_from_content(content, content_type))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.dropped += 1  # Item without the expected attributes
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        now = datetime.now()
+        path = os.path.join(self.directory, f"{self.prefix}-{now.strftime('%Y%m%d-%H%M%S')}.jsonl.gz")
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._file_day = now.date()
+        self._file_bytes = 0
+        self.files_written += 1
+
+    def _write(self, record):
+        if self._file is None or self._file_bytes >= self.rotate_bytes or datetime.now().date() != self._file_day:
+            self._rotate()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self._file.write(line)
+        self._file_bytes += len(line)
+        self.recorded += 1
+
+    def _run(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._file is not None:
+                    self._file.flush()  # Make what we have readable by replay.py
+                continue
+            try:
+                self._write(record)
+            except Exception as e:
+                print(f"⚠️ Error recording corpus item: {e}")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """Write out pending records and close the current file"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join(timeout=10)
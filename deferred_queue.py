@@ -0,0 +1,146 @@
+"""
+Deferred Queue
+Items parked while Cohere is unavailable (degraded mode), so an outage delays
+them instead of dropping them or letting them through unverified. Only the
+fullname, content type and the stage that could not run are kept; when the
+service recovers the items are fetched again from Reddit and go through
+process_content like any other item.
+
+On disk this is an append-only log of JSON lines, {"op": "defer", ...} and
+{"op": "done", "fullname": ...}, rewritten with only the pending entries when
+it grows past compact_ratio lines per entry. An item stays in the log until
+it is resolved, so items that were being retried when the bot stopped are
+retried again on the next start.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+import metrics
+
+deferred_items = metrics.counter("deferred_items_total", "Items parked while a service was unavailable", ["stage"])
+deferred_given_up = metrics.counter("deferred_given_up_total", "Deferred items dropped after too many attempts")
+
+
+class DeferredQueue:
+    def __init__(self, path=None, max_attempts=5, compact_ratio=2.0, min_compact_lines=1000, clock=time.time):
+        self.path = path  # None = memory only (replays, tests)
+        self.max_attempts = max_attempts
+        self.compact_ratio = compact_ratio
+        self.min_compact_lines = min_compact_lines
+        self.clock = clock
+        self._pending = OrderedDict()  # fullname -> entry, oldest first
+        self._in_flight = set()        # taken for a retry, not yet resolved
+        self._log_lines = 0
+        self._log = None
+        self._lock = threading.RLock()
+        if path:
+            self._load()
+            self.compact()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, fullname):
+        return fullname in self._pending
+
+    def waiting(self):
+        """Entries not currently being retried"""
+        with self._lock:
+            return len(self._pending) - len(self._in_flight)
+
+    def defer(self, fullname, content_type, stage):
+        """Park an item; returns False if it has used up its attempts and was dropped"""
+        with self._lock:
+            previous = self._pending.get(fullname)
+            attempts = previous['attempts'] + 1 if previous else 1
+            self._in_flight.discard(fullname)
+            if attempts > self.max_attempts:
+                print(f"⚠️ Giving up on {fullname} after {self.max_attempts} deferred attempts")
+                deferred_given_up.inc()
+                self._resolve(fullname)
+                return False
+            entry = {
+                'fullname': fullname,
+                'content_type': content_type,
+                'stage': stage,
+                'attempts': attempts,
+                'deferred_at': previous['deferred_at'] if previous else self.clock(),
+            }
+            self._pending[fullname] = entry
+            self._pending.move_to_end(fullname)
+            self._append({'op': 'defer', **entry})
+        deferred_items.labels(stage=stage).inc()
+        return True
+
+    def take(self, limit=100):
+        """Oldest entries not already being retried, marked as in flight"""
+        with self._lock:
+            entries = []
+            for fullname, entry in self._pending.items():
+                if len(entries) >= limit:
+                    break
+                if fullname not in self._in_flight:
+                    self._in_flight.add(fullname)
+                    entries.append(dict(entry))
+            return entries
+
+    def release(self, fullname):
+        """Return a taken entry to the waiting set without counting an attempt"""
+        with self._lock:
+            self._in_flight.discard(fullname)
+
+    def resolve(self, fullname):
+        """The item was processed (or no longer exists); a no-op for items that were never deferred"""
+        if fullname not in self._pending:
+            return
+        with self._lock:
+            if fullname in self._in_flight:
+                self._resolve(fullname)
+
+    def _resolve(self, fullname):
+        self._in_flight.discard(fullname)
+        if self._pending.pop(fullname, None) is not None:
+            self._append({'op': 'done', 'fullname': fullname})
+
+    def _append(self, record):
+        if not self.path:
+            return
+        self._log.write(json.dumps(record) + "\n")
+        self._log.flush()
+        self._log_lines += 1
+        if self._log_lines > max(self.min_compact_lines, self.compact_ratio * len(self._pending)):
+            self.compact()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn last line after a crash
+                fullname = record.pop('fullname')
+                if record.pop('op') == 'done':
+                    self._pending.pop(fullname, None)
+                else:
+                    self._pending[fullname] = {'fullname': fullname, **record}
+                    self._pending.move_to_end(fullname)
+
+    def compact(self):
+        """Rewrite the log with only pending entries"""
+        if not self.path:
+            return
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in self._pending.values():
+                    f.write(json.dumps({'op': 'defer', **entry}) + "\n")
+            os.replace(tmp_path, self.path)
+            self._log = open(self.path, 'a', encoding='utf-8')
+            self._log_lines = len(self._pending)
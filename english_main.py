@@ -2,37 +2,134 @@ import os
 import praw
 import re
 import time
-import json
-import gc
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
 import numpy as np
 import cohere
+import topic_embeddings
+import metrics
+import profiling
+import corpus
+import checkpoints
+import stream_supervisor
+import sharding
+import interaction_tracker
+import lead_registry
+import memory_governor
+import similarity_thresholds as similarity_thresholds_config
+import prescreen
+import keyword_gates
+import circuit_breaker
+import deferred_queue
+import work_queue as work_queue_store
+import broker
+import partitioning
+import text_prep
+import llm_stream
+import sink
+import bot_logging
+import freshness
+import scheduling
+import verdict_log
 
 # Load environment variables from .env file
 load_dotenv()
 
 # ==== GLOBAL COUNTER ====
-processed_count = 0
 milestones = [10, 100, 1000]  # Base 10 exponential until 1000
 next_milestone_index = 0
 
-# Detailed counters
-posts_processed = 0
-comments_processed = 0
-filtered_no_practice_keywords_count = 0
-filtered_negative_keywords_count = 0
-filtered_no_seeking_language_count = 0
-filtered_low_similarity_count = 0
-filtered_llm_failed_count = 0
-leads_found_count = 0
-replies_sent_count = 0
-dms_sent_count = 0
-errors_processing_count = 0
-errors_responding_count = 0
+# ==== METRICS ====
+# Served in Prometheus format on METRICS_PORT (0 = disabled) and written to
+# METRICS_SNAPSHOT_FILE every METRICS_SNAPSHOT_INTERVAL seconds
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_SNAPSHOT_FILE = os.environ.get("METRICS_SNAPSHOT_FILE", "english_metrics.json")
+METRICS_SNAPSHOT_INTERVAL = int(os.environ.get("METRICS_SNAPSHOT_INTERVAL", "60"))
+
+# Opt-in profiler toggled with `kill -USR1 <pid>` ("sample" or "cprofile"; empty = off)
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "")
+PROFILE_ON_START = os.environ.get("PROFILE_ON_START", "") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+# Capture streamed items into a replayable corpus (see replay.py); empty = off
+RECORD_CORPUS_DIR = os.environ.get("RECORD_CORPUS_DIR", "")
+RECORD_SAMPLE_RATE = float(os.environ.get("RECORD_SAMPLE_RATE", "1.0"))
+RECORD_ROTATE_MB = int(os.environ.get("RECORD_ROTATE_MB", "64"))
+
+# Last processed post/comment per subreddit, used to backfill after a restart
+CHECKPOINT_FILE = os.environ.get("CHECKPOINT_FILE", "english_checkpoint.json")
+BACKFILL_MAX_ITEMS = int(os.environ.get("BACKFILL_MAX_ITEMS", "1000"))  # Reddit listings stop at ~1000
+# Streams that deliver nothing for this long are rebuilt
+STREAM_STALE_SECONDS = int(os.environ.get("STREAM_STALE_SECONDS", "900"))
+# Poll activity-balanced groups of subreddits instead of one multireddit stream
+SHARDED_INGESTION = os.environ.get("SHARDED_INGESTION", "") == "1"
+MAX_SHARDS = int(os.environ.get("MAX_SHARDS", "8"))
+# Memory budget in MB: above it caches are evicted and one full GC runs (0 = monitor only)
+MEMORY_BUDGET_MB = int(os.environ.get("MEMORY_BUDGET_MB", "0"))
+# Calibrated similarity thresholds (python similarity_thresholds.py); missing file = fixed threshold
+SIMILARITY_THRESHOLDS_FILE = os.environ.get("SIMILARITY_THRESHOLDS_FILE", "english_similarity_thresholds.json")
+BASE_SIMILARITY_THRESHOLD = 0.5  # Fixed threshold, used where no calibrated one applies
+# Share of items between the fixed and a calibrated threshold still sent to the LLM and logged, so calibration can lower it again
+SIMILARITY_EXPLORE_RATE = float(os.environ.get("SIMILARITY_EXPLORE_RATE", "0.05"))
+# Local classifier deciding confident items before the LLM (python prescreen.py); missing file = always ask the LLM
+PRESCREEN_MODEL_FILE = os.environ.get("PRESCREEN_MODEL_FILE", "english_prescreen.npz")
+# Share of local pre-screen accepts and rejects still sent to the LLM and logged, so retraining sees them
+PRESCREEN_EXPLORE_RATE = float(os.environ.get("PRESCREEN_EXPLORE_RATE", "0.02"))
+# Every LLM verdict with the embedding it was decided on (<bot>_llm_verdicts_*.jsonl), for prescreen.py and similarity_thresholds.py
+LLM_VERDICT_LOG = os.environ.get("LLM_VERDICT_LOG", "1") == "1"
+# Cohere outages: per-request timeout, then candidates are parked here and retried once calls succeed again
+COHERE_TIMEOUT_SECONDS = float(os.environ.get("COHERE_TIMEOUT_SECONDS", "30"))
+DEFERRED_QUEUE_FILE = os.environ.get("DEFERRED_QUEUE_FILE", "english_deferred.log")
+DEFERRED_RETRY_SECONDS = int(os.environ.get("DEFERRED_RETRY_SECONDS", "30"))
+# Keep queued and in-progress items in SQLite so a restart resumes them (empty = in-memory queue)
+WORK_QUEUE_FILE = os.environ.get("WORK_QUEUE_FILE", "")
+# Distributed mode: one "ingest" process streams into BROKER_URL, "worker" processes filter; "all" = both in one process
+BOT_ROLE = os.environ.get("BOT_ROLE", "all")
+BROKER_URL = os.environ.get("BROKER_URL", "")  # e.g. sqlite:///english_broker.db
+WORKER_ID = os.environ.get("WORKER_ID", "1")  # Keeps each worker's state files apart
+# Split TARGET_SUBREDDITS across ingesting instances by consistent hashing: this is INSTANCE_ID of
+# INSTANCE_COUNT, or with PARTITION_LEASE_DIR one of the instances holding a live lease there (failover)
+INSTANCE_ID = os.environ.get("INSTANCE_ID", "0")
+INSTANCE_COUNT = int(os.environ.get("INSTANCE_COUNT", "1"))
+PARTITION_LEASE_DIR = os.environ.get("PARTITION_LEASE_DIR", "")
+PARTITION_LEASE_SECONDS = int(os.environ.get("PARTITION_LEASE_SECONDS", "90"))
+# Text sent to Cohere is normalised and cut to a token budget; long posts are embedded
+# as up to EMBED_MAX_CHUNKS chunks and scored by their best chunk (1 = truncate only)
+EMBED_MAX_TOKENS = int(os.environ.get("EMBED_MAX_TOKENS", "512"))
+EMBED_MAX_CHUNKS = int(os.environ.get("EMBED_MAX_CHUNKS", "4"))
+LLM_MAX_TOKENS = int(os.environ.get("LLM_MAX_TOKENS", "600"))
+# Stream LLM verdicts and stop reading at the first token of a NO (0 = wait for the full completion)
+LLM_STREAMING = os.environ.get("LLM_STREAMING", "1") == "1"
+# Lead and filtered-content files are written in batches by a background thread at most this often
+SINK_FLUSH_SECONDS = float(os.environ.get("SINK_FLUSH_SECONDS", "2"))
+# Per-item messages (filtered, skipped, deferred, candidate, shed) are logged from a background writer,
+# each kind limited to LOG_EVENT_RATE per second after a burst of LOG_EVENT_BURST; LOG_JSON=1 writes JSON lines
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_JSON = os.environ.get("LOG_JSON", "") == "1"
+LOG_EVENT_RATE = float(os.environ.get("LOG_EVENT_RATE", "1"))
+LOG_EVENT_BURST = int(os.environ.get("LOG_EVENT_BURST", "10"))
+# Leads saved more than this many seconds after being posted are printed with where the time went (0 = off)
+FRESHNESS_ALERT_SECONDS = float(os.environ.get("FRESHNESS_ALERT_SECONDS", "900"))
+# Work the queue by priority (posts, keyword hits, subreddits that yield leads, newest first) instead of arrival order
+PRIORITY_SCHEDULING = os.environ.get("PRIORITY_SCHEDULING", "1") == "1"
+# Once OVERLOAD_BACKLOG items have been waiting for OVERLOAD_SECONDS, items older than FRESHNESS_DEADLINE_SECONDS
+# are dropped if no keywords matched, or moved behind the backlog if they did (0 = never)
+OVERLOAD_BACKLOG = int(os.environ.get("OVERLOAD_BACKLOG", "200"))
+OVERLOAD_SECONDS = float(os.environ.get("OVERLOAD_SECONDS", "300"))
+FRESHNESS_DEADLINE_SECONDS = float(os.environ.get("FRESHNESS_DEADLINE_SECONDS", "3600"))
+
+items_processed = metrics.counter("items_processed_total", "Items taken off the processing queue", ["content_type"])
+items_filtered = metrics.counter("items_filtered_total", "Items rejected by a filter stage", ["reason"])
+leads_found = metrics.counter("leads_found_total", "Items that passed every filter")
+responses_sent = metrics.counter("responses_sent_total", "Replies and DMs sent", ["kind"])
+errors_total = metrics.counter("errors_total", "Errors while processing or responding", ["kind"])
+llm_explored = metrics.counter("llm_explored_total", "Items a gate filtered, sent to the LLM anyway for the verdict log", ["gate"])
+stage_latency = metrics.histogram("stage_duration_seconds", "Wall-clock time spent per pipeline stage", ["stage"])
+throughput = metrics.RateMeter(window_seconds=60)
+metrics.gauge("items_per_second", "Items processed per second over the last minute").set_function(throughput.rate)
 
 def should_print_milestone(count):
     """Check if we should print a milestone for the current count"""
@@ -48,34 +145,38 @@ def should_print_milestone(count):
     return False
 
 def print_progress_summary(context_label):
-    """Print a compact numeric summary of current progress"""
-    filtered_total = (
-        filtered_no_practice_keywords_count
-        + filtered_negative_keywords_count
-        + filtered_no_seeking_language_count
-        + filtered_low_similarity_count
-        + filtered_llm_failed_count
-    )
+    """Print a compact numeric summary of current progress from the metrics registry"""
+    def filtered(reason):
+        return items_filtered.labels(reason=reason).value
+
     print(
-        f"📈 {context_label} | checked={processed_count} "
-        f"(posts={posts_processed}, comments={comments_processed}) | "
-        f"filtered={filtered_total} "
-        f"(no_practice={filtered_no_practice_keywords_count}, "
-        f"negative={filtered_negative_keywords_count}, "
-        f"no_seek={filtered_no_seeking_language_count}, "
-        f"low_sim={filtered_low_similarity_count}, "
-        f"llm_fail={filtered_llm_failed_count}) | "
-        f"leads={leads_found_count} | replies={replies_sent_count} | dms={dms_sent_count} | "
-        f"errors(proc={errors_processing_count}, resp={errors_responding_count})"
+        f"📈 {context_label} | checked={items_processed.total()} "
+        f"(posts={items_processed.labels(content_type='post').value}, "
+        f"comments={items_processed.labels(content_type='comment').value}) | "
+        f"filtered={items_filtered.total()} "
+        f"(no_practice={filtered('no_practice_keywords')}, "
+        f"negative={filtered('negative_keywords')}, "
+        f"no_seek={filtered('no_seeking_language')}, "
+        f"low_sim={filtered('low_similarity')}, "
+        f"llm_fail={filtered('llm_verification_failed')}) | "
+        f"leads={leads_found.value} | replies={responses_sent.labels(kind='reply').value} | "
+        f"dms={responses_sent.labels(kind='dm').value} | "
+        f"errors(proc={errors_total.labels(kind='processing').value}, "
+        f"resp={errors_total.labels(kind='responding').value}) | "
+        f"rate={throughput.rate():.2f}/s | "
+        f"rss={memory_governor.current_rss_mb() or 0:.0f}MB | "
+        f"time_to_lead={freshness_tracker.summary() or 'n/a'}"
     )
 
 # ==== CONFIGURE YOUR CREDENTIALS HERE ====
-REDDIT_CLIENT_ID = os.environ["REDDIT_CLIENT_ID"]
-REDDIT_CLIENT_SECRET = os.environ["REDDIT_CLIENT_SECRET"]
+REDDIT_CLIENT_ID = os.environ.get("REDDIT_CLIENT_ID", "")
+REDDIT_CLIENT_SECRET = os.environ.get("REDDIT_CLIENT_SECRET", "")
 REDDIT_USERNAME = os.environ.get("REDDIT_USERNAME", "YOUR_USERNAME")  # For responding/DMing
 REDDIT_PASSWORD = os.environ.get("REDDIT_PASSWORD", "YOUR_PASSWORD")  # For responding/DMing
 USER_AGENT = os.environ.get("USER_AGENT", "English Learning Community Bot v1.0")
 COHERE_API_KEY = os.environ.get("COHERE_API_KEY", "")  # For LLM verification
+EMBED_PROVIDER = "cohere"
+EMBED_MODEL = "embed-english-v3.0"  # Topic artifacts are keyed by this name
 
 # Discord community details
 DISCORD_INVITE_LINK = "https://discord.com/invite/yjaraMBuSG"  # Replace with your actual Discord invite
@@ -93,27 +194,49 @@ SEND_DMS = False     # Set to True to enable direct messaging
 RESPONSE_COOLDOWN_HOURS = 24  # Hours to wait before responding to same user again
 
 # Track recent interactions to avoid spam
-recent_interactions = {}
+recent_interactions = interaction_tracker.InteractionTracker(RESPONSE_COOLDOWN_HOURS * 3600)
 
 SAVE_FILTERED_CONTENT = False  # Set to True to save filtered content to json
 
-# Track users who have already been identified as leads
-identified_leads = {}  # {username: first_identified_timestamp}
-IDENTIFIED_LEADS_FILE = "identified_leads.json"
+# Track users who have already been identified as leads (re-reported after LEAD_REENGAGE_DAYS)
+identified_leads = lead_registry.LeadRegistry()  # Replaced with the on-disk registry by load_identified_leads()
+IDENTIFIED_LEADS_LOG = "identified_leads.log"
+IDENTIFIED_LEADS_FILE = "identified_leads.json"  # Pre-registry format, migrated on first start
+LEAD_REENGAGE_DAYS = int(os.environ.get("LEAD_REENGAGE_DAYS", "90"))
 
 # ==== INITIALIZE COHERE CLIENT ====
 cohere_client = None
-if COHERE_API_KEY:
-    try:
-        cohere_client = cohere.Client(COHERE_API_KEY)
-        print("✅ Cohere client initialized for embeddings and LLM verification")
-    except Exception as e:
-        print(f"⚠️ Could not initialize Cohere client: {e}")
-        print("⚠️ Cannot proceed without Cohere API - embeddings and LLM verification required")
+
+# Fail fast while Cohere is down instead of waiting out every request
+embed_breaker = circuit_breaker.CircuitBreaker("cohere_embed")
+chat_breaker = circuit_breaker.CircuitBreaker("cohere_chat")
+
+# Candidates parked while Cohere is unavailable (degraded mode)
+deferred = deferred_queue.DeferredQueue()  # Replaced with the on-disk queue by load_deferred_queue()
+
+# Durable processing queue, set by open_work_queue() when WORK_QUEUE_FILE is configured
+work_queue = None
+lead_sink = sink.JsonArraySink("english_leads", flush_interval=SINK_FLUSH_SECONDS)
+filtered_sink = sink.JsonArraySink("unfiltered_english_leads", flush_interval=SINK_FLUSH_SECONDS)
+log = bot_logging.get_logger("english")
+freshness_tracker = freshness.FreshnessTracker(FRESHNESS_ALERT_SECONDS)
+prioritizer = scheduling.PriorityScorer(boost_gates=('practice', 'seeking'), penalty_gates=('negative',))
+shedder = scheduling.LoadShedder(FRESHNESS_DEADLINE_SECONDS, OVERLOAD_BACKLOG, OVERLOAD_SECONDS)
+
+def init_cohere_client():
+    """Create the Cohere client used for embeddings and LLM verification"""
+    global cohere_client
+    if COHERE_API_KEY:
+        try:
+            cohere_client = cohere.Client(COHERE_API_KEY, timeout=COHERE_TIMEOUT_SECONDS)
+            print("✅ Cohere client initialized for embeddings and LLM verification")
+        except Exception as e:
+            print(f"⚠️ Could not initialize Cohere client: {e}")
+            print("⚠️ Cannot proceed without Cohere API - embeddings and LLM verification required")
+            exit(1)
+    else:
+        print("⚠️ No COHERE_API_KEY found - Cohere is required for this bot")
         exit(1)
-else:
-    print("⚠️ No COHERE_API_KEY found - Cohere is required for this bot")
-    exit(1)
 
 # ==== TARGET TOPICS FOR ENGLISH LEARNERS SEEKING PRACTICE ====
 TARGET_TOPICS = [
@@ -174,31 +297,143 @@ TARGET_TOPICS = [
     "English job interview practice"
 ]
 
-# Pre-compute embeddings for target topics using Cohere
-print("🔄 Computing target topic embeddings using Cohere...")
-try:
-    response = cohere_client.embed(
-        texts=TARGET_TOPICS,
-        model='embed-english-v3.0',
-        input_type='search_document'
-    )
-    target_embeddings = np.array(response.embeddings)
-    print(f"✅ Computed {len(target_embeddings)} target topic embeddings")
-except Exception as e:
-    print(f"⚠️ Error computing embeddings: {e}")
-    exit(1)
+target_embeddings = None
+similarity_thresholds = similarity_thresholds_config.SimilarityThresholds()
+prescreen_model = None
+llm_verdicts = None
+
+def load_target_embeddings():
+    """
+    Load pre-computed embeddings for target topics (see topic_embeddings.py);
+    Cohere is only called when the topic list has changed since the last build
+    """
+    global target_embeddings
+    try:
+        target_embeddings = topic_embeddings.get_topic_embeddings(
+            EMBED_MODEL, TARGET_TOPICS,
+            topic_embeddings.cohere_embed_fn(cohere_client, EMBED_MODEL)
+        )
+        print(f"✅ Loaded {len(target_embeddings)} target topic embeddings")
+    except Exception as e:
+        print(f"⚠️ Error computing embeddings: {e}")
+        exit(1)
+
+def load_similarity_thresholds():
+    """Load per-topic/per-subreddit thresholds written by similarity_thresholds.py, if any"""
+    global similarity_thresholds
+    try:
+        similarity_thresholds = similarity_thresholds_config.SimilarityThresholds.load(SIMILARITY_THRESHOLDS_FILE)
+        if len(similarity_thresholds) or similarity_thresholds.default is not None:
+            print(f"🎯 Loaded calibrated similarity thresholds ({len(similarity_thresholds)} topic/subreddit overrides)")
+    except Exception as e:
+        print(f"⚠️ Error loading similarity thresholds, using defaults: {e}")
+
+def load_prescreen_model():
+    """Load the local pre-screen classifier trained by prescreen.py, if any"""
+    global prescreen_model
+    try:
+        prescreen_model = prescreen.PrescreenModel.load(PRESCREEN_MODEL_FILE, EMBED_MODEL)
+        if prescreen_model is not None:
+            print(f"🧮 Loaded pre-screen model (accept p >= {prescreen_model.accept_above:.2f}, "
+                  f"reject p < {prescreen_model.reject_below:.2f})")
+    except Exception as e:
+        print(f"⚠️ Error loading pre-screen model, every candidate goes to the LLM: {e}")
+
+def open_llm_verdict_log():
+    """Log every LLM verdict from now on (LLM_VERDICT_LOG=0 turns it off)"""
+    global llm_verdicts
+    if LLM_VERDICT_LOG and cohere_client:
+        suffix = f"-worker{WORKER_ID}" if BOT_ROLE == 'worker' else ""
+        llm_verdicts = verdict_log.VerdictLog("english", EMBED_MODEL, suffix=suffix)
+
+def load_deferred_queue():
+    """Load items parked during an earlier Cohere outage"""
+    global deferred
+    try:
+        deferred = deferred_queue.DeferredQueue(role_path(DEFERRED_QUEUE_FILE))
+        if len(deferred):
+            print(f"⏸️ {len(deferred)} items deferred during a Cohere outage will be retried")
+    except Exception as e:
+        print(f"⚠️ Error loading deferred queue: {e}")
+
+# ==== KEYWORD FILTERS ====
+# First pass: Basic keyword filtering - ONLY for people seeking practice
+PRACTICE_SEEKING_KEYWORDS = [
+    # Direct practice requests (first person)
+    'i need', 'i want', 'i am looking', 'i\'m looking', 'looking for', 'need someone',
+    'seeking', 'searching for', 'trying to find', 'anyone want to', 'anyone know',
+    
+    # Practice-specific terms
+    'practice speaking', 'speaking practice', 'conversation practice', 'practice english',
+    'practice partner', 'conversation partner', 'speaking partner', 'language exchange',
+    'study buddy', 'speaking buddy', 'practice with', 'talk with', 'chat with',
+    
+    # Community seeking
+    'discord server', 'discord group', 'english discord', 'practice group', 'study group',
+    'english community', 'speaking club', 'conversation group', 'voice chat',
+    
+    # Questions about practice
+    'how can i practice', 'where can i practice', 'how to practice', 'best way to practice',
+    'apps for practice', 'websites for practice', 'where to practice', 'how do i practice',
+    
+    # Confidence/fear related to speaking
+    'afraid to speak', 'scared to speak', 'nervous about speaking', 'shy to speak',
+    'confidence in speaking', 'embarrassed about', 'anxious about speaking'
+]
+
+# Negative keyword filtering - exclude irrelevant content
+NEGATIVE_KEYWORDS = [
+    # Commercial/spam
+    'translate', 'translation service', 'homework help', 'essay writing service',
+    'pay for', 'selling', 'buy my', 'crypto', 'bitcoin', 'investment',
+    'spam', 'advertisement', 'promotion', 'affiliate', 'referral code',
+    
+    # General discussion/debate (not seeking practice)
+    'totally representative', 'isolated case', 'asshole', 'population',
+    'heard something recently', 'generally due to', 'step back', 'forest for the trees',
+    'in my opinion', 'i think that', 'personally i believe', 'from my experience',
+    'it depends on', 'there are many factors', 'it varies', 
+    
+    # Academic/theoretical discussions
+    'research shows', 'studies indicate', 'according to', 'evidence suggests',
+    'linguistically speaking', 'from a linguistic perspective', 'grammar rules',
+    'language acquisition theory', 'second language acquisition',
+    
+    # Giving advice (not seeking)
+    'you should', 'i recommend', 'try this', 'what works for me',
+    'in my experience', 'i suggest', 'my advice would be'
+]
+
+# Additional check: Must contain seeking/question language for first person
+SEEKING_INDICATORS = [
+    'i need', 'i want', 'i am looking', 'i\'m looking', 'looking for',
+    'how can i', 'where can i', 'how do i', 'where do i', 'help me',
+    'anyone know', 'does anyone', 'can someone', 'recommendations for',
+    'suggestions for', 'advice on', 'tips for', 'seeking'
+]
+
+# All keyword gates, scanned once per item
+KEYWORD_GATES = keyword_gates.KeywordGates(
+    practice=PRACTICE_SEEKING_KEYWORDS,
+    negative=NEGATIVE_KEYWORDS,
+    seeking=SEEKING_INDICATORS
+)
 
 # ==== FILTERING FUNCTION ====
-def is_relevant_comment(comment_text, threshold=0.5):
+def is_relevant_comment(comment_text, threshold=BASE_SIMILARITY_THRESHOLD, subreddit=None):
     """
-    Use embedding similarity to determine if a comment is relevant to English learners
-    Returns: (is_relevant: bool, similarity_score: float, best_matching_topic: str)
+    Use embedding similarity to determine if a comment is relevant to English learners.
+    threshold is used unless a calibrated one applies to the best topic or subreddit.
+    Returns: (is_relevant: bool, similarity_score: float, best_matching_topic: str, embedding: np.ndarray)
+    embedding is None if Cohere could not be reached.
     """
     try:
-        # Get embedding from Cohere
-        response = cohere_client.embed(
-            texts=[comment_text],
-            model='embed-english-v3.0',
+        # Get embeddings from Cohere: one per chunk of a long text, cleaned and within the token budget
+        chunks = text_prep.chunks(text_prep.normalize(comment_text) or comment_text, EMBED_MAX_TOKENS, EMBED_MAX_CHUNKS)
+        response = embed_breaker.call(
+            cohere_client.embed,
+            texts=chunks,
+            model=EMBED_MODEL,
             input_type='search_query'
         )
         comment_embedding = np.array(response.embeddings)
@@ -208,27 +443,31 @@ def is_relevant_comment(comment_text, threshold=0.5):
         comment_norm = comment_embedding / np.linalg.norm(comment_embedding, axis=1, keepdims=True)
         target_norm = target_embeddings / np.linalg.norm(target_embeddings, axis=1, keepdims=True)
         
-        # Compute similarities
-        similarities = np.dot(comment_norm, target_norm.T)[0]
-        max_similarity = np.max(similarities)
-        best_topic_index = np.argmax(similarities)
+        # Compute similarities (chunks x topics); the best-matching chunk decides
+        similarities = np.dot(comment_norm, target_norm.T)
+        best_chunk, best_topic_index = np.unravel_index(np.argmax(similarities), similarities.shape)
+        max_similarity = similarities[best_chunk, best_topic_index]
         best_matching_topic = TARGET_TOPICS[best_topic_index]
+        threshold = similarity_thresholds.threshold_for(best_matching_topic, subreddit, threshold)
         
-        return max_similarity > threshold, float(max_similarity), best_matching_topic
+        return max_similarity > threshold, float(max_similarity), best_matching_topic, comment_embedding[best_chunk]
+    except circuit_breaker.CircuitOpenError:
+        return False, 0.0, "", None
     except Exception as e:
         print(f"⚠️ Error in embedding filtering: {e}")
-        return False, 0.0, ""
+        return False, 0.0, "", None
 
 def verify_with_llm(text_content):
     """
     Use Cohere LLM to verify if the content is genuinely about someone looking to practice English
-    Returns: (is_verified: bool, reasoning: str)
+    Returns: (is_verified: bool, reasoning: str); is_verified is None if the LLM could not be reached
     """
     if not cohere_client:
         # If Cohere is not available, skip this check
         return True, "LLM verification skipped (no API key)"
     
     try:
+        text_content = text_prep.truncate(text_prep.normalize(text_content) or text_content, LLM_MAX_TOKENS)
         prompt = f"""Analyze the following Reddit post or comment and determine if it's from someone who is actively looking to improve their English or practice speaking English or seeking English conversation practice.
 
 Text: "{text_content}"
@@ -253,7 +492,19 @@ Answer with ONLY "YES" or "NO", followed by a brief one-sentence explanation.
 
 Format: YES/NO - [reason]"""
 
-        response = cohere_client.chat(
+        if LLM_STREAMING:
+            # Rejections end at their first token; a YES is read on for the reason saved with the lead
+            return chat_breaker.call(
+                llm_stream.stream_verdict,
+                cohere_client.chat_stream,
+                message=prompt,
+                model="command-a-03-2025",
+                temperature=0.3,
+                max_tokens=100
+            )
+        
+        response = chat_breaker.call(
+            cohere_client.chat,
             message=prompt,
             model="command-a-03-2025",
             temperature=0.3,
@@ -268,10 +519,12 @@ Format: YES/NO - [reason]"""
         
         return is_verified, reasoning
         
+    except circuit_breaker.CircuitOpenError:
+        return None, "LLM verification unavailable (circuit open)"
     except Exception as e:
         print(f"⚠️ Error in LLM verification: {e}")
-        # On error, allow the content through (fail open)
-        return True, f"LLM verification error: {str(e)}"
+        # On error, defer the item rather than letting it through unverified
+        return None, f"LLM verification error: {str(e)}"
 
 # ==== RESPONSE TEMPLATES ====
 RESPONSE_TEMPLATES = {
@@ -302,27 +555,54 @@ def get_response_template(text_content):
 
 # ==== LEAD TRACKING ====
 def load_identified_leads():
-    """Load identified leads from JSON file"""
+    """Load identified leads from the lead log (migrating the old JSON file if needed)"""
     global identified_leads
     try:
-        if os.path.exists(IDENTIFIED_LEADS_FILE):
-            with open(IDENTIFIED_LEADS_FILE, 'r', encoding='utf-8') as f:
-                identified_leads = json.load(f)
-            print(f"📂 Loaded {len(identified_leads)} previously identified leads")
-        else:
-            identified_leads = {}
-            print("📂 No previous leads file found, starting fresh")
+        identified_leads = lead_registry.LeadRegistry(
+            role_path(IDENTIFIED_LEADS_LOG), LEAD_REENGAGE_DAYS * 86400, legacy_path=IDENTIFIED_LEADS_FILE
+        )
+        print(f"📂 Loaded {len(identified_leads)} leads identified in the last {LEAD_REENGAGE_DAYS} days")
     except Exception as e:
         print(f"⚠️ Error loading identified leads: {e}")
-        identified_leads = {}
+        identified_leads = lead_registry.LeadRegistry()
 
-def save_identified_leads():
-    """Save identified leads to JSON file"""
-    try:
-        with open(IDENTIFIED_LEADS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(identified_leads, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"⚠️ Error saving identified leads: {e}")
+def role_path(path):
+    """Per-worker name for a state file, so worker processes never share one"""
+    if BOT_ROLE != 'worker':
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-worker{WORKER_ID}{ext}"
+
+def metrics_port():
+    """Per-worker metrics port (METRICS_PORT + WORKER_ID), so workers on one host never share one"""
+    if BOT_ROLE != 'worker' or not WORKER_ID.isdigit():
+        return METRICS_PORT
+    return METRICS_PORT + int(WORKER_ID)
+
+def open_work_queue():
+    """Open the broker or durable processing queue, or return None to use an in-memory one"""
+    global work_queue
+    if BOT_ROLE != 'all' and not BROKER_URL:
+        print(f"⚠️ BOT_ROLE={BOT_ROLE} needs BROKER_URL (e.g. sqlite:///english_broker.db)")
+        exit(1)
+    if BROKER_URL:
+        work_queue = broker.connect(BROKER_URL, reclaim=BOT_ROLE == 'all')
+        print(f"📬 Connected to broker {BROKER_URL} as {BOT_ROLE} ({work_queue.qsize()} items queued)")
+    elif WORK_QUEUE_FILE:
+        work_queue = work_queue_store.DurableWorkQueue(WORK_QUEUE_FILE)
+        print(f"💽 Durable work queue at {WORK_QUEUE_FILE} ({work_queue.qsize()} items to resume)")
+    return work_queue
+
+def record_stage(content, stage, value=True):
+    """Persist a finished pipeline stage so a redelivered item resumes after it"""
+    if work_queue is not None:
+        work_queue.mark_stage(content, stage, value)
+
+def claim_lead(username, content):
+    """Claim the lead in the shared queue so concurrent workers report each user once"""
+    if work_queue is None:
+        return True
+    return work_queue.claim_lead(username, content.fullname, LEAD_REENGAGE_DAYS * 86400)
 
 def is_already_identified_lead(username):
     """Check if user has already been identified as a lead"""
@@ -330,27 +610,23 @@ def is_already_identified_lead(username):
 
 def record_identified_lead(username):
     """Record that a user has been identified as a lead"""
-    identified_leads[username] = datetime.now().isoformat()
-    save_identified_leads()
+    try:
+        identified_leads.add(username)
+    except Exception as e:
+        print(f"⚠️ Error saving identified leads: {e}")
 
 # ==== INTERACTION TRACKING ====
 def can_interact_with_user(username):
     """Check if we can interact with a user (respecting cooldown)"""
-    if username in recent_interactions:
-        last_interaction = datetime.fromisoformat(recent_interactions[username])
-        hours_passed = (datetime.now() - last_interaction).total_seconds() / 3600
-        return hours_passed >= RESPONSE_COOLDOWN_HOURS
-    return True
+    return recent_interactions.can_interact(username)
 
 def record_interaction(username):
     """Record interaction with user"""
-    recent_interactions[username] = datetime.now().isoformat()
+    recent_interactions.record(username)
 
 # ==== MEMORY MANAGEMENT ====
 def cleanup_memory():
     """Periodically clean up memory to prevent issues on droplet"""
-    global recent_interactions
-    
     while True:
         try:
             # Sleep for 1 hour between cleanups
@@ -358,20 +634,8 @@ def cleanup_memory():
             
             print("🧹 Running memory cleanup...")
             
-            # Clean up old interactions (older than cooldown period + 1 hour buffer)
-            cutoff_time = datetime.now() - timedelta(hours=RESPONSE_COOLDOWN_HOURS + 1)
-            old_count = len(recent_interactions)
-            
-            recent_interactions = {
-                username: timestamp 
-                for username, timestamp in recent_interactions.items()
-                if datetime.fromisoformat(timestamp) > cutoff_time
-            }
-            
-            cleaned_count = old_count - len(recent_interactions)
-            
-            # Force garbage collection
-            gc.collect()
+            # Expire interactions whose cooldown has passed (also done on every new interaction)
+            cleaned_count = recent_interactions.expire()
             
             print(f"✅ Memory cleanup complete. Removed {cleaned_count} old interactions. "
                   f"Current interactions in memory: {len(recent_interactions)}")
@@ -383,29 +647,30 @@ def cleanup_memory():
 def respond_to_content(reddit_instance, content, content_type, text_content):
     """Respond to relevant content (comment or DM)"""
     try:
-        global replies_sent_count, dms_sent_count, errors_responding_count
         username = str(content.author)
         
         if not can_interact_with_user(username):
-            print(f"⏰ Skipping response to u/{username} (cooldown active)")
+            log.info("⏰ Skipping response to u/%s (cooldown active)", username,
+                     extra={'event': 'skipped', 'fullname': content.fullname})
             return False
             
         response_text = get_response_template(text_content)
         
+        # Reply through the authenticated instance; queued items may be stand-ins restored from disk
         if AUTO_RESPOND and content_type == 'post':
             # Reply to post
-            content.reply(response_text)
+            reddit_instance.submission(id=content.id).reply(response_text)
             print(f"✅ Replied to post by u/{username}")
             record_interaction(username)
-            replies_sent_count += 1
+            responses_sent.labels(kind='reply').inc()
             return True
             
         elif AUTO_RESPOND and content_type == 'comment':
             # Reply to comment
-            content.reply(response_text)
+            reddit_instance.comment(id=content.id).reply(response_text)
             print(f"✅ Replied to comment by u/{username}")
             record_interaction(username)
-            replies_sent_count += 1
+            responses_sent.labels(kind='reply').inc()
             return True
             
         elif SEND_DMS:
@@ -416,12 +681,12 @@ def respond_to_content(reddit_instance, content, content_type, text_content):
             )"""
             print(f"📩 Sent DM to u/{username}")
             record_interaction(username)
-            dms_sent_count += 1
+            responses_sent.labels(kind='dm').inc()
             return True
             
     except Exception as e:
         print(f"⚠️ Error responding to u/{content.author}: {e}")
-        errors_responding_count += 1
+        errors_total.labels(kind='responding').inc()
         return False
     
     return False
@@ -429,189 +694,162 @@ def respond_to_content(reddit_instance, content, content_type, text_content):
 # ==== SAVE LEADS TO JSON ====
 def save_lead_to_json(lead_data):
     """
-    Save lead data to a daily JSON file
+    Write lead data to the daily JSON file and wait until it is on disk.
+    With a durable work queue a failed write raises sink.CommitError, so the item is delivered again.
     """
-    today = datetime.now().strftime("%Y-%m-%d")
-    filename = f"english_leads_{today}.json"
-    
+    filename = f"english_leads_{datetime.now().strftime('%Y-%m-%d')}.json"
     try:
-        # Load existing data or create new list
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                leads = json.load(f)
-        else:
-            leads = []
-        
-        # Add new lead
-        leads.append(lead_data)
-        
-        # Save back to file
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(leads, f, indent=2, ensure_ascii=False)
-        
-        print(f"💾 English lead saved to {filename}")
-        
-    except Exception as e:
-        print(f"⚠️ Error saving lead: {e}")
+        lead_sink.write(filename, lead_data)
+    except sink.CommitError:
+        if work_queue is not None:
+            raise
+        lead_sink.put(filename, lead_data)  # Nothing would redeliver it: keep retrying in the background
 
 def save_filtered_content_to_json(filtered_data):
     """
-    Save filtered content data to a daily JSON file
+    Queue filtered content data for the daily JSON file (written in batches by filtered_sink)
     """
     if not SAVE_FILTERED_CONTENT:
         return
     today = datetime.now().strftime("%Y-%m-%d")
-    filename = f"unfiltered_english_leads_{today}.json"
+    filtered_sink.put(f"unfiltered_english_leads_{today}.json", filtered_data)
+
+# ==== SETUP REDDIT INSTANCE ====
+reddit_read = None
+reddit_write = None
+
+def setup_reddit():
+    """Create the read-only and (if responding) authenticated Reddit instances"""
+    global reddit_read, reddit_write, AUTO_RESPOND, SEND_DMS
+    if not REDDIT_CLIENT_ID or not REDDIT_CLIENT_SECRET:
+        print("⚠️ REDDIT_CLIENT_ID and REDDIT_CLIENT_SECRET are required")
+        exit(1)
     
-    try:
-        # Load existing data or create new list
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                filtered_leads = json.load(f)
-        else:
-            filtered_leads = []
-        
-        # Add new filtered content
-        filtered_leads.append(filtered_data)
-        
-        # Save back to file
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(filtered_leads, f, indent=2, ensure_ascii=False)
-        
-        print(f"💾 Filtered content saved to {filename}")
-        
-    except Exception as e:
-        print(f"⚠️ Error saving filtered content: {e}")
+    # For read-only monitoring
+    reddit_read = praw.Reddit(
+        client_id=REDDIT_CLIENT_ID,
+        client_secret=REDDIT_CLIENT_SECRET,
+        user_agent=USER_AGENT
+    )
+    
+    # For responding/DMing (requires username/password)
+    if (AUTO_RESPOND or SEND_DMS) and REDDIT_USERNAME != "YOUR_USERNAME":
+        try:
+            reddit_write = praw.Reddit(
+                client_id=REDDIT_CLIENT_ID,
+                client_secret=REDDIT_CLIENT_SECRET,
+                username=REDDIT_USERNAME,
+                password=REDDIT_PASSWORD,
+                user_agent=USER_AGENT
+            )
+            print("✅ Authenticated for responding/DMing")
+        except Exception as e:
+            print(f"⚠️ Could not authenticate for responses: {e}")
+            AUTO_RESPOND = False
+            SEND_DMS = False
 
-# ==== LOAD IDENTIFIED LEADS ====
-load_identified_leads()
+def defer_content(content, content_type, stage):
+    """Park an item while Cohere is unavailable; it is fetched again and reprocessed once it recovers"""
+    if deferred.defer(content.fullname, content_type, stage):
+        log.info("⏸️ Deferred %s %s - %s unavailable (%s waiting)", content_type, content.fullname, stage, len(deferred),
+                 extra={'event': 'deferred', 'fullname': content.fullname})
 
-# ==== SETUP REDDIT INSTANCE ====
-# For read-only monitoring
-reddit_read = praw.Reddit(
-    client_id=REDDIT_CLIENT_ID,
-    client_secret=REDDIT_CLIENT_SECRET,
-    user_agent=USER_AGENT
-)
+def content_text(content, content_type):
+    """Lowercased text the filters run on"""
+    if content_type == 'post':
+        return f"{content.title} {content.selftext}".lower()
+    return content.body.lower()
 
-# For responding/DMing (requires username/password)
-reddit_write = None
-if (AUTO_RESPOND or SEND_DMS) and REDDIT_USERNAME != "YOUR_USERNAME":
+def scan_keywords(content, content_type):
+    """KEYWORD_GATES matches for one item, or None if its text can't be read (process_content scans it again)"""
     try:
-        reddit_write = praw.Reddit(
-            client_id=REDDIT_CLIENT_ID,
-            client_secret=REDDIT_CLIENT_SECRET,
-            username=REDDIT_USERNAME,
-            password=REDDIT_PASSWORD,
-            user_agent=USER_AGENT
-        )
-        print("✅ Authenticated for responding/DMing")
-    except Exception as e:
-        print(f"⚠️ Could not authenticate for responses: {e}")
-        AUTO_RESPOND = False
-        SEND_DMS = False
-
-# ==== MONITOR MULTIPLE SUBREDDITS ====
-subreddit_string = "+".join(TARGET_SUBREDDITS)
-subreddit = reddit_read.subreddit(subreddit_string)
+        return KEYWORD_GATES.scan(content_text(content, content_type))
+    except Exception:
+        return None
 
-print(f"🚀 Monitoring {len(TARGET_SUBREDDITS)} subreddits for English learning leads...")
-print(f"📍 Target subreddits: {', '.join(TARGET_SUBREDDITS)}")
-print(f"🤖 Auto-respond: {'ON' if AUTO_RESPOND else 'OFF'}")
-print(f"📩 Direct messages: {'ON' if SEND_DMS else 'OFF'}")
+def prioritize(content, content_type):
+    """Set the scheduling priority of an item about to be queued, from one keyword scan of its text"""
+    if not PRIORITY_SCHEDULING:
+        return
+    content.priority = prioritizer.score(content_type, content, scan_keywords(content, content_type))
 
-def process_content(content, content_type):
+def process_content(content, content_type, keyword_hits=None):
     """
     Process either a post or comment and check if it's a relevant English learning lead
+    keyword_hits: precomputed KEYWORD_GATES matches (from the processing loop); scanned here if None
     """
-    global processed_count, posts_processed, comments_processed
-    global filtered_no_practice_keywords_count, filtered_negative_keywords_count
-    global filtered_no_seeking_language_count, filtered_low_similarity_count
-    global filtered_llm_failed_count, leads_found_count, errors_processing_count
-    processed_count += 1
-    if content_type == 'post':
-        posts_processed += 1
-    else:
-        comments_processed += 1
+    items_processed.labels(content_type=content_type).inc()
+    throughput.mark()
 
-    if should_print_milestone(processed_count):
+    if should_print_milestone(items_processed.total()):
         print_progress_summary("Milestone")
 
+    # Per-stage timings for this item (also feed the stage_duration_seconds histogram)
+    trace = profiling.ItemTrace(stage_latency)
     try:
         # Skip deleted/removed content
-        if content.author is None or content.author in ['AutoModerator']:
+        with trace.span('praw_attributes'):
+            author = content.author
+        if author is None or author in ['AutoModerator']:
             return
         
+        # Stages already finished before a restart (durable work queue only)
+        resumed = getattr(content, 'pipeline_state', {})
+        
         # Check if user has already been identified as a lead
-        username = str(content.author)
-        if is_already_identified_lead(username):
-            print(f"⏭️ Skipping u/{username} - already identified as a lead")
+        username = str(author)
+        if is_already_identified_lead(username) and 'lead' not in resumed:
+            log.info("⏭️ Skipping u/%s - already identified as a lead", username,
+                     extra={'event': 'skipped', 'fullname': content.fullname})
             return
         
         # Get text content based on type
-        if content_type == 'post':
-            text_content = f"{content.title} {content.selftext}".lower()
-            display_text = f"Title: {content.title}\nBody: {content.selftext[:200]}{'...' if len(content.selftext) > 200 else ''}"
-        else:  # comment
-            if content.body in ['[deleted]', '[removed]']:
-                return
-            text_content = content.body.lower()
-            display_text = content.body[:200] + ('...' if len(content.body) > 200 else '')
+        with trace.span('praw_attributes'):
+            if content_type == 'post':
+                text_content = content_text(content, content_type)
+                display_text = f"Title: {content.title}\nBody: {content.selftext[:200]}{'...' if len(content.selftext) > 200 else ''}"
+            else:  # comment
+                if content.body in ['[deleted]', '[removed]']:
+                    return
+                text_content = content_text(content, content_type)
+                display_text = content.body[:200] + ('...' if len(content.body) > 200 else '')
         
         # Always get similarity score for all content
-        is_relevant, similarity_score, best_matching_topic = is_relevant_comment(text_content)
+        with trace.span('embedding'):
+            is_relevant, similarity_score, best_matching_topic, embedding = is_relevant_comment(text_content, subreddit=content.subreddit.display_name)
         
         # Prepare base data for both filtered and unfiltered content
-        base_data = {
-            'timestamp': datetime.now().isoformat(),
-            'content_type': content_type,
-            'subreddit': content.subreddit.display_name,
-            'author': str(content.author),
-            'similarity_score': similarity_score,
-            'best_matching_topic': best_matching_topic,
-            'reddit_score': content.score,
-            'created_utc': content.created_utc
-        }
-        
-        # Add content-specific data
-        if content_type == 'post':
-            base_data.update({
-                'title': content.title,
-                'selftext': content.selftext,
-                'permalink': f"https://www.reddit.com{content.permalink}",
-                'url': content.url if hasattr(content, 'url') else None
-            })
-        else:  # comment
-            base_data.update({
-                'comment': content.body,
-                'permalink': f"https://www.reddit.com{content.permalink}"
-            })
-        
-        # First pass: Basic keyword filtering - ONLY for people seeking practice
-        practice_seeking_keywords = [
-            # Direct practice requests (first person)
-            'i need', 'i want', 'i am looking', 'i\'m looking', 'looking for', 'need someone',
-            'seeking', 'searching for', 'trying to find', 'anyone want to', 'anyone know',
-            
-            # Practice-specific terms
-            'practice speaking', 'speaking practice', 'conversation practice', 'practice english',
-            'practice partner', 'conversation partner', 'speaking partner', 'language exchange',
-            'study buddy', 'speaking buddy', 'practice with', 'talk with', 'chat with',
-            
-            # Community seeking
-            'discord server', 'discord group', 'english discord', 'practice group', 'study group',
-            'english community', 'speaking club', 'conversation group', 'voice chat',
-            
-            # Questions about practice
-            'how can i practice', 'where can i practice', 'how to practice', 'best way to practice',
-            'apps for practice', 'websites for practice', 'where to practice', 'how do i practice',
+        with trace.span('praw_attributes'):
+            base_data = {
+                'timestamp': datetime.now().isoformat(),
+                'content_type': content_type,
+                'subreddit': content.subreddit.display_name,
+                'author': username,
+                'similarity_score': similarity_score,
+                'best_matching_topic': best_matching_topic,
+                'reddit_score': content.score,
+                'created_utc': content.created_utc
+            }
             
-            # Confidence/fear related to speaking
-            'afraid to speak', 'scared to speak', 'nervous about speaking', 'shy to speak',
-            'confidence in speaking', 'embarrassed about', 'anxious about speaking'
-        ]
+            # Add content-specific data
+            if content_type == 'post':
+                base_data.update({
+                    'title': content.title,
+                    'selftext': content.selftext,
+                    'permalink': f"https://www.reddit.com{content.permalink}",
+                    'url': content.url if hasattr(content, 'url') else None
+                })
+            else:  # comment
+                base_data.update({
+                    'comment': content.body,
+                    'permalink': f"https://www.reddit.com{content.permalink}"
+                })
         
-        has_practice_keywords = any(keyword in text_content for keyword in practice_seeking_keywords)
+        # First pass: Basic keyword filtering - ONLY for people seeking practice
+        with trace.span('keyword_scan'):
+            if keyword_hits is None:
+                keyword_hits = KEYWORD_GATES.scan(text_content)
+            has_practice_keywords = bool(keyword_hits['practice'])
         
         if not has_practice_keywords:
             # Save to filtered content
@@ -620,106 +858,149 @@ def process_content(content, content_type):
                 'filter_reason': 'no_practice_keywords',
                 'filter_description': 'Content does not contain practice-seeking keywords'
             })
-            save_filtered_content_to_json(filtered_data)
-            filtered_no_practice_keywords_count += 1
+            filtered_data['stage_timings_ms'] = trace.as_ms()
+            with trace.span('file_write'):
+                save_filtered_content_to_json(filtered_data)
+            items_filtered.labels(reason='no_practice_keywords').inc()
             return
         
         # Negative keyword filtering - exclude irrelevant content
-        negative_keywords = [
-            # Commercial/spam
-            'translate', 'translation service', 'homework help', 'essay writing service',
-            'pay for', 'selling', 'buy my', 'crypto', 'bitcoin', 'investment',
-            'spam', 'advertisement', 'promotion', 'affiliate', 'referral code',
-            
-            # General discussion/debate (not seeking practice)
-            'totally representative', 'isolated case', 'asshole', 'population',
-            'heard something recently', 'generally due to', 'step back', 'forest for the trees',
-            'in my opinion', 'i think that', 'personally i believe', 'from my experience',
-            'it depends on', 'there are many factors', 'it varies', 
-            
-            # Academic/theoretical discussions
-            'research shows', 'studies indicate', 'according to', 'evidence suggests',
-            'linguistically speaking', 'from a linguistic perspective', 'grammar rules',
-            'language acquisition theory', 'second language acquisition',
-            
-            # Giving advice (not seeking)
-            'you should', 'i recommend', 'try this', 'what works for me',
-            'in my experience', 'i suggest', 'my advice would be'
-        ]
-        
-        matching_negative_keywords = [neg_keyword for neg_keyword in negative_keywords if neg_keyword in text_content]
+        matching_negative_keywords = keyword_hits['negative']
         if matching_negative_keywords:
-            print(f"🚫 Filtered out due to negative keywords: {display_text[:100]}...")
+            log.info("🚫 Filtered out due to negative keywords: %s...", display_text[:100],
+                     extra={'event': 'filtered', 'reason': 'negative_keywords', 'fullname': content.fullname})
             filtered_data = base_data.copy()
             filtered_data.update({
                 'filter_reason': 'negative_keywords',
                 'filter_description': f'Content contains negative keywords: {", ".join(matching_negative_keywords)}'
             })
-            save_filtered_content_to_json(filtered_data)
-            filtered_negative_keywords_count += 1
+            filtered_data['stage_timings_ms'] = trace.as_ms()
+            with trace.span('file_write'):
+                save_filtered_content_to_json(filtered_data)
+            items_filtered.labels(reason='negative_keywords').inc()
             return
         
         # Additional check: Must contain seeking/question language for first person
-        seeking_indicators = [
-            'i need', 'i want', 'i am looking', 'i\'m looking', 'looking for',
-            'how can i', 'where can i', 'how do i', 'where do i', 'help me',
-            'anyone know', 'does anyone', 'can someone', 'recommendations for',
-            'suggestions for', 'advice on', 'tips for', 'seeking'
-        ]
-        
-        has_seeking_language = any(indicator in text_content for indicator in seeking_indicators)
+        has_seeking_language = bool(keyword_hits['seeking'])
         
         if not has_seeking_language:
-            print(f"🚫 Filtered out - no seeking language: {display_text[:100]}...")
+            log.info("🚫 Filtered out - no seeking language: %s...", display_text[:100],
+                     extra={'event': 'filtered', 'reason': 'no_seeking_language', 'fullname': content.fullname})
             filtered_data = base_data.copy()
             filtered_data.update({
                 'filter_reason': 'no_seeking_language',
                 'filter_description': 'Content does not contain seeking/question language indicators'
             })
-            save_filtered_content_to_json(filtered_data)
-            filtered_no_seeking_language_count += 1
+            filtered_data['stage_timings_ms'] = trace.as_ms()
+            with trace.span('file_write'):
+                save_filtered_content_to_json(filtered_data)
+            items_filtered.labels(reason='no_seeking_language').inc()
+            return
+        
+        # Degraded mode: the embedding call failed, so park the candidate until Cohere recovers
+        if embedding is None:
+            defer_content(content, content_type, 'embedding')
             return
         
+        # A sample of what only a calibrated threshold filters still goes to the LLM, so calibration sees it
+        weight = 1.0
+        if (not is_relevant and similarity_score > BASE_SIMILARITY_THRESHOLD and llm_verdicts is not None
+                and verdict_log.sampled(content.fullname, SIMILARITY_EXPLORE_RATE, 'similarity')):
+            is_relevant, weight = True, 1 / SIMILARITY_EXPLORE_RATE
+            llm_explored.labels(gate='similarity').inc()
+        
         # Embedding-based filtering
         if not is_relevant:
-            print(f"🚫 Filtered out - low similarity score ({similarity_score:.2f}): {display_text[:100]}...")
+            log.info("🚫 Filtered out - low similarity score (%.2f): %s...", similarity_score, display_text[:100],
+                     extra={'event': 'filtered', 'reason': 'low_similarity', 'fullname': content.fullname})
             filtered_data = base_data.copy()
             filtered_data.update({
                 'filter_reason': 'low_similarity',
                 'filter_description': f'Similarity score ({similarity_score:.2f}) below threshold'
             })
-            save_filtered_content_to_json(filtered_data)
-            filtered_low_similarity_count += 1
+            filtered_data['stage_timings_ms'] = trace.as_ms()
+            with trace.span('file_write'):
+                save_filtered_content_to_json(filtered_data)
+            items_filtered.labels(reason='low_similarity').inc()
             return
         
-        # Final LLM verification using Cohere
-        llm_verified, llm_reasoning = verify_with_llm(text_content)
+        # Local pre-screen: confident verdicts skip the LLM round trip (items sampled past the similarity gate always reach it)
+        verdict, probability = 'uncertain', None
+        if prescreen_model is not None and embedding is not None and weight == 1.0:
+            with trace.span('prescreen'):
+                verdict, probability = prescreen_model.decide(embedding, similarity_score)
+        if (verdict != 'uncertain' and llm_verdicts is not None
+                and verdict_log.sampled(content.fullname, PRESCREEN_EXPLORE_RATE, 'prescreen')):
+            verdict, weight = 'uncertain', 1 / PRESCREEN_EXPLORE_RATE  # The LLM decides it and the log keeps it for retraining
+            llm_explored.labels(gate='prescreen').inc()
+        
+        if verdict == 'reject':
+            log.info("🚫 Filtered out - pre-screen rejected (p=%.2f): %s...", probability, display_text[:100],
+                     extra={'event': 'filtered', 'reason': 'prescreen_rejected', 'fullname': content.fullname})
+            filtered_data = base_data.copy()
+            filtered_data.update({
+                'filter_reason': 'prescreen_rejected',
+                'filter_description': f'Local pre-screen probability {probability:.2f} below {prescreen_model.reject_below:.2f}'
+            })
+            filtered_data['stage_timings_ms'] = trace.as_ms()
+            with trace.span('file_write'):
+                save_filtered_content_to_json(filtered_data)
+            items_filtered.labels(reason='prescreen_rejected').inc()
+            return
+        
+        if 'llm' in resumed:
+            llm_verified, llm_reasoning = resumed['llm']
+        elif verdict == 'accept':
+            llm_verified, llm_reasoning = True, f"YES - Local pre-screen accepted (p={probability:.2f})"
+        else:
+            # Final LLM verification using Cohere
+            with trace.span('llm'):
+                llm_verified, llm_reasoning = verify_with_llm(text_content)
+            if llm_verified is not None:
+                record_stage(content, 'llm', [llm_verified, llm_reasoning])
+                if llm_verdicts is not None:
+                    llm_verdicts.record(content, similarity_score, best_matching_topic, embedding, llm_verified, weight)
+        
+        if llm_verified is None:
+            defer_content(content, content_type, 'llm')
+            return
         
         if not llm_verified:
-            print(f"🚫 Filtered out - LLM verification failed: {display_text[:100]}...")
-            print(f"   LLM Reasoning: {llm_reasoning}")
+            log.info("🚫 Filtered out - LLM verification failed: %s...\n   LLM Reasoning: %s", display_text[:100], llm_reasoning,
+                     extra={'event': 'filtered', 'reason': 'llm_verification_failed', 'fullname': content.fullname})
             filtered_data = base_data.copy()
             filtered_data.update({
                 'filter_reason': 'llm_verification_failed',
                 'filter_description': f'LLM verification: {llm_reasoning}'
             })
-            save_filtered_content_to_json(filtered_data)
-            filtered_llm_failed_count += 1
+            filtered_data['stage_timings_ms'] = trace.as_ms()
+            with trace.span('file_write'):
+                save_filtered_content_to_json(filtered_data)
+            items_filtered.labels(reason='llm_verification_failed').inc()
             return
         
-        print(f"🔍 Found potential English learning lead in {content_type}: {display_text}")
-        print(f"   ✅ LLM Verified: {llm_reasoning}")
+        log.info("🔍 Found potential English learning lead in %s: %s\n   ✅ LLM Verified: %s", content_type, display_text, llm_reasoning,
+                 extra={'event': 'candidate', 'fullname': content.fullname})
 
         # Content passed all filters - it's a valid lead
+        # Another worker may be reporting the same user right now (distributed mode)
+        if 'lead' not in resumed and not claim_lead(username, content):
+            log.info("⏭️ Skipping u/%s - already reported by another worker", username,
+                     extra={'event': 'skipped', 'fullname': content.fullname})
+            return
+        
         # Record this user as an identified lead to prevent duplicates
-        record_identified_lead(username)
+        with trace.span('file_write'):
+            record_identified_lead(username)
+        record_stage(content, 'lead')
         
         lead_data = base_data.copy()
         lead_data.update({
             'responded': False,
             'dm_sent': False,
             'email_sent': False,
-            'llm_verification': llm_reasoning
+            'llm_verification': llm_reasoning,
+            'verified_by': 'prescreen' if verdict == 'accept' else 'llm'
         })
         
         # Display the lead
@@ -738,82 +1019,305 @@ def process_content(content, content_type):
         print(f"🎯 Best Matching Topic: {best_matching_topic}")
         print(f"📊 Reddit Score: {content.score}")
         
-        # Note: Lead will be saved to english_leads_{today}.json below
+        # Note: Lead is saved to english_leads_{today}.json before responding
         # Email digest script reads directly from that file
         
-        # Try to respond if enabled
-        if (AUTO_RESPOND or SEND_DMS) and reddit_write:
-            responded = respond_to_content(reddit_write, content, content_type, text_content)
-            lead_data['responded'] = responded
-            if responded:
-                print("✅ Response sent!")
-        
         print("===========================\n")
         
-        leads_found_count += 1
+        leads_found.inc()
 
-        # Save to JSON
-        save_lead_to_json(lead_data)
+        # Save to JSON once, even if the item is redelivered after a crash
+        lead_data['stage_timings_ms'] = trace.as_ms()
+        lead_data['freshness_seconds'] = freshness_tracker.observe(content, trace.spans)
+        if 'saved' not in resumed:
+            with trace.span('file_write'):
+                save_lead_to_json(lead_data)
+            record_stage(content, 'saved')
+        
+        # Try to respond if enabled (never twice for a redelivered item)
+        if (AUTO_RESPOND or SEND_DMS) and reddit_write and 'responded' not in resumed:
+            with trace.span('respond'):
+                responded = respond_to_content(reddit_write, content, content_type, text_content)
+            record_stage(content, 'responded', responded)
+            lead_data['responded'] = responded
+            if responded:
+                print("✅ Response sent!")
         
+    except sink.CommitError:
+        raise  # The lead is not on disk: the caller must not acknowledge the item
     except Exception as e:
-        print(f"⚠️ Error processing {content_type}: {e}")
-        errors_processing_count += 1
+        log.error("⚠️ Error processing %s: %s", content_type, e)
+        errors_total.labels(kind='processing').inc()
+    finally:
+        trace.finish()
 
-try:
-    import threading
-    import queue
+def main():
+    """Initialize clients, then stream and/or process posts and comments depending on BOT_ROLE"""
+    bot_logging.configure("english", LOG_LEVEL, LOG_JSON, LOG_EVENT_RATE, LOG_EVENT_BURST)
+    if BOT_ROLE != 'ingest':
+        init_cohere_client()
+        load_target_embeddings()
+        load_similarity_thresholds()
+        load_prescreen_model()
+        open_llm_verdict_log()
+        load_deferred_queue()
+        load_identified_leads()
+    setup_reddit()
+    memory_governor.freeze_startup_heap()  # Everything loaded so far lives for the whole run
+    sink.exit_on_sigterm()  # Stopping the service still flushes buffered lead files
     
-    # Create a queue for processing content
-    content_queue = queue.Queue()
-    
-    def monitor_posts():
-        """Monitor new posts"""
-        try:
-            for post in subreddit.stream.submissions(skip_existing=True):
-                content_queue.put(('post', post))
-        except Exception as e:
-            print(f"⚠️ Error monitoring posts: {e}")
-    
-    def monitor_comments():
-        """Monitor new comments"""
-        try:
-            for comment in subreddit.stream.comments(skip_existing=True):
-                content_queue.put(('comment', comment))
-        except Exception as e:
-            print(f"⚠️ Error monitoring comments: {e}")
+    print(f"🚀 Monitoring {len(TARGET_SUBREDDITS)} subreddits for English learning leads...")
+    print(f"📍 Target subreddits: {', '.join(TARGET_SUBREDDITS)}")
+    print(f"🤖 Auto-respond: {'ON' if AUTO_RESPOND else 'OFF'}")
+    print(f"📩 Direct messages: {'ON' if SEND_DMS else 'OFF'}")
+    print(f"🧩 Role: {BOT_ROLE}" + (f" (worker {WORKER_ID})" if BOT_ROLE == 'worker' else ""))
     
-    # Start monitoring threads
-    post_thread = threading.Thread(target=monitor_posts, daemon=True)
-    comment_thread = threading.Thread(target=monitor_comments, daemon=True)
-    
-    # Start memory cleanup thread
-    cleanup_thread = threading.Thread(target=cleanup_memory, daemon=True)
-    
-    post_thread.start()
-    comment_thread.start()
-    cleanup_thread.start()
-    
-    print("🔄 Monitoring both posts and comments for English learning leads...")
-    print("🧹 Memory cleanup running in background (hourly)")
-    print("💡 Tip: Set AUTO_RESPOND=True, SEND_DMS=True to automatically engage with leads")
+    try:
+        import threading
+        import queue
+        
+        # Create a queue for processing content (on disk with WORK_QUEUE_FILE)
+        content_queue = open_work_queue() or scheduling.PriorityContentQueue()
+        metrics.gauge("queue_depth", "Items waiting in the processing queue").set_function(content_queue.qsize)
+        metrics.gauge("deferred_queue_depth", "Items parked until Cohere recovers").set_function(lambda: len(deferred))
+        
+        # Expose metrics
+        if METRICS_PORT:
+            try:
+                metrics.start_http_server(metrics_port())
+                print(f"📊 Metrics served at http://127.0.0.1:{metrics_port()}/metrics")
+            except OSError as e:
+                log.error("⚠️ Metrics port %d unavailable, continuing without /metrics: %s", metrics_port(), e)
+        if METRICS_SNAPSHOT_FILE:
+            metrics.start_snapshot_writer(role_path(METRICS_SNAPSHOT_FILE), METRICS_SNAPSHOT_INTERVAL)
+        
+        # Opt-in profiler, toggled by SIGUSR1 without restarting the bot
+        if PROFILE_MODE:
+            profiling.install_profiler_toggle(PROFILE_MODE, PROFILE_DIR, label="english", start=PROFILE_ON_START)
+            print(f"🔬 {PROFILE_MODE} profiler ready: kill -USR1 {os.getpid()} to start/stop (output in {PROFILE_DIR}/)")
+        
+        # Optional corpus capture of everything the streams yield
+        recorder = None
+        if RECORD_CORPUS_DIR:
+            recorder = corpus.CorpusRecorder(
+                RECORD_CORPUS_DIR, prefix="english", sample_rate=RECORD_SAMPLE_RATE,
+                rotate_bytes=RECORD_ROTATE_MB * 1024 * 1024,
+            )
+            metrics.gauge("corpus_records_recorded", "Streamed items written to the corpus").set_function(lambda: recorder.recorded)
+            metrics.gauge("corpus_records_dropped", "Streamed items dropped because the corpus writer fell behind").set_function(lambda: recorder.dropped)
+            print(f"📼 Recording {RECORD_SAMPLE_RATE:.0%} of streamed items to {RECORD_CORPUS_DIR}/")
+        
+        def timed_stream(stream):
+            """Yield stream items, recording how long each praw fetch blocked"""
+            fetch_latency = stage_latency.labels(stage='praw_fetch')
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(stream)
+                except StopIteration:
+                    return
+                fetch_latency.observe(time.perf_counter() - started)
+                yield item
+        
+        # Watch RSS and structure sizes; evict and collect only when over budget, then slow intake
+        governor = memory_governor.MemoryGovernor(MEMORY_BUDGET_MB)
+        governor.track("content_queue", content_queue.qsize)
+        governor.track("identified_leads", lambda: len(identified_leads))
+        governor.track("recent_interactions", lambda: len(recent_interactions))
+        governor.track("deferred_queue", lambda: len(deferred))
+        governor.add_evictor("recent_interactions", recent_interactions.expire)
+        governor.add_evictor("identified_leads", lambda: identified_leads.expire())
+        governor.start()
+        
+        # Resume from the last processed items instead of skipping the downtime
+        checkpoint = checkpoints.IngestionCheckpoint(CHECKPOINT_FILE)
+        if work_queue is not None and BOT_ROLE != 'worker':
+            # Items resumed from the durable queue must not be queued again by backfill,
+            # and hold their subreddit's position until they are processed like freshly queued ones
+            for content_type, content in work_queue.pending_items():
+                checkpoint.claim(content.fullname)
+                if BOT_ROLE == 'all':
+                    checkpoint.enqueued(content_type, content)
+        
+        # This instance's share of TARGET_SUBREDDITS (all of them unless INSTANCE_COUNT or PARTITION_LEASE_DIR is set)
+        partition = partitioning.SubredditPartition(
+            TARGET_SUBREDDITS, INSTANCE_ID, INSTANCE_COUNT, lease_dir=PARTITION_LEASE_DIR, name="english",
+            lease_seconds=PARTITION_LEASE_SECONDS,
+            processed=lambda: {content_type: dict(positions) for content_type, positions in checkpoint.positions.items()},
+        )
+        supervisors = []
+        sharded = []
+        
+        def ingest(content_type, content):
+            """Queue an item unless another instance owns its subreddit or it was already queued or processed"""
+            if not partition.owns(content.subreddit.display_name):
+                return
+            if not checkpoint.claim(content.fullname):
+                return
+            if recorder:
+                recorder.record(content, content_type)
+            governor.wait_for_headroom(content_queue.qsize)  # Over the memory budget: let the backlog drain first
+            freshness_tracker.ingested(content)
+            prioritize(content, content_type)
+            checkpoint.enqueued(content_type, content)
+            content_queue.put((content_type, content))
+            partition.record(content_type, content)
+            if BOT_ROLE == 'ingest':
+                checkpoint.mark_processed(content_type, content)  # The broker holds it durably now
+        
+        def idle_stream():
+            """Empty polls while this instance owns no subreddits; restarted when it is given some"""
+            while True:
+                yield None
+                time.sleep(5)
+        
+        def post_stream():
+            """Posts missed since the checkpoint, then new posts (None = empty poll)"""
+            names = partition.owned_subreddits()
+            if not names:
+                yield from idle_stream()
+            resuming = checkpoint.has_position('post')
+            yield from checkpoint.backfill(reddit_read, names, 'post', BACKFILL_MAX_ITEMS)
+            yield from timed_stream(reddit_read.subreddit("+".join(names)).stream.submissions(skip_existing=not resuming, pause_after=0))
+        
+        def comment_stream():
+            """Comments missed since the checkpoint, then new comments (None = empty poll)"""
+            names = partition.owned_subreddits()
+            if not names:
+                yield from idle_stream()
+            resuming = checkpoint.has_position('comment')
+            yield from checkpoint.backfill(reddit_read, names, 'comment', BACKFILL_MAX_ITEMS)
+            yield from timed_stream(reddit_read.subreddit("+".join(names)).stream.comments(skip_existing=not resuming, pause_after=0))
+        
+        def rebalance(acquired, released):
+            """Start taken-over subreddits from their previous owner's position and restart the streams"""
+            for content_type, positions in partition.handoff_positions(acquired).items():
+                for name, position in positions.items():
+                    checkpoint.adopt_position(content_type, name, position)
+            if PARTITION_LEASE_DIR or INSTANCE_COUNT > 1:
+                print(f"🧩 Instance {INSTANCE_ID} of {len(partition.members)}: {len(partition.owned_subreddits())} subreddits "
+                      f"(+{len(acquired)} -{len(released)})")
+            for ingestion in sharded:
+                ingestion.set_subreddits(partition.owned_subreddits())
+            for supervisor in supervisors:
+                supervisor.restart()
+        
+        # Start supervised monitoring streams (restarted with backoff if they fail or stall);
+        # workers only consume from the broker
+        if BOT_ROLE != 'worker':
+            if not PARTITION_LEASE_DIR and INSTANCE_ID not in [str(i) for i in range(INSTANCE_COUNT)]:
+                print(f"⚠️ INSTANCE_ID must be 0..{INSTANCE_COUNT - 1} when INSTANCE_COUNT={INSTANCE_COUNT}")
+                exit(1)
+            partition.start(rebalance)
+            if SHARDED_INGESTION:
+                print("🧩 Probing subreddit activity to plan sharded streams...")
+                for content_type in ('post', 'comment'):
+                    sharded.append(sharding.ShardedIngestion(
+                        reddit_read, partition.owned_subreddits(), content_type,
+                        on_item=lambda content, content_type=content_type: ingest(content_type, content),
+                        backfill=lambda names, content_type=content_type: checkpoint.backfill(
+                            reddit_read, names, content_type, BACKFILL_MAX_ITEMS
+                        ),
+                        max_shards=MAX_SHARDS, stale_after=STREAM_STALE_SECONDS,
+                    ).start())
+            else:
+                supervisors.append(stream_supervisor.StreamSupervisor(
+                    "posts", post_stream, lambda post: ingest('post', post), STREAM_STALE_SECONDS
+                ).start())
+                supervisors.append(stream_supervisor.StreamSupervisor(
+                    "comments", comment_stream, lambda comment: ingest('comment', comment), STREAM_STALE_SECONDS
+                ).start())
+        
+        def retry_deferred():
+            """Re-queue deferred items once Cohere calls can go through again"""
+            while True:
+                time.sleep(DEFERRED_RETRY_SECONDS)
+                if not deferred.waiting() or not (embed_breaker.available() and chat_breaker.available()):
+                    continue
+                # While a circuit is half-open, send a single item as the probe
+                recovered = embed_breaker.state == circuit_breaker.CLOSED and chat_breaker.state == circuit_breaker.CLOSED
+                entries = deferred.take(100 if recovered else 1)
+                try:
+                    found = {item.fullname: item for item in reddit_read.info(fullnames=[entry['fullname'] for entry in entries])}
+                except Exception as e:
+                    print(f"⚠️ Error fetching deferred items: {e}")
+                    for entry in entries:
+                        deferred.release(entry['fullname'])
+                    continue
+                for entry in entries:
+                    content = found.get(entry['fullname'])
+                    if content is None:
+                        deferred.resolve(entry['fullname'])  # Gone from Reddit
+                    else:
+                        freshness_tracker.ingested(content)
+                        prioritize(content, entry['content_type'])
+                        content_queue.put((entry['content_type'], content))
+                print(f"🔁 Retrying {len(found)} deferred items ({deferred.waiting()} still waiting)")
+        
+        if BOT_ROLE != 'ingest':
+            threading.Thread(target=retry_deferred, name="deferred-retry", daemon=True).start()
+        
+        # Start memory cleanup thread
+        cleanup_thread = threading.Thread(target=cleanup_memory, daemon=True)
+        cleanup_thread.start()
+        
+        print("🔄 Monitoring both posts and comments for English learning leads...")
+        print("🧹 Memory cleanup running in background (hourly)")
+        print("💡 Tip: Set AUTO_RESPOND=True, SEND_DMS=True to automatically engage with leads")
+        
+        if BOT_ROLE == 'ingest':
+            # Streams publish to the broker from their own threads; workers do the processing
+            while True:
+                time.sleep(60)
+        
+        # Process content from queue
+        while True:
+            try:
+                content_type, content = content_queue.get(timeout=1)
+                keyword_hits = scan_keywords(content, content_type)
+                
+                action = shedder.decide(content, prioritizer.promising(keyword_hits), content_queue.qsize())
+                if action == 'defer':
+                    # Stale but possibly a lead: goes behind the backlog instead of being dropped
+                    content.priority = scheduling.DEFERRED_PRIORITY
+                    content_queue.put((content_type, content))
+                    content_queue.task_done()
+                    continue
+                if action == 'shed':
+                    log.info(
+                        "🗑️ Shed stale %s from r/%s (%.0fs old, %d queued)",
+                        content_type, content.subreddit.display_name, time.time() - content.created_utc,
+                        content_queue.qsize(), extra={'event': 'shed', 'fullname': content.fullname}
+                    )
+                else:
+                    freshness_tracker.dequeued(content)
+                    leads_before = leads_found.value
+                    try:
+                        process_content(content, content_type, keyword_hits)
+                    except sink.CommitError as e:
+                        log.error("⚠️ Lead from %s not saved, delivering it again: %s", content.fullname, e)
+                        content_queue.release()
+                        continue
+                    prioritizer.record_outcome(content.subreddit.display_name, leads_found.value > leads_before)
+                if BOT_ROLE == 'all':
+                    checkpoint.mark_processed(content_type, content)
+                deferred.resolve(content.fullname)
+                content_queue.task_done()
+                if action == 'shed':
+                    continue  # Never processed, so no throttle
+                
+                # Periodic progress summary every 100 items
+                if items_processed.total() % 100 == 0:
+                    print_progress_summary("Every 100")
+                
+                freshness_tracker.sleep(2)  # Rate limiting (slightly slower for politeness)
+            except queue.Empty:
+                continue
     
-    # Process content from queue
-    while True:
-        try:
-            content_type, content = content_queue.get(timeout=1)
-            process_content(content, content_type)
-            content_queue.task_done()
-            
-            # Periodic garbage collection every 100 items
-            if processed_count % 100 == 0:
-                gc.collect()
-                print_progress_summary("Every 100")
-            
-            time.sleep(2)  # Rate limiting (slightly slower for politeness)
-        except queue.Empty:
-            continue
-
-except KeyboardInterrupt:
-    print("\n🛑 English learning lead monitoring stopped by user.")
-except Exception as e:
-    print(f"⚠️ Error: {e}")
\ No newline at end of file
+    except KeyboardInterrupt:
+        print("\n🛑 English learning lead monitoring stopped by user.")
+    except Exception as e:
+        print(f"⚠️ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Freshness
+Time-to-lead: how long after a post or comment was created (created_utc) the
+bot saved it as a lead, and where that time went:
+
+    poll_lag     created -> ingested (stream polling, backfill, or the wait
+                 for Cohere to recover when the item was deferred)
+    queue_wait   ingested -> taken off the queue, minus the throttle
+    throttle     time the consumer slept between items (the politeness
+                 sleep) while this item was waiting
+    embedding    the embedding stage
+    llm          the LLM verification stage
+    processing   the rest of process_content (attribute fetches, keyword
+                 scans, prescreen, responding)
+    total        created -> lead saved
+
+The breakdown is saved on each lead as `freshness_seconds` and observed into
+lead_freshness_seconds{subreddit, stage}, whose snapshot gives p50/p95/p99
+per subreddit and stage (subreddit "all" for every lead). A lead whose total
+is over alert_seconds is printed with its breakdown and counted in
+lead_freshness_alerts_total{subreddit}.
+
+    python3 freshness.py --bot english --days 7
+
+reads the saved lead files and prints exact percentiles per subreddit and
+stage.
+
+Timestamps are wall-clock (time.time), as created_utc is. The ingest time
+travels with the item through the durable work queue and broker; the
+throttle is only known to the process that slept, so with separate ingest and
+worker processes it is measured by the worker.
+"""
+
+import os
+import glob
+import json
+import math
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from collections import deque
+import metrics
+
+STAGES = ('poll_lag', 'queue_wait', 'throttle', 'embedding', 'llm', 'processing', 'total')
+
+# Seconds; from a lead caught within a poll up to one found a day late by backfill
+FRESHNESS_BUCKETS = (5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 900.0, 1800.0, 3600.0, 7200.0, 21600.0, 86400.0)
+
+lead_freshness = metrics.histogram(
+    "lead_freshness_seconds", "Time from creation to lead, by stage", ["subreddit", "stage"], buckets=FRESHNESS_BUCKETS
+)
+freshness_alerts = metrics.counter(
+    "lead_freshness_alerts_total", "Leads saved later than the freshness alert threshold", ["subreddit"]
+)
+
+
+class FreshnessTracker:
+    def __init__(self, alert_seconds=0.0, max_sleeps=10000, clock=time.time, sleep=time.sleep):
+        self.alert_seconds = alert_seconds  # 0 = no alerts
+        self.clock = clock
+        self._sleep = sleep
+        self._sleeps = deque(maxlen=max_sleeps)  # (started, ended) of consumer throttle sleeps
+        self._lock = threading.Lock()
+
+    def ingested(self, content):
+        """Stamp an item as it is queued"""
+        content.ingested_at = self.clock()
+
+    def dequeued(self, content):
+        """Stamp an item as the consumer takes it off the queue"""
+        content.dequeued_at = self.clock()
+
+    def sleep(self, seconds):
+        """The consumer's throttle sleep, remembered so waiting items can be charged for it"""
+        started = self.clock()
+        self._sleep(seconds)
+        with self._lock:
+            self._sleeps.append((started, self.clock()))
+
+    def throttled_between(self, start, end):
+        """Seconds of throttle sleep that fell between start and end"""
+        with self._lock:
+            sleeps = list(self._sleeps)
+        return sum(max(0.0, min(end, ended) - max(start, started)) for started, ended in sleeps)
+
+    def breakdown(self, content, spans, now=None):
+        """Seconds per stage for an item about to be saved as a lead; None if it was never stamped"""
+        ingested_at = getattr(content, 'ingested_at', None)
+        if ingested_at is None:
+            return None  # Not from the live streams (replay, scripts)
+        now = self.clock() if now is None else now
+        dequeued_at = getattr(content, 'dequeued_at', None) or ingested_at
+        throttle = self.throttled_between(ingested_at, dequeued_at)
+        embedding = spans.get('embedding', 0.0)
+        llm = spans.get('llm', 0.0)
+        seconds = {
+            'poll_lag': ingested_at - content.created_utc,
+            'queue_wait': dequeued_at - ingested_at - throttle,
+            'throttle': throttle,
+            'embedding': embedding,
+            'llm': llm,
+            'processing': now - dequeued_at - embedding - llm,
+            'total': now - content.created_utc,
+        }
+        return {stage: round(max(0.0, value), 3) for stage, value in seconds.items()}
+
+    def observe(self, content, spans):
+        """Breakdown for a lead, recorded per subreddit and stage; alerts if the lead is late"""
+        seconds = self.breakdown(content, spans)
+        if seconds is None:
+            return None
+        subreddit = content.subreddit.display_name.lower()
+        for stage, value in seconds.items():
+            lead_freshness.labels(subreddit=subreddit, stage=stage).observe(value)
+            lead_freshness.labels(subreddit='all', stage=stage).observe(value)
+        if self.alert_seconds and seconds['total'] > self.alert_seconds:
+            freshness_alerts.labels(subreddit=subreddit).inc()
+            print(
+                f"🐢 Lead in r/{subreddit} found {seconds['total']:.0f}s after posting "
+                f"(over {self.alert_seconds:.0f}s): " + ", ".join(
+                    f"{stage}={value:.1f}s" for stage, value in seconds.items() if stage != 'total'
+                )
+            )
+        return seconds
+
+    def summary(self):
+        """'p50/p95 total, biggest stage' for the progress line, or None before the first lead"""
+        total = lead_freshness.labels(subreddit='all', stage='total')
+        if not total.count:
+            return None
+        slowest = max(
+            (stage for stage in STAGES if stage != 'total'),
+            key=lambda stage: lead_freshness.labels(subreddit='all', stage=stage).sum,
+        )
+        return f"{total.quantile(0.5):.0f}s/{total.quantile(0.95):.0f}s (mostly {slowest})"
+
+
+# ==== OFFLINE REPORT ====
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def load_breakdowns(prefix, directory=".", days=None):
+    """(subreddit, freshness_seconds) for every saved lead that has one"""
+    since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d') if days else ""
+    found = []
+    for path in sorted(glob.glob(os.path.join(directory, f"{prefix}_leads_*.json"))):
+        if os.path.basename(path)[len(prefix) + 7:-5] < since:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for lead in json.load(f):
+                if lead.get('freshness_seconds'):
+                    found.append((str(lead.get('subreddit', '')).lower(), lead['freshness_seconds']))
+    return found
+
+
+def report(breakdowns):
+    """{subreddit: {stage: {count, p50, p90, p99}}}, with an 'all' entry"""
+    by_subreddit = {}
+    for subreddit, seconds in breakdowns:
+        for name in (subreddit, 'all'):
+            stages = by_subreddit.setdefault(name, {})
+            for stage, value in seconds.items():
+                stages.setdefault(stage, []).append(value)
+    return {
+        subreddit: {
+            stage: {
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p90': percentile(values, 90),
+                'p99': percentile(values, 99),
+            }
+            for stage, values in stages.items()
+        }
+        for subreddit, stages in by_subreddit.items()
+    }
+
+
+def parse_args():
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(description="Time-to-lead percentiles per subreddit and stage from saved leads")
+    parser.add_argument("--bot", choices=["english", "webindexer"], default="english", help="Whose lead files to read")
+    parser.add_argument("--data-dir", default=".", help="Directory holding the lead files")
+    parser.add_argument("--days", type=int, default=None, help="Only leads from the last N days")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    breakdowns = load_breakdowns(args.bot, args.data_dir, args.days)
+    if not breakdowns:
+        print("📭 No leads with freshness data yet")
+        return
+    table = report(breakdowns)
+    if args.json:
+        print(json.dumps(table, indent=2))
+        return
+    print(f"⏱️ Time to lead for {len(breakdowns)} leads (p50 / p90 / p99 seconds)")
+    for subreddit in sorted(table, key=lambda name: (name != 'all', -table[name]['total']['count'], name)):
+        stages = table[subreddit]
+        print(f"\nr/{subreddit} ({stages['total']['count']} leads)")
+        for stage in STAGES:
+            if stage in stages:
+                row = stages[stage]
+                print(f"  {stage:<11} {row['p50']:>9.1f} {row['p90']:>9.1f} {row['p99']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
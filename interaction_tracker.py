@@ -0,0 +1,61 @@
+"""
+Interaction Tracker
+Per-user cooldowns stored as epoch seconds. A dict answers "when did we last
+interact with this user" in O(1); a min-heap of (time, user) orders the same
+entries by age so expiry pops only what has expired instead of scanning and
+re-parsing every timestamp.
+"""
+
+import time
+import heapq
+import threading
+
+
+class InteractionTracker:
+    def __init__(self, cooldown_seconds, clock=time.time):
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self._last = {}   # username -> epoch of the latest interaction
+        self._heap = []   # (epoch, username); superseded entries are skipped on pop
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._last)
+
+    def __contains__(self, username):
+        return username in self._last
+
+    def can_interact(self, username):
+        """True if the user's cooldown has passed (or we never interacted)"""
+        last = self._last.get(username)
+        return last is None or self.clock() - last >= self.cooldown_seconds
+
+    def record(self, username, timestamp=None):
+        """Record an interaction now, or at a past epoch when reloading history"""
+        now = self.clock()
+        timestamp = now if timestamp is None else timestamp
+        with self._lock:
+            if timestamp >= self._last.get(username, timestamp):
+                self._last[username] = timestamp
+                heapq.heappush(self._heap, (timestamp, username))
+            self._expire(now)
+
+    def items(self):
+        """(username, epoch) pairs, oldest first"""
+        with self._lock:
+            return sorted(self._last.items(), key=lambda item: item[1])
+
+    def expire(self):
+        """Drop users whose cooldown has passed; returns how many were removed"""
+        with self._lock:
+            return self._expire(self.clock())
+
+    def _expire(self, now):
+        cutoff = now - self.cooldown_seconds
+        removed = 0
+        while self._heap and self._heap[0][0] <= cutoff:
+            timestamp, username = heapq.heappop(self._heap)
+            if self._last.get(username) == timestamp:
+                del self._last[username]
+                removed += 1
+        return removed
@@ -0,0 +1,23 @@
+"""
+Keyword Gates
+All of a bot's substring keyword gates in one place, scanned once per item:
+scan() returns the matched keywords per gate (`keyword in text`), and the
+consumer loop passes that scan to both the scheduler and process_content so
+no gate list is walked twice for the same item.
+
+CPython's substring search is the fastest matcher measured for these lists:
+numpy's vectorised np.char.find over a batch and a compiled alternation regex
+were both slower, so there is no batched path.
+
+    gates = KeywordGates(negative=NEGATIVE_KEYWORDS, seeking=SEEKING_INDICATORS)
+    gates.scan(text)["negative"]        # keywords that matched text
+"""
+
+
+class KeywordGates:
+    def __init__(self, **keyword_lists):
+        self.keywords = {name: list(keywords) for name, keywords in keyword_lists.items()}
+
+    def scan(self, text):
+        """Matched keywords per gate for one text"""
+        return {name: [keyword for keyword in keywords if keyword in text] for name, keywords in self.keywords.items()}
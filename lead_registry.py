@@ -0,0 +1,105 @@
+"""
+Lead Registry
+Usernames already identified as leads, remembered for a re-engagement TTL so
+the same person is not reported twice, then forgotten so memory and disk stay
+bounded.
+
+On disk this is an append-only log of "username<TAB>epoch" lines: recording
+a lead appends one line instead of rewriting the whole file. When the log
+holds more than compact_ratio lines per live lead, it is rewritten with only
+the live entries; that ratio is the only compaction schedule, so the file is
+rewritten about once per doubling, however often memory is tight. expire()
+drops expired leads from memory without touching the file. Older
+identified_*_leads.json files ({username: ISO time}) are migrated on first
+load.
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+import interaction_tracker
+
+
+class LeadRegistry:
+    def __init__(self, path=None, ttl_seconds=90 * 86400, legacy_path=None, clock=time.time,
+                 compact_ratio=2.0, min_compact_lines=1000):
+        self.path = path  # None = memory only (replays, tests)
+        self.compact_ratio = compact_ratio
+        self.min_compact_lines = min_compact_lines
+        self._leads = interaction_tracker.InteractionTracker(ttl_seconds, clock)
+        self._log_lines = 0
+        self._log = None
+        self._lock = threading.Lock()
+        if path:
+            if not os.path.exists(path) and legacy_path and os.path.exists(legacy_path):
+                self._migrate(legacy_path)
+            self._load()
+            self.compact()
+
+    def __len__(self):
+        return len(self._leads)
+
+    def __contains__(self, username):
+        return username in self._leads and not self._leads.can_interact(username)
+
+    def add(self, username):
+        """Record a newly identified lead"""
+        now = self._leads.clock()
+        self._leads.record(username, now)
+        if not self.path:
+            return
+        with self._lock:
+            self._log.write(f"{username}\t{now:.0f}\n")
+            self._log.flush()
+            self._log_lines += 1
+            due = self._log_lines > max(self.min_compact_lines, self.compact_ratio * len(self._leads))
+        if due:
+            self.compact()
+
+    def expire(self):
+        """Forget expired leads in memory; the log keeps them until the next compaction"""
+        return self._leads.expire()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                username, _, timestamp = line.rstrip('\n').partition('\t')
+                try:
+                    self._leads.record(username, float(timestamp))
+                except ValueError:
+                    continue  # Torn last line after a crash
+
+    def _migrate(self, legacy_path):
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Could not migrate {legacy_path}: {e}")
+            return
+        for username, identified_at in legacy.items():
+            try:
+                self._leads.record(username, datetime.fromisoformat(identified_at).timestamp())
+            except (TypeError, ValueError):
+                continue
+        print(f"📂 Migrated {len(legacy)} leads from {legacy_path}")
+
+    def compact(self):
+        """Rewrite the log with only unexpired leads"""
+        if not self.path:
+            return
+        self._leads.expire()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+            entries = self._leads.items()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for username, timestamp in entries:
+                    f.write(f"{username}\t{timestamp:.0f}\n")
+            os.replace(tmp_path, self.path)
+            self._log = open(self.path, 'a', encoding='utf-8')
+            self._log_lines = len(entries)
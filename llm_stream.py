@@ -0,0 +1,60 @@
+"""
+Streamed LLM Verdicts
+verify_with_llm asks for "YES/NO - reason" and only acts on the YES. With
+LLM_STREAMING the completion is streamed (cohere_client.chat_stream) and read
+only until the verdict is known: a NO closes the stream at its first token,
+so a rejection costs a couple of output tokens and one round trip instead of
+the whole completion. A YES is read to the end, since the reason is saved
+with the lead.
+
+The verdict has the same meaning as checking the finished text with
+.strip().upper().startswith("YES"): the stream is only cut short once the
+text so far can no longer turn into a YES.
+
+Metrics:
+    llm_stream_verdicts_total{verdict, early}   early = "true" when the stream was closed before it ended
+"""
+
+import metrics
+
+stream_verdicts = metrics.counter(
+    "llm_stream_verdicts_total", "Streamed LLM verdicts, by whether the stream was closed early", ["verdict", "early"]
+)
+
+
+def verdict_of(text):
+    """True/False once text decides the verdict, None while it could still become YES"""
+    answer = text.lstrip().upper()
+    if answer.startswith("YES"):
+        return True
+    if answer and not "YES".startswith(answer):
+        return False
+    return None
+
+
+def stream_verdict(chat_stream, **request):
+    """
+    Run chat_stream(**request) and read its events until the verdict is known;
+    returns (is_verified, text). Errors are raised, so a circuit breaker
+    wrapped around this call sees them.
+    """
+    events = chat_stream(**request)
+    text = ""
+    verdict = None
+    early = False
+    try:
+        for event in events:
+            if getattr(event, 'event_type', None) != 'text-generation':
+                continue
+            text += event.text
+            verdict = verdict_of(text)
+            if verdict is False:
+                early = True
+                break
+    finally:
+        close = getattr(events, 'close', None)
+        if close is not None:
+            close()  # Drops the HTTP response, so the rest of the completion isn't read
+    is_verified = bool(verdict)
+    stream_verdicts.labels(verdict='yes' if is_verified else 'no', early='true' if early else 'false').inc()
+    return is_verified, text.strip()
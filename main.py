@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 from sentence_transformers import SentenceTransformer
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
+import topic_embeddings
+import sharding
 
 # Load environment variables from .env file
 load_dotenv()
@@ -36,6 +38,11 @@ REDDIT_CLIENT_SECRET = os.environ["REDDIT_CLIENT_SECRET"]
 REDDIT_USERNAME = 'YOUR_USERNAME'
 REDDIT_PASSWORD = 'YOUR_PASSWORD'
 USER_AGENT = os.environ.get("USER_AGENT", "Reddit Chatbot Monitor v1.0")
+EMBED_PROVIDER = "sentence-transformers"
+EMBED_MODEL = "all-MiniLM-L6-v2"  # Topic artifacts are keyed by this name
+# Poll activity-balanced groups of subreddits instead of one multireddit stream
+SHARDED_INGESTION = os.environ.get("SHARDED_INGESTION", "") == "1"
+MAX_SHARDS = int(os.environ.get("MAX_SHARDS", "8"))
 
 # ==== TARGET SUBREDDITS FOR WEB DEVELOPERS & SMALL BUSINESS OWNERS ====
 TARGET_SUBREDDITS = [
@@ -46,7 +53,7 @@ TARGET_SUBREDDITS = [
 
 # ==== LOAD LOCAL EMBEDDING MODEL ====
 print("🔄 Loading embedding model...")
-model = SentenceTransformer('all-MiniLM-L6-v2')
+model = SentenceTransformer(EMBED_MODEL)
 
 # ==== TARGET TOPICS FOR FILTERING ====
 TARGET_TOPICS = [
@@ -97,9 +104,8 @@ TARGET_TOPICS = [
     "website needs interactive features"
 ]
 
-# Pre-compute embeddings for target topics
-print("🔄 Computing target topic embeddings...")
-target_embeddings = model.encode(TARGET_TOPICS)
+# Load pre-computed embeddings for target topics (see topic_embeddings.py)
+target_embeddings = topic_embeddings.get_topic_embeddings(EMBED_MODEL, TARGET_TOPICS, model.encode)
 
 # ==== FILTERING FUNCTION ====
 def is_relevant_comment(comment_text, threshold=0.4):
@@ -288,11 +294,21 @@ try:
             print(f"⚠️ Error monitoring comments: {e}")
     
     # Start monitoring threads
-    post_thread = threading.Thread(target=monitor_posts, daemon=True)
-    comment_thread = threading.Thread(target=monitor_comments, daemon=True)
-    
-    post_thread.start()
-    comment_thread.start()
+    if SHARDED_INGESTION:
+        # Busy subreddits like programming and technology get their own shards
+        print("🧩 Probing subreddit activity to plan sharded streams...")
+        for content_type in ('post', 'comment'):
+            sharding.ShardedIngestion(
+                reddit, TARGET_SUBREDDITS, content_type,
+                on_item=lambda content, content_type=content_type: content_queue.put((content_type, content)),
+                max_shards=MAX_SHARDS,
+            ).start()
+    else:
+        post_thread = threading.Thread(target=monitor_posts, daemon=True)
+        comment_thread = threading.Thread(target=monitor_comments, daemon=True)
+        
+        post_thread.start()
+        comment_thread.start()
     
     print("🔄 Monitoring both posts and comments...")
     
@@ -0,0 +1,154 @@
+"""
+Memory Governor
+Replaces periodic forced gc.collect() calls with a budget: a background
+thread samples RSS and the sizes of the bot's big structures, and only when
+RSS crosses the budget does it run the registered evictors (expire caches
+and registries in memory, without rewriting their files) and then a single
+full collection. Live cooldowns and identified leads are never dropped
+early, since that would make the bot contact users twice. If RSS is still over budget after evicting, the governor
+pushes back on intake instead: wait_for_headroom() blocks the ingesting
+threads while items are waiting, so the queue (the structure that grows with
+a backlog) drains before more is taken in, until a check finds RSS back
+under budget.
+
+freeze_startup_heap() moves everything loaded at startup (models, topic
+embeddings, settings) into the permanent generation; the bots call it as soon
+as loading is done, so full collections never traverse those objects.
+
+Every garbage collection, automatic or forced, is timed through gc.callbacks,
+since a full collection pauses the processing thread too.
+
+Metrics:
+    process_rss_mb                        resident set size
+    memory_structure_size{structure}      length of each tracked structure
+    gc_pause_seconds{generation}          histogram of collection pauses
+    memory_evictions_total{evictor}       evictor runs triggered by the budget
+    memory_intake_paused_seconds_total    time ingestion waited for the queue to drain
+"""
+
+import os
+import gc
+import time
+import threading
+import metrics
+
+process_rss = metrics.gauge("process_rss_mb", "Resident set size of the bot process in MB")
+structure_size = metrics.gauge("memory_structure_size", "Number of entries in tracked in-memory structures", ["structure"])
+gc_pause = metrics.histogram(
+    "gc_pause_seconds", "Garbage collection pause per generation", ["generation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+evictions = metrics.counter("memory_evictions_total", "Evictor runs triggered by the memory budget", ["evictor"])
+intake_paused = metrics.counter("memory_intake_paused_seconds_total", "Seconds ingestion waited while over the memory budget")
+
+
+def current_rss_mb():
+    """Current resident set size in MB (Linux /proc; None elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def freeze_startup_heap():
+    """Collect once, then keep every surviving startup object out of future collections"""
+    gc.collect()
+    gc.freeze()
+
+
+class GCPauseTimer:
+    """Times every collection via gc.callbacks"""
+
+    def __init__(self):
+        self._started = None
+        self.max_pause = 0.0
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            pause = time.perf_counter() - self._started
+            self._started = None
+            self.max_pause = max(self.max_pause, pause)
+            gc_pause.labels(generation=str(info.get("generation"))).observe(pause)
+
+    def install(self):
+        if self not in gc.callbacks:
+            gc.callbacks.append(self)
+        return self
+
+
+class MemoryGovernor:
+    def __init__(self, budget_mb=0, check_interval=30.0, collect_cooldown=600.0):
+        self.budget_mb = budget_mb  # 0 = monitor only
+        self.check_interval = check_interval
+        self.collect_cooldown = collect_cooldown
+        self.over_budget = False  # Still over after the last eviction: intake waits for the queue to drain
+        self.pause_timer = GCPauseTimer()
+        self._probes = {}
+        self._evictors = []
+        self._last_collect = 0.0
+        process_rss.set_function(current_rss_mb)
+
+    def track(self, name, size_fn):
+        """Report size_fn() as memory_structure_size{structure=name}"""
+        self._probes[name] = size_fn
+        structure_size.labels(structure=name).set_function(size_fn)
+
+    def add_evictor(self, name, evict_fn):
+        """evict_fn() frees memory when over budget, in registration order"""
+        self._evictors.append((name, evict_fn))
+
+    def wait_for_headroom(self, backlog, poll=0.5):
+        """Block while over budget and backlog() items are still queued; returns seconds waited"""
+        started = time.monotonic()
+        while self.over_budget and backlog() > 0:
+            time.sleep(poll)
+        waited = time.monotonic() - started
+        if waited >= poll:
+            intake_paused.inc(waited)
+        return waited
+
+    def sizes(self):
+        result = {}
+        for name, size_fn in self._probes.items():
+            try:
+                result[name] = size_fn()
+            except Exception:
+                result[name] = None
+        return result
+
+    def start(self):
+        self.pause_timer.install()
+        threading.Thread(target=self._run, name="memory-governor", daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️ Error checking memory budget: {e}")
+
+    def check(self):
+        """Enforce the budget once; returns True if it had to act"""
+        rss = current_rss_mb()
+        if not self.budget_mb or rss is None or rss <= self.budget_mb:
+            self.over_budget = False
+            return False
+        print(f"🧠 RSS {rss:.0f}MB over budget {self.budget_mb}MB, evicting caches ({self.sizes()})")
+        for name, evict_fn in self._evictors:
+            evict_fn()
+            evictions.labels(evictor=name).inc()
+        now = time.monotonic()
+        if now - self._last_collect >= self.collect_cooldown:
+            self._last_collect = now
+            gc.collect()
+        after = current_rss_mb()
+        self.over_budget = after is not None and after > self.budget_mb
+        print(f"🧠 RSS after eviction: {after:.0f}MB (max GC pause so far {self.pause_timer.max_pause * 1000:.1f}ms)"
+              + (", pausing intake while the queue drains" if self.over_budget else ""))
+        return True
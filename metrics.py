@@ -0,0 +1,409 @@
+"""
+Metrics
+Thread-safe counters, gauges, latency histograms and throughput meters shared
+by the bots. Metrics are exposed in Prometheus text format over a local HTTP
+endpoint and written periodically to a JSON snapshot file.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; covers a fast keyword scan up to a slow LLM round trip
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for key, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Metric:
+    """Base class for labelled metrics; each label combination is a child"""
+    type_name = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        """Return the child metric for one label combination"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels()")
+        return self._children[()]
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    @property
+    def value(self):
+        return self._default().value
+
+    def total(self):
+        """Sum over all label combinations"""
+        return sum(child.value for _, child in self.children())
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {child.value}" for key, child in self.children()]
+
+    def snapshot(self):
+        if not self.labelnames:
+            return self._default().value
+        return {",".join(key): child.value for key, child in self.children()}
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._function = None
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Compute the gauge value lazily whenever it is read"""
+        self._function = function
+
+    @property
+    def value(self):
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return float("nan")
+        return self._value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed on read"""
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+    @property
+    def value(self):
+        return self._default().value
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {child.value}" for key, child in self.children()]
+
+    def snapshot(self):
+        if not self.labelnames:
+            return self._default().value
+        return {",".join(key): child.value for key, child in self.children()}
+
+
+class _Timer:
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        self._child.observe(self.elapsed)
+        return False
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager observing the elapsed wall-clock seconds"""
+        return _Timer(self)
+
+    def state(self):
+        """(bucket counts, sum, count) read together under the lock observe() takes"""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q, state=None):
+        """Approximate quantile (upper bucket bound) from the bucket counts"""
+        counts, _, count = state or self.state()
+        if count == 0:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values (usually durations)"""
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def render(self):
+        lines = []
+        for key, child in self.children():
+            counts, total, count = child.state()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+    def snapshot(self):
+        result = {}
+        for key, child in self.children():
+            state = child.state()  # One consistent read for the count, sum and all quantiles
+            result[",".join(key) or "all"] = {
+                "count": state[2],
+                "sum": round(state[1], 6),
+                "p50": child.quantile(0.5, state),
+                "p95": child.quantile(0.95, state),
+                "p99": child.quantile(0.99, state),
+            }
+        return result
+
+
+class RateMeter:
+    """Events per second over a sliding time window"""
+
+    def __init__(self, window_seconds=60):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._events = deque()  # (timestamp, amount)
+        self._in_window = 0
+
+    def mark(self, amount=1):
+        now = time.monotonic()
+        with self._lock:
+            self._events.append((now, amount))
+            self._in_window += amount
+            self._expire(now)
+
+    def _expire(self, now):
+        cutoff = now - self.window_seconds
+        while self._events and self._events[0][0] < cutoff:
+            self._in_window -= self._events.popleft()[1]
+
+    def rate(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._in_window / self.window_seconds
+
+
+class MetricsRegistry:
+    """Named collection of metrics; creating an existing name returns it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """JSON-serialisable view of all metrics"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "timestamp": time.time(),
+            "metrics": {metric.name: metric.snapshot() for metric in metrics},
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.counter(name, help_text, labelnames)
+
+
+def gauge(name, help_text, labelnames=()):
+    return REGISTRY.gauge(name, help_text, labelnames)
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, help_text, labelnames, buckets)
+
+
+# ==== EXPORTERS ====
+def start_http_server(port, host="127.0.0.1", registry=REGISTRY):
+    """Serve /metrics (Prometheus text) and /metrics.json on a daemon thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body = json.dumps(registry.snapshot(), default=str).encode("utf-8")
+                content_type = "application/json"
+            elif self.path.startswith("/metrics"):
+                body = registry.render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep scrapes out of the bot log
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def write_snapshot(path, registry=REGISTRY):
+    """Atomically write the current metrics snapshot as JSON"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry.snapshot(), f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def start_snapshot_writer(path, interval_seconds=60, registry=REGISTRY):
+    """Write the JSON snapshot file every interval_seconds on a daemon thread"""
+
+    def run():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                write_snapshot(path, registry)
+            except Exception as e:
+                print(f"⚠️ Error writing metrics snapshot: {e}")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,229 @@
+"""
+Subreddit Partitioning
+Splits TARGET_SUBREDDITS across bot instances, so capacity is added by
+starting another instance instead of hand-editing the list per process.
+
+Subreddits are assigned on a consistent-hash ring: each instance owns
+`vnodes` points and a subreddit belongs to the instance whose point follows
+the subreddit's hash. Adding an instance only moves the subreddits that land
+on its new points (about 1/n of them, all to the new instance); removing one
+only moves that instance's subreddits.
+
+Without a lease directory the members are the fixed IDs 0..instance_count-1.
+With one (a directory every instance can reach), each instance heartbeats a
+lease file there every lease_seconds/3 and the members are the instances
+whose leases are live: a crashed instance's subreddits fail over once its
+lease expires, and a new instance is picked up without restarting the rest.
+
+Handover of a subreddit:
+    * an instance drops subreddits the ring no longer gives it straight away,
+      and stops ingesting them before publishing its new view of the members;
+    * it takes on subreddits only once every live peer has published the same
+      view, so two instances never ingest one subreddit at the same time;
+    * the new owner backfills from the position the previous owner published:
+      the newest item it ingested if it is still running (it goes on to
+      process its own queue), or its last processed item if its lease expired.
+An instance that fails to renew its lease in time stops ingesting until it
+has rejoined. Expiry uses wall-clock time, so hosts need synchronised clocks.
+
+Lease file (<lease_dir>/<name>-<instance>.lease):
+    {"instance": "1", "expires_at": 1736935890.0, "members": ["0", "1"],
+     "owned": ["englishlearning", ...],
+     "ingested": {"post": {"englishlearning": {"fullname": "t3_abc123", "created_utc": 1736935800.0}}, "comment": {...}},
+     "processed": {...}}
+"""
+
+import os
+import json
+import time
+import bisect
+import atexit
+import hashlib
+import threading
+import metrics
+
+CONTENT_TYPES = ('post', 'comment')
+
+partition_owned = metrics.gauge("partition_subreddits_owned", "Subreddits this instance ingests")
+partition_members = metrics.gauge("partition_members", "Instances the subreddit list is split across")
+partition_moves = metrics.counter("partition_moves_total", "Subreddits taken on or handed over by this instance", ["direction"])
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    def __init__(self, members, vnodes=64):
+        self.members = sorted(set(members))
+        points = sorted((ring_hash(f"{member}#{i}"), member) for member in self.members for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key):
+        """Member owning key (None on an empty ring)"""
+        if not self._owners:
+            return None
+        return self._owners[bisect.bisect(self._hashes, ring_hash(key)) % len(self._hashes)]
+
+    def assign(self, keys):
+        """{member: [keys it owns]}, keys in the order given"""
+        assignment = {member: [] for member in self.members}
+        for key in keys:
+            if self._owners:
+                assignment[self.owner(key)].append(key)
+        return assignment
+
+
+class SubredditPartition:
+    """The share of a subreddit list one instance ingests"""
+
+    def __init__(self, subreddits, instance_id, instance_count=1, lease_dir="", name="bot",
+                 lease_seconds=90.0, vnodes=64, processed=None, clock=time.time):
+        self.subreddits = list(dict.fromkeys(subreddits))
+        self.instance_id = str(instance_id)
+        self.instance_count = instance_count
+        self.lease_dir = lease_dir
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.vnodes = vnodes
+        self.processed = processed  # () -> checkpoint positions, published for failover
+        self.clock = clock
+        self.members = []
+        self.owned = set()  # Lowercased subreddit names
+        self.ingested = {content_type: {} for content_type in CONTENT_TYPES}
+        self.expires_at = float('inf')  # Own lease; never expires without a lease directory
+        self._peers = {}  # instance -> lease data from the last refresh
+        self._lock = threading.Lock()
+        partition_owned.set_function(lambda: len(self.owned))
+        partition_members.set_function(lambda: len(self.members))
+
+    @property
+    def lease_path(self):
+        return os.path.join(self.lease_dir, f"{self.name}-{self.instance_id}.lease")
+
+    def owns(self, subreddit):
+        """True if this instance should ingest the subreddit right now"""
+        return subreddit.lower() in self.owned and self.clock() < self.expires_at
+
+    def owned_subreddits(self):
+        return [name for name in self.subreddits if name.lower() in self.owned]
+
+    def record(self, content_type, content):
+        """Remember the newest ingested item per subreddit; published as the handover position"""
+        key = content.subreddit.display_name.lower()
+        with self._lock:
+            position = self.ingested[content_type].get(key)
+            if position is None or content.created_utc >= position['created_utc']:
+                self.ingested[content_type][key] = {'fullname': content.fullname, 'created_utc': content.created_utc}
+
+    def refresh(self):
+        """Renew the lease and recompute ownership; returns (acquired, released) subreddit names"""
+        if self.lease_dir:
+            self._peers = self._read_peers()
+            now = self.clock()
+            live = [instance for instance, data in self._peers.items() if data.get('expires_at', 0) > now]
+            members = sorted(set(live) | {self.instance_id})
+            converged = all(self._peers[instance].get('members') == members for instance in live)
+        else:
+            members = [str(i) for i in range(self.instance_count)]
+            converged = True
+        ring = HashRing(members, self.vnodes)
+        desired = {name.lower() for name in self.subreddits if ring.owner(name.lower()) == self.instance_id}
+        with self._lock:
+            # A lapsed lease means peers may have taken over: start again from nothing
+            keep = set() if self.clock() >= self.expires_at else self.owned & desired
+            released = self.owned - keep
+            self.owned = keep
+            self.members = members
+        if self.lease_dir:
+            self._write_lease(self.clock() + self.lease_seconds)
+        acquired = desired - self.owned if converged else set()
+        with self._lock:
+            self.owned |= acquired
+        partition_moves.labels(direction='acquired').inc(len(acquired))
+        partition_moves.labels(direction='released').inc(len(released))
+        return self._names(acquired), self._names(released)
+
+    def handoff_positions(self, subreddits):
+        """
+        Newest position the peers published per content type for each subreddit:
+        what a live peer ingested, or what an expired one had processed.
+        """
+        keys = {name.lower() for name in subreddits}
+        now = self.clock()
+        positions = {content_type: {} for content_type in CONTENT_TYPES}
+        for data in self._peers.values():
+            published = data.get('ingested') if data.get('expires_at', 0) > now else data.get('processed')
+            for content_type in CONTENT_TYPES:
+                for key, position in (published or {}).get(content_type, {}).items():
+                    current = positions[content_type].get(key)
+                    if key in keys and (current is None or position['created_utc'] > current['created_utc']):
+                        positions[content_type][key] = position
+        return positions
+
+    def start(self, on_change):
+        """
+        Initial assignment, then (with a lease directory) a refresh every third of
+        the lease; on_change(acquired, released) runs whenever ownership changes.
+        """
+        on_change(*self.refresh())
+        if self.lease_dir:
+            atexit.register(self.release)
+            threading.Thread(target=self._refresh_loop, args=(on_change,), name="partition-refresh", daemon=True).start()
+        return self
+
+    def release(self):
+        """Hand over every subreddit now by expiring the lease (clean shutdown)"""
+        with self._lock:
+            self.owned = set()
+        self._write_lease(0.0)
+
+    def _refresh_loop(self, on_change):
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            try:
+                acquired, released = self.refresh()
+                if acquired or released:
+                    on_change(acquired, released)
+            except Exception as e:
+                print(f"⚠️ Error refreshing subreddit partition: {e}")
+
+    def _names(self, keys):
+        return [name for name in self.subreddits if name.lower() in keys]
+
+    def _read_peers(self):
+        peers = {}
+        for filename in os.listdir(self.lease_dir):
+            if not filename.startswith(f"{self.name}-") or not filename.endswith(".lease"):
+                continue
+            try:
+                with open(os.path.join(self.lease_dir, filename), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # Being replaced, or not a lease
+            instance = str(data.get('instance'))
+            if instance != self.instance_id:
+                peers[instance] = data
+        return peers
+
+    def _write_lease(self, expires_at):
+        with self._lock:
+            data = {
+                'instance': self.instance_id,
+                'expires_at': expires_at,
+                'members': self.members,
+                'owned': sorted(self.owned),
+                'ingested': {content_type: dict(positions) for content_type, positions in self.ingested.items()},
+            }
+        data['processed'] = self.processed() if self.processed else {}
+        tmp_path = f"{self.lease_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.lease_path)
+        except OSError as e:
+            # Not renewed: the lease lapses and owns() turns False rather than risk a double owner
+            print(f"⚠️ Error writing partition lease {self.lease_path}: {e}")
+            return
+        self.expires_at = expires_at
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Local LLM Pre-screen
+Logistic regression over the item embedding (plus its best topic similarity)
+trained on past LLM verdicts. It runs between the similarity gate and
+verify_with_llm: items it is confident about are accepted or rejected
+locally and only the uncertain band is sent to the LLM.
+
+Labels come from the verdict log (verdict_log.py), which the bots always
+write: every YES and NO the LLM gave, with the best-matching chunk's
+embedding that the bot decides on, so training needs no re-embedding and no
+API key. Verdicts logged under another embedding model are skipped.
+
+Once a model is deployed, only its uncertain band reaches the LLM, and a
+model retrained on that band alone would never see the confident items its
+cut-offs are about. The bots therefore send a small share of local accepts
+and rejects to the LLM anyway (PRESCREEN_EXPLORE_RATE) and log them with
+weight 1 / rate. Training and the cut-offs weigh every verdict by its
+weight, so they see the same mix of items the pre-screen is applied to.
+
+The accept/reject probability cut-offs are chosen on out-of-fold predictions:
+local accepts must reach --target-precision, and local rejects may drop at
+most --max-missed of the true leads.
+
+python3 prescreen.py --bot english
+"""
+
+import os
+import argparse
+import numpy as np
+import metrics
+import verdict_log
+
+decisions = metrics.counter("prescreen_decisions_total", "Local pre-screen outcomes", ["decision"])
+
+BOT_FILES = {"english": "english_main.py", "webindexer": "webindexer_main.py"}
+
+
+def _features(embeddings, similarities):
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float64))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.hstack([embeddings / norms, np.asarray(similarities, dtype=np.float64).reshape(-1, 1)])
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def fit_logistic(X, y, item_weights=None, l2=1e-2, epochs=500, learning_rate=0.5):
+    """Full-batch gradient descent with class-balanced, optionally item-weighted, L2-regularised log loss"""
+    n, dim = X.shape
+    if item_weights is None:
+        item_weights = np.ones(n)
+    else:
+        item_weights = np.asarray(item_weights, dtype=np.float64) * n / np.sum(item_weights)
+    positives = max(item_weights[y == 1].sum(), 1)
+    negatives = max(item_weights[y != 1].sum(), 1)
+    sample_weight = item_weights * np.where(y == 1, n / (2 * positives), n / (2 * negatives))
+    weights = np.zeros(dim)
+    bias = 0.0
+    for _ in range(epochs):
+        error = (_sigmoid(X @ weights + bias) - y) * sample_weight
+        weights -= learning_rate * (X.T @ error / n + l2 * weights)
+        bias -= learning_rate * error.mean()
+    return weights, bias
+
+
+class PrescreenModel:
+    def __init__(self, weights, bias, accept_above, reject_below, embed_model):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.accept_above = float(accept_above)
+        self.reject_below = float(reject_below)
+        self.embed_model = embed_model
+
+    def probability(self, embedding, similarity):
+        return float(_sigmoid(_features(embedding, [similarity]) @ self.weights + self.bias)[0])
+
+    def decide(self, embedding, similarity):
+        """('accept' | 'reject' | 'uncertain', probability of a YES verdict)"""
+        p = self.probability(embedding, similarity)
+        if p >= self.accept_above:
+            decision = 'accept'
+        elif p < self.reject_below:
+            decision = 'reject'
+        else:
+            decision = 'uncertain'
+        decisions.labels(decision=decision).inc()
+        return decision, p
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, weights=self.weights, bias=self.bias, accept_above=self.accept_above,
+                     reject_below=self.reject_below, embed_model=self.embed_model)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, embed_model=None):
+        """Load a trained model, or None if missing or trained for another embedding model"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            model = cls(data['weights'], data['bias'], data['accept_above'], data['reject_below'], str(data['embed_model']))
+        if embed_model and model.embed_model != embed_model:
+            print(f"⚠️ Pre-screen model {path} was trained on {model.embed_model}, not {embed_model}; ignoring it")
+            return None
+        return model
+
+
+# ==== TRAINING ====
+def load_training_items(prefix, directory=".", embed_model=None):
+    """(embedding, similarity, label, weight) for every verdict the LLM itself gave"""
+    return [
+        (verdict['embedding'], verdict['similarity_score'], int(verdict['verdict']), verdict.get('weight', 1.0))
+        for verdict in verdict_log.load_verdicts(prefix, directory, embed_model)
+    ]
+
+
+def out_of_fold_probabilities(X, y, folds=5, seed=0, item_weights=None, **fit_kwargs):
+    order = np.random.default_rng(seed).permutation(len(y))
+    probabilities = np.zeros(len(y))
+    for fold in np.array_split(order, folds):
+        train = np.setdiff1d(order, fold)
+        fold_weights = None if item_weights is None else np.asarray(item_weights)[train]
+        weights, bias = fit_logistic(X[train], y[train], fold_weights, **fit_kwargs)
+        probabilities[fold] = _sigmoid(X[fold] @ weights + bias)
+    return probabilities
+
+
+def choose_cutoffs(probabilities, y, target_precision=0.97, max_missed=0.02, item_weights=None):
+    """Lowest accept cut-off meeting target_precision; highest reject cut-off missing <= max_missed (weighted) leads"""
+    weights = np.ones(len(y)) if item_weights is None else np.asarray(item_weights, dtype=np.float64)
+    candidates = np.unique(probabilities)
+    accept_above = 1.01  # Never accept locally unless a cut-off qualifies
+    for cutoff in candidates:
+        accepted = probabilities >= cutoff
+        if accepted.any() and np.average(y[accepted], weights=weights[accepted]) >= target_precision:
+            accept_above = float(cutoff)
+            break
+    reject_below = 0.0
+    allowed_misses = max_missed * max((weights * y).sum(), 1)
+    for cutoff in candidates:
+        if (weights * y)[probabilities < cutoff].sum() > allowed_misses:
+            break
+        reject_below = float(cutoff)
+    return accept_above, min(reject_below, accept_above)
+
+
+def parse_args():
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(description="Train the local pre-screen classifier from past LLM verdicts")
+    parser.add_argument("--bot", choices=sorted(BOT_FILES), default="english", help="Whose verdict logs to read")
+    parser.add_argument("--data-dir", default=".", help="Directory containing the daily verdict logs")
+    parser.add_argument("--target-precision", type=float, default=0.97, help="Required precision of local accepts")
+    parser.add_argument("--max-missed", type=float, default=0.02, help="Fraction of true leads local rejects may drop")
+    parser.add_argument("--min-examples", type=int, default=50, help="Refuse to train on fewer labeled items")
+    parser.add_argument("--output", help="Model path (default: <bot>_prescreen.npz)")
+    return parser.parse_args()
+
+
+def main():
+    import topic_embeddings
+
+    args = parse_args()
+    embed_model = topic_embeddings.read_bot_settings(BOT_FILES[args.bot])["EMBED_MODEL"]
+    items = load_training_items(args.bot, args.data_dir, embed_model)
+    y = np.array([label for _, _, label, _ in items])
+    if len(items) < args.min_examples or y.min(initial=1) == y.max(initial=0):
+        print(f"⚠️ Need at least {args.min_examples} LLM verdicts from {embed_model} with both answers; found {len(items)}")
+        exit(1)
+
+    X = _features([embedding for embedding, *_ in items], [sim for _, sim, _, _ in items])
+    item_weights = np.array([weight for *_, weight in items], dtype=np.float64)
+
+    probabilities = out_of_fold_probabilities(X, y, item_weights=item_weights)
+    accept_above, reject_below = choose_cutoffs(probabilities, y, args.target_precision, args.max_missed, item_weights)
+    weights, bias = fit_logistic(X, y, item_weights)
+    output = args.output or f"{args.bot}_prescreen.npz"
+    PrescreenModel(weights, bias, accept_above, reject_below, embed_model).save(output)
+
+    local = (probabilities >= accept_above) | (probabilities < reject_below)
+    print(f"🎯 Trained on {len(items)} items ({int(y.sum())} leads)")
+    print(f"📊 Accept if p >= {accept_above:.3f}, reject if p < {reject_below:.3f}: "
+          f"{np.average(local, weights=item_weights):.0%} of items would have been decided locally")
+    print(f"💾 Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
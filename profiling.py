@@ -0,0 +1,213 @@
+"""
+Profiling
+Low-overhead per-item stage timing spans, plus an opt-in profiler that can be
+switched on and off in a running bot without restarting it.
+
+Per-item spans:
+    trace = ItemTrace(stage_latency)
+    with trace.span('embedding'):
+        ...
+    trace.as_ms()  # {'embedding': 182.4, ...}
+    trace.finish() # observes each stage's total for the item, and 'total'
+
+Profiler (PROFILE_MODE=sample or PROFILE_MODE=cprofile):
+    kill -USR1 <pid>   # start profiling
+    kill -USR1 <pid>   # stop and dump to PROFILE_DIR
+Sampling profiles are written in the collapsed-stack format read by
+flamegraph.pl and speedscope; cProfile runs are written as .prof files
+(snakeviz, flameprof).
+"""
+
+import os
+import sys
+import time
+import signal
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+
+class _Span:
+    __slots__ = ("_trace", "_stage", "_start")
+
+    def __init__(self, trace, stage):
+        self._trace = trace
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._trace.record(self._stage, time.perf_counter() - self._start)
+        return False
+
+
+class ItemTrace:
+    """Wall-clock time spent in each pipeline stage for one item"""
+    __slots__ = ("spans", "started", "_histogram")
+
+    def __init__(self, histogram=None):
+        self.spans = {}
+        self.started = time.perf_counter()
+        self._histogram = histogram
+
+    def span(self, stage):
+        """Context manager timing one stage; repeated stages accumulate"""
+        return _Span(self, stage)
+
+    def record(self, stage, seconds):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+    def finish(self):
+        """Record the total time for the item, observe every stage once and return the total"""
+        total = time.perf_counter() - self.started
+        self.record('total', total)
+        if self._histogram is not None:
+            # One sample per stage per item, however many spans the stage was split into
+            for stage, seconds in self.spans.items():
+                self._histogram.labels(stage=stage).observe(seconds)
+        return total
+
+    def as_ms(self):
+        return {stage: round(seconds * 1000, 2) for stage, seconds in self.spans.items()}
+
+
+# ==== PROFILERS ====
+class SamplingProfiler:
+    """
+    Statistical profiler: a background thread samples the stacks of the
+    target threads every interval seconds and counts collapsed stacks.
+    """
+
+    def __init__(self, interval=0.005, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = thread_ids  # None = every thread except the sampler
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.stacks.clear()
+        self.samples = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                self.stacks[self._collapse(frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(frame):
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    def dump(self, path):
+        """Write collapsed stacks ('frame;frame;frame count' per line)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class CProfileProfiler:
+    """Deterministic cProfile run of the thread that starts it"""
+
+    def __init__(self):
+        self._profile = None
+
+    def start(self):
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+
+    def dump(self, path):
+        self._profile.dump_stats(path)
+
+
+class ProfilerToggle:
+    """Starts/stops a profiler on each toggle() and dumps the result on stop"""
+
+    EXTENSIONS = {"sample": "collapsed", "cprofile": "prof"}
+
+    def __init__(self, mode, output_dir="profiles", label="bot", sample_interval=0.005):
+        if mode not in self.EXTENSIONS:
+            raise ValueError(f"Unknown profiler mode {mode!r}; expected one of {', '.join(self.EXTENSIONS)}")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.label = label
+        self.sample_interval = sample_interval
+        self._profiler = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._profiler is not None
+
+    def toggle(self):
+        with self._lock:
+            if self._profiler is None:
+                self._start()
+                return None
+            return self._stop()
+
+    def _start(self):
+        if self.mode == "sample":
+            self._profiler = SamplingProfiler(self.sample_interval)
+        else:
+            self._profiler = CProfileProfiler()
+        self._profiler.start()
+        print(f"🔬 {self.mode} profiler started")
+
+    def _stop(self):
+        profiler, self._profiler = self._profiler, None
+        profiler.stop()
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"{self.label}-{stamp}.{self.EXTENSIONS[self.mode]}")
+        profiler.dump(path)
+        print(f"🔬 {self.mode} profiler stopped, profile written to {path}")
+        return path
+
+
+def install_profiler_toggle(mode, output_dir="profiles", label="bot", start=False, signum=None):
+    """
+    Install a signal handler (SIGUSR1 by default) that toggles the profiler.
+    Signal handlers run on the main thread, which is also where the bots
+    process their queue, so cProfile captures the filter pipeline.
+    """
+    toggle = ProfilerToggle(mode, output_dir, label)
+    if signum is None:
+        signum = getattr(signal, "SIGUSR1", None)
+    if signum is not None:
+        def handler(received_signum, frame):
+            try:
+                toggle.toggle()
+            except Exception as e:
+                print(f"⚠️ Error toggling profiler: {e}")
+        signal.signal(signum, handler)
+    if start:
+        toggle.toggle()
+    return toggle
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Offline Replay Harness
+Feeds a recorded corpus (see corpus.py) through a bot's real process_content()
+using stub praw objects and a fake Cohere client with configurable embedding
+and LLM latency. Reports items/sec, per-stage latency percentiles, filter
+outcomes and memory, so pipeline changes can be benchmarked without Reddit
+or Cohere.
+
+Example:
+python3 replay.py corpus.jsonl.gz --bot english_main --embed-latency-ms 80 --llm-latency-ms 400
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import importlib
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from contextlib import redirect_stdout
+import numpy as np
+
+import corpus
+import bot_logging
+import lead_registry
+from memory_governor import current_rss_mb
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ==== FAKE PROVIDERS ====
+class _EmbedResponse:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+
+class _ChatResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class _StreamEvent:
+    def __init__(self, event_type, text=""):
+        self.event_type = event_type
+        self.text = text
+
+
+def _stable_fraction(text):
+    """Deterministic value in [0, 1) derived from text"""
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+class FakeCohereClient:
+    """
+    Stands in for cohere.Client. Embeddings are signed hashed bags of words
+    and bigrams, so texts sharing words score as similar. LLM verdicts are a
+    deterministic function of the text, accepting roughly llm_yes_rate of them.
+    chat_stream() spreads the chat latency evenly over the verdict's tokens.
+    """
+
+    def __init__(self, dim=256, embed_latency_ms=0.0, chat_latency_ms=0.0, llm_yes_rate=0.5):
+        self.dim = dim
+        self.embed_latency = embed_latency_ms / 1000
+        self.chat_latency = chat_latency_ms / 1000
+        self.llm_yes_rate = llm_yes_rate
+        self.embed_calls = 0
+        self.chat_calls = 0
+        self.chat_tokens = 0  # Output tokens (words) returned or streamed
+
+    def _vector(self, text):
+        tokens = re.findall(r"[a-z0-9']+", text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dim)
+        for feature in features:
+            h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+            vector[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        if not vector.any():
+            vector[0] = 1.0
+        return vector.tolist()
+
+    def embed(self, texts, model=None, input_type=None, **kwargs):
+        self.embed_calls += 1
+        if self.embed_latency:
+            time.sleep(self.embed_latency)
+        return _EmbedResponse([self._vector(text) for text in texts])
+
+    def _verdict(self, message):
+        match = re.search(r'Text: "(.*)"\n\nCriteria', message, re.S)
+        text = match.group(1) if match else message
+        if _stable_fraction(text) < self.llm_yes_rate:
+            return "YES - Replayed verdict: the author is looking for this."
+        return "NO - Replayed verdict: the author is not looking for this."
+
+    def chat(self, message, model=None, **kwargs):
+        self.chat_calls += 1
+        if self.chat_latency:
+            time.sleep(self.chat_latency)
+        text = self._verdict(message)
+        self.chat_tokens += len(text.split())
+        return _ChatResponse(text)
+
+    def chat_stream(self, message, model=None, **kwargs):
+        self.chat_calls += 1
+        tokens = re.findall(r"\S+\s*", self._verdict(message))
+        yield _StreamEvent('stream-start')
+        for token in tokens:
+            if self.chat_latency:
+                time.sleep(self.chat_latency / len(tokens))
+            self.chat_tokens += 1
+            yield _StreamEvent('text-generation', token)
+        yield _StreamEvent('stream-end')
+
+
+class StageSamples:
+    """Stands in for a bot's stage_latency histogram, keeping raw samples"""
+
+    class _Stage:
+        def __init__(self, samples):
+            self._samples = samples
+
+        def observe(self, value):
+            self._samples.append(value)
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def labels(self, stage):
+        return self._Stage(self.samples[stage])
+
+    def summary(self):
+        result = {}
+        for stage, values in sorted(self.samples.items()):
+            ms = np.asarray(values) * 1000
+            result[stage] = {
+                'count': len(values),
+                'mean_ms': round(float(ms.mean()), 3),
+                'p50_ms': round(float(np.percentile(ms, 50)), 3),
+                'p95_ms': round(float(np.percentile(ms, 95)), 3),
+                'p99_ms': round(float(np.percentile(ms, 99)), 3),
+            }
+        return result
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def _counter_values(counter):
+    return {",".join(key): child.value for key, child in counter.children()}
+
+
+def _label_scores(labeled):
+    """Recall and precision of the leads found against hand-labelled records"""
+    positives = sum(1 for label, _ in labeled if label)
+    predicted = sum(1 for _, lead in labeled if lead)
+    hits = sum(1 for label, lead in labeled if label and lead)
+    return {
+        'labeled': len(labeled),
+        'positives': positives,
+        'recall': round(hits / positives, 4) if positives else None,
+        'precision': round(hits / predicted, 4) if predicted else None,
+    }
+
+
+# ==== REPLAY ====
+def prepare_bot(bot_name, client):
+    """Import a bot without starting it and point it at the fake client"""
+    bot = importlib.import_module(bot_name)
+    bot.cohere_client = client
+    bot.target_embeddings = np.asarray(
+        client.embed(texts=bot.TARGET_TOPICS, model=bot.EMBED_MODEL, input_type='search_document').embeddings
+    )
+    bot.identified_leads = lead_registry.LeadRegistry()
+    return bot
+
+
+def run_replay(bot, records, repeat=1, output_dir=None, verbose=False, trace_memory=False):
+    """Run records through bot.process_content() and return a report dict"""
+    records = list(records)
+    samples = StageSamples()
+    bot.stage_latency = samples
+    filtered_before = _counter_values(bot.items_filtered)
+    leads_before = bot.leads_found.value
+    deferred_before = len(bot.deferred)
+    errors_before = _counter_values(bot.errors_total)
+    client = bot.cohere_client
+    embed_calls_before = getattr(client, 'embed_calls', 0)
+    chat_calls_before = getattr(client, 'chat_calls', 0)
+    chat_tokens_before = getattr(client, 'chat_tokens', 0)
+    labeled = []  # (label, became a lead) per labelled record
+
+    cwd = os.getcwd()
+    output_dir = output_dir or tempfile.mkdtemp(prefix="replay-")
+    os.makedirs(output_dir, exist_ok=True)
+    rss_before = current_rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+
+    if verbose:
+        # Every per-item message, unthrottled
+        bot_logging.configure(bot.log.name.split(".", 1)[1], event_rate=0)
+    os.chdir(output_dir)  # Lead/filtered files land here, not next to the live ones
+    started = time.perf_counter()
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(sys.stdout if verbose else devnull):
+            for _ in range(repeat):
+                bot.identified_leads = lead_registry.LeadRegistry()
+                for record in records:
+                    content_type, content = corpus.stub_from_record(record)
+                    leads = bot.leads_found.value
+                    bot.process_content(content, content_type)
+                    if 'label' in record:
+                        labeled.append((bool(record['label']), bot.leads_found.value > leads))
+            # Buffered lead/filtered writes are part of the pipeline's cost
+            bot.lead_sink.flush()
+            bot.filtered_sink.flush()
+    finally:
+        elapsed = time.perf_counter() - started
+        os.chdir(cwd)
+
+    traced_peak = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    filtered_after = _counter_values(bot.items_filtered)
+    errors_after = _counter_values(bot.errors_total)
+    items = len(records) * repeat
+    return {
+        'bot': bot.__name__,
+        'items': items,
+        'elapsed_seconds': round(elapsed, 3),
+        'items_per_second': round(items / elapsed, 2) if elapsed > 0 else None,
+        'stages': samples.summary(),
+        'outcomes': {
+            'leads': bot.leads_found.value - leads_before,
+            'deferred': len(bot.deferred) - deferred_before,
+            'filtered': {
+                reason: count - filtered_before.get(reason, 0)
+                for reason, count in filtered_after.items()
+                if count - filtered_before.get(reason, 0)
+            },
+            'errors': {
+                kind: count - errors_before.get(kind, 0)
+                for kind, count in errors_after.items()
+                if count - errors_before.get(kind, 0)
+            },
+        },
+        'labels': _label_scores(labeled),
+        'provider_calls': {
+            'embed': getattr(client, 'embed_calls', 0) - embed_calls_before,
+            'chat': getattr(client, 'chat_calls', 0) - chat_calls_before,
+            'chat_tokens': getattr(client, 'chat_tokens', 0) - chat_tokens_before,
+        },
+        'memory_mb': {
+            'rss_before': rss_before,
+            'rss_after': current_rss_mb(),
+            'peak_rss': _peak_rss_mb(),
+            'traced_peak': traced_peak,
+        },
+        'output_dir': output_dir,
+    }
+
+
+def print_report(report):
+    print("=" * 60)
+    print(f"📼 Replayed {report['items']} items through {report['bot']} in {report['elapsed_seconds']}s")
+    print(f"⚡ Throughput: {report['items_per_second']} items/s")
+    print("⏱️ Stage latency (ms):")
+    print(f"   {'stage':<16}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, stats in report['stages'].items():
+        print(f"   {stage:<16}{stats['count']:>8}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    outcomes = report['outcomes']
+    print(f"🎯 Leads: {outcomes['leads']} | Deferred: {outcomes['deferred']} | Filtered: {outcomes['filtered']} | "
+          f"Errors: {outcomes['errors']}")
+    labels = report['labels']
+    if labels['labeled']:
+        print(f"🏷️ Labelled: {labels['labeled']} ({labels['positives']} leads) | Recall: {labels['recall']} | "
+              f"Precision: {labels['precision']}")
+    print(f"☁️ Provider calls: {report['provider_calls']}")
+    memory = report['memory_mb']
+    print("🧠 Memory (MB): " + ", ".join(
+        f"{name}={value:.1f}" for name, value in memory.items() if value is not None
+    ))
+    print(f"📂 Output files: {report['output_dir']}")
+    print("=" * 60)
+
+
+def parse_args():
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(description="Replay a recorded corpus through a bot's filter pipeline")
+    parser.add_argument("corpus", nargs="+", help="Corpus files (.jsonl or .jsonl.gz)")
+    parser.add_argument("--bot", default="english_main", help="Bot module to replay through (english_main or webindexer_main)")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="Simulated latency per embed call")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency per LLM call")
+    parser.add_argument("--llm-yes-rate", type=float, default=0.5, help="Fraction of LLM verifications that pass")
+    parser.add_argument("--limit", type=int, help="Only replay the first N records")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus N times")
+    parser.add_argument("--output-dir", help="Directory for lead/filtered files (default: temp dir)")
+    parser.add_argument("--save-filtered", action="store_true", help="Also write filtered content files")
+    parser.add_argument("--embed-max-tokens", type=int, help="Override the bot's EMBED_MAX_TOKENS")
+    parser.add_argument("--embed-max-chunks", type=int, help="Override the bot's EMBED_MAX_CHUNKS (1 = truncate only)")
+    parser.add_argument("--llm-max-tokens", type=int, help="Override the bot's LLM_MAX_TOKENS")
+    parser.add_argument("--no-llm-streaming", action="store_true", help="Wait for full LLM completions (LLM_STREAMING=0)")
+    parser.add_argument("--trace-memory", action="store_true", help="Track Python allocations with tracemalloc (slower)")
+    parser.add_argument("--json-report", help="Write the report as JSON to this path")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the bot's own output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    records = []
+    for path in args.corpus:
+        records.extend(corpus.read_corpus(path))
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print("⚠️ Corpus is empty")
+        return
+
+    client = FakeCohereClient(
+        embed_latency_ms=args.embed_latency_ms,
+        chat_latency_ms=args.llm_latency_ms,
+        llm_yes_rate=args.llm_yes_rate,
+    )
+    bot = prepare_bot(args.bot, client)
+    bot.SAVE_FILTERED_CONTENT = args.save_filtered
+    if args.no_llm_streaming:
+        bot.LLM_STREAMING = False
+    for setting in ('embed_max_tokens', 'embed_max_chunks', 'llm_max_tokens'):
+        if getattr(args, setting) is not None:
+            setattr(bot, setting.upper(), getattr(args, setting))
+    report = run_replay(bot, records, args.repeat, args.output_dir, args.verbose, args.trace_memory)
+    print_report(report)
+    if args.json_report:
+        with open(args.json_report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to {args.json_report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Scheduling
+Processing order and load shedding for the content queue. A backlog used to
+be worked off first in, first out, so a fresh post with strong intent
+keywords waited behind hundreds of low-value comments, and items hours old
+still got embedded and sent to the LLM.
+
+PriorityScorer gives each item a priority when it is queued, from what is
+cheap to know then:
+
+    content type      posts score post_weight above comments
+    keyword hits      keyword_weight per boost-gate match (up to max_keyword_hits),
+                      minus penalty_weight if a penalty gate (negative keywords) matches
+    subreddit yield   yield_weight x the subreddit's lead rate relative to all
+                      subreddits (smoothed, capped at max_yield), learned from
+                      record_outcome()
+    age               one point less per age_scale seconds since created_utc
+
+Every waiting item ages at the same rate, so the age term is stored as
+created_utc / age_scale and the priority never needs recomputing. Higher
+priority is taken first; equal priorities keep arrival order.
+
+PriorityContentQueue is queue.Queue ordered by content.priority (the
+in-memory content_queue); DurableWorkQueue orders its SQLite rows the same
+way. Items without a priority keep FIFO order.
+
+LoadShedder handles sustained overload: once the backlog has stayed at
+overload_backlog items or more for overload_seconds, an item taken off the
+queue more than deadline_seconds after it was created is
+
+    'shed'    when its keyword scan found nothing promising (dropped without
+              processing, so it doesn't cost the throttle sleep)
+    'defer'   otherwise (put back with DEFERRED_PRIORITY, behind everything
+              else, and processed normally once the backlog is gone)
+
+Metrics:
+    queue_overloaded                 1 while the backlog counts as sustained overload
+    items_shed_total{action}         items shed or deferred
+"""
+
+import time
+import heapq
+import queue
+import itertools
+import threading
+from collections import Counter
+import metrics
+
+# Below any scored item (created_utc / age_scale is large and positive), so deferred items go last
+DEFERRED_PRIORITY = -1.0
+
+queue_overloaded = metrics.gauge("queue_overloaded", "1 while the processing backlog is in sustained overload")
+items_shed = metrics.counter("items_shed_total", "Stale items shed or deferred under overload", ["action"])
+
+
+class PriorityScorer:
+    def __init__(self, boost_gates=(), penalty_gates=(), post_weight=1.0, keyword_weight=1.0, max_keyword_hits=3,
+                 penalty_weight=2.0, yield_weight=1.0, max_yield=3.0, yield_prior=50, age_scale=600.0):
+        self.boost_gates = tuple(boost_gates)
+        self.penalty_gates = tuple(penalty_gates)
+        self.post_weight = post_weight
+        self.keyword_weight = keyword_weight
+        self.max_keyword_hits = max_keyword_hits
+        self.penalty_weight = penalty_weight
+        self.yield_weight = yield_weight
+        self.max_yield = max_yield
+        self.yield_prior = yield_prior  # Items' worth of the overall rate mixed into each subreddit's
+        self.age_scale = age_scale
+        self._processed = Counter()
+        self._leads = Counter()
+        self._lock = threading.Lock()
+
+    def record_outcome(self, subreddit, is_lead):
+        """Count a processed item towards its subreddit's lead yield"""
+        subreddit = subreddit.lower()
+        with self._lock:
+            self._processed[subreddit] += 1
+            if is_lead:
+                self._leads[subreddit] += 1
+
+    def relative_yield(self, subreddit):
+        """Smoothed lead rate of subreddit over the overall rate; 1.0 until leads are seen"""
+        subreddit = subreddit.lower()
+        with self._lock:
+            total_leads = sum(self._leads.values())
+            if not total_leads:
+                return 1.0
+            overall = total_leads / sum(self._processed.values())
+            rate = (self._leads[subreddit] + self.yield_prior * overall) / (self._processed[subreddit] + self.yield_prior)
+        return min(self.max_yield, rate / overall)
+
+    def promising(self, keyword_hits):
+        """Whether a keyword scan suggests the item could be a lead"""
+        if not keyword_hits:
+            return keyword_hits is None  # Unreadable text: not known to be worthless
+        if any(keyword_hits.get(gate) for gate in self.penalty_gates):
+            return False
+        return any(keyword_hits.get(gate) for gate in self.boost_gates)
+
+    def score(self, content_type, content, keyword_hits=None):
+        """Priority for an item being queued; keyword_hits is a KeywordGates.scan() of its text"""
+        keyword_hits = keyword_hits or {}
+        boosts = sum(len(keyword_hits.get(gate, ())) for gate in self.boost_gates)
+        priority = self.post_weight if content_type == 'post' else 0.0
+        priority += self.keyword_weight * min(boosts, self.max_keyword_hits)
+        if any(keyword_hits.get(gate) for gate in self.penalty_gates):
+            priority -= self.penalty_weight
+        priority += self.yield_weight * self.relative_yield(content.subreddit.display_name)
+        return priority + content.created_utc / self.age_scale
+
+
+class PriorityContentQueue(queue.Queue):
+    """queue.Queue of (content_type, content) taken highest content.priority first"""
+
+    def _init(self, maxsize):
+        self.queue = []
+        self._arrival = itertools.count()
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        heapq.heappush(self.queue, (-getattr(item[1], 'priority', 0.0), next(self._arrival), item))
+
+    def _get(self):
+        return heapq.heappop(self.queue)[2]
+
+
+class LoadShedder:
+    def __init__(self, deadline_seconds=3600.0, overload_backlog=200, overload_seconds=300.0, clock=time.time):
+        self.deadline_seconds = deadline_seconds  # 0 = never shed
+        self.overload_backlog = overload_backlog
+        self.overload_seconds = overload_seconds
+        self.clock = clock
+        self._over_since = None
+
+    def overloaded(self, backlog):
+        """True once backlog has stayed at overload_backlog or more for overload_seconds"""
+        now = self.clock()
+        if backlog < self.overload_backlog:
+            self._over_since = None
+        elif self._over_since is None:
+            self._over_since = now
+        overloaded = self._over_since is not None and now - self._over_since >= self.overload_seconds
+        queue_overloaded.set(1 if overloaded else 0)
+        return overloaded
+
+    def decide(self, content, promising, backlog):
+        """None to process the item now, 'shed' to drop it or 'defer' to put it back behind the backlog"""
+        if not self.deadline_seconds or not self.overloaded(backlog):
+            return None
+        if self.clock() - content.created_utc <= self.deadline_seconds:
+            return None
+        if getattr(content, 'priority', 0.0) == DEFERRED_PRIORITY:
+            return None  # Already waited behind the backlog once
+        action = 'defer' if promising else 'shed'
+        items_shed.labels(action=action).inc()
+        return action
@@ -0,0 +1,115 @@
+"""
+Seen IDs
+Space-bounded set of item fullnames the bot has already processed, kept as a
+rotating pair of Bloom filters and snapshotted to disk so duplicates are
+still recognised after a restart.
+
+New IDs go into the current filter; once it holds `capacity` IDs it becomes
+the previous filter and a fresh one starts, so memory stays fixed and only
+IDs older than two generations are forgotten. Membership checks are O(k)
+hashes with a false-positive rate of about error_rate per generation (a
+false positive drops an unseen item, so keep it small).
+"""
+
+import os
+import math
+import hashlib
+import numpy as np
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def copy(self):
+        bloom = BloomFilter.__new__(BloomFilter)
+        bloom.__dict__.update(self.__dict__)
+        bloom.bits = self.bits.copy()
+        return bloom
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RotatingBloomFilter:
+    """Two-generation Bloom filter with a fixed memory footprint"""
+
+    def __init__(self, capacity=200000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous = None
+
+    def add(self, key):
+        if self.current.count >= self.capacity:
+            self.previous, self.current = self.current, BloomFilter(self.capacity, self.error_rate)
+        self.current.add(key)
+
+    def __contains__(self, key):
+        return key in self.current or (self.previous is not None and key in self.previous)
+
+    @property
+    def nbytes(self):
+        return self.current.bits.nbytes + (self.previous.bits.nbytes if self.previous is not None else 0)
+
+    def copy(self):
+        """Independent copy of both generations, to save while the original keeps changing"""
+        snapshot = RotatingBloomFilter.__new__(RotatingBloomFilter)
+        snapshot.capacity = self.capacity
+        snapshot.error_rate = self.error_rate
+        snapshot.current = self.current.copy()
+        snapshot.previous = self.previous.copy() if self.previous is not None else None
+        return snapshot
+
+    def save(self, path):
+        """Atomically snapshot both generations to an .npz file"""
+        arrays = {
+            'params': np.array([self.capacity, self.current.count, self.previous.count if self.previous else -1]),
+            'error_rate': np.array([self.error_rate]),
+            'current': self.current.bits,
+        }
+        if self.previous is not None:
+            arrays['previous'] = self.previous.bits
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, capacity=200000, error_rate=0.001):
+        """Load a snapshot, or start empty if it is missing or was built with other settings"""
+        seen = cls(capacity, error_rate)
+        if not os.path.exists(path):
+            return seen
+        try:
+            with np.load(path) as data:
+                saved_capacity, current_count, previous_count = (int(v) for v in data['params'])
+                if saved_capacity != capacity or float(data['error_rate'][0]) != error_rate:
+                    print(f"⚠️ Seen-ID filter {path} was built with different settings, starting fresh")
+                    return seen
+                seen.current.bits = data['current'].copy()
+                seen.current.count = current_count
+                if previous_count >= 0:
+                    seen.previous = BloomFilter(capacity, error_rate)
+                    seen.previous.bits = data['previous'].copy()
+                    seen.previous.count = previous_count
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Could not read seen-ID filter {path}, starting fresh: {e}")
+            return cls(capacity, error_rate)
+        return seen
@@ -0,0 +1,235 @@
+"""
+Sharded Ingestion
+Splits a long subreddit list into several polled multireddit shards instead
+of one "+".join(...) stream. A single stream only ever sees the newest 100
+items per poll, so busy subreddits push quieter ones out of the window.
+
+Subreddits are grouped by observed activity (items/sec) so that each shard
+fills at most half a listing window per poll; a subreddit busier than that
+gets a shard to itself. Each shard adapts its own polling interval to its
+traffic, and when a poll comes back full with no overlap with the previous
+one, the gap is estimated (gap seconds x shard rate) and reported as missed
+items. Shards are re-planned periodically as activity changes.
+
+Metrics (labelled by shard, e.g. "posts-0"):
+    shard_poll_interval_seconds{shard}
+    shard_items_per_second{shard}
+    shard_missed_items_estimate_total{shard}
+"""
+
+import time
+import threading
+from collections import OrderedDict
+import metrics
+import stream_supervisor
+
+shard_poll_interval = metrics.gauge("shard_poll_interval_seconds", "Current polling interval per shard", ["shard"])
+shard_rate = metrics.gauge("shard_items_per_second", "Observed item rate per shard", ["shard"])
+shard_missed = metrics.counter("shard_missed_items_estimate_total", "Estimated items that fell out of the listing window between polls", ["shard"])
+
+
+def listing(reddit, subreddits, content_type, limit):
+    """Newest-first listing for a group of subreddits"""
+    multireddit = reddit.subreddit("+".join(subreddits))
+    if content_type == 'post':
+        return multireddit.new(limit=limit)
+    return multireddit.comments(limit=limit)
+
+
+def probe_rates(reddit, subreddits, content_type, limit=100):
+    """Estimate items/sec per subreddit from the timestamps of its newest listing"""
+    rates = {}
+    now = time.time()
+    for name in subreddits:
+        try:
+            created = [item.created_utc for item in listing(reddit, [name], content_type, limit)]
+        except Exception as e:
+            print(f"⚠️ Error probing r/{name} activity: {e}")
+            created = []
+        if len(created) < 2:
+            rates[name.lower()] = len(created) / 86400
+            continue
+        # A short listing covers everything the subreddit has had since the oldest item
+        span = (now if len(created) < limit else max(created)) - min(created)
+        rates[name.lower()] = len(created) / max(span, 1.0)
+    return rates
+
+
+def plan_shards(subreddits, rates, capacity, max_shards):
+    """
+    First-fit-decreasing packing of subreddits into shards whose combined rate
+    stays under capacity (items/sec). Never more than max_shards: once that
+    many exist, leftovers join the least loaded shard.
+    """
+    shards = []
+    loads = []
+    ordered = sorted(dict.fromkeys(subreddits), key=lambda name: -rates.get(name.lower(), 0.0))
+    for name in ordered:
+        rate = rates.get(name.lower(), 0.0)
+        for i, load in enumerate(loads):
+            if load + rate <= capacity:
+                shards[i].append(name)
+                loads[i] += rate
+                break
+        else:
+            if len(shards) < max_shards:
+                shards.append([name])
+                loads.append(rate)
+            else:
+                i = loads.index(min(loads))
+                shards[i].append(name)
+                loads[i] += rate
+    return shards
+
+
+class _Shard:
+    def __init__(self, name):
+        self.name = name
+        self.subreddits = []
+        self.interval = None
+        self.seen = OrderedDict()
+        self.newest_utc = None
+        self.last_poll_at = None
+        self.missed_estimate = 0.0
+
+    def reset(self, subreddits):
+        """New membership: forget overlap state so no false gap is reported"""
+        self.subreddits = subreddits
+        self.seen.clear()
+        self.newest_utc = None
+        self.last_poll_at = None
+
+
+class ShardedIngestion:
+    """Polls activity-balanced shards of one content type under stream supervisors"""
+
+    def __init__(self, reddit, subreddits, content_type, on_item, backfill=None,
+                 limit=100, min_interval=10.0, max_interval=120.0, max_shards=8,
+                 replan_interval=3600.0, stale_after=900.0, smoothing=0.2):
+        self.reddit = reddit
+        self.subreddits = list(dict.fromkeys(subreddits))
+        self.content_type = content_type
+        self.on_item = on_item
+        self.backfill = backfill  # (subreddits) -> iterable of items, run when a shard (re)starts
+        self.limit = limit
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_shards = max_shards
+        self.replan_interval = replan_interval
+        self.stale_after = stale_after
+        self.smoothing = smoothing
+        self.rates = {}
+        self.shards = []
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        """Items/sec one shard can absorb while filling half a window per fastest poll"""
+        return self.limit * 0.5 / self.min_interval
+
+    def start(self):
+        self.rates = probe_rates(self.reddit, self.subreddits, self.content_type, self.limit)
+        self.replan()
+        threading.Thread(target=self._replan_loop, name=f"{self.content_type}-shard-planner", daemon=True).start()
+        return self
+
+    def replan(self):
+        """Regroup subreddits by current activity, starting pollers for new shards"""
+        plan = plan_shards(self.subreddits, self.rates, self.capacity, self.max_shards)
+        added = []
+        with self._lock:
+            while len(self.shards) < len(plan):
+                added.append(_Shard(f"{self.content_type}s-{len(self.shards)}"))
+                self.shards.append(added[-1])
+            for shard, subreddits in zip(self.shards, plan + [[]] * (len(self.shards) - len(plan))):
+                if sorted(subreddits) != sorted(shard.subreddits):
+                    shard.reset(subreddits)
+                    shard.interval = self._interval_for(subreddits)
+        for shard in added:
+            self._start_poller(shard)
+        print(f"🧩 {self.content_type} shards: " + " | ".join(
+            f"{len(s.subreddits)} subs @ {s.interval:.0f}s" for s in self.shards if s.subreddits
+        ))
+
+    def set_subreddits(self, subreddits):
+        """Change the polled subreddits (partition rebalance), backfilling the added ones"""
+        subreddits = list(dict.fromkeys(subreddits))
+        added = [name for name in subreddits if name not in self.subreddits]
+        self.subreddits = subreddits
+        if added:
+            self.rates.update(probe_rates(self.reddit, added, self.content_type, self.limit))
+        self.replan()
+        if self.backfill and added:
+            for item in self.backfill(added):
+                self.on_item(item)
+
+    def _replan_loop(self):
+        while True:
+            time.sleep(self.replan_interval)
+            try:
+                self.replan()
+            except Exception as e:
+                print(f"⚠️ Error re-planning {self.content_type} shards: {e}")
+
+    def _start_poller(self, shard):
+        shard_poll_interval.labels(shard=shard.name).set_function(lambda: shard.interval or 0)
+        shard_rate.labels(shard=shard.name).set_function(lambda: self._shard_rate(shard.subreddits))
+        stream_supervisor.StreamSupervisor(
+            shard.name, lambda: self._poll(shard), self.on_item, self.stale_after
+        ).start()
+
+    def _shard_rate(self, subreddits):
+        return sum(self.rates.get(name.lower(), 0.0) for name in subreddits)
+
+    def _interval_for(self, subreddits):
+        rate = self._shard_rate(subreddits)
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.limit * 0.5 / rate))
+
+    def _poll(self, shard):
+        """Stream for one shard: backfill, then new items each poll (None = empty poll)"""
+        if self.backfill and shard.subreddits:
+            yield from self.backfill(list(shard.subreddits))
+        while True:
+            if shard.subreddits:
+                yield from self._poll_once(shard)
+            yield None
+            time.sleep(shard.interval or self.max_interval)
+
+    def _poll_once(self, shard):
+        subreddits = list(shard.subreddits)
+        items = list(listing(self.reddit, subreddits, self.content_type, self.limit))
+        now = time.monotonic()
+        new = [item for item in items if item.fullname not in shard.seen]
+
+        # A full window sharing nothing with the last poll means items slipped past
+        if shard.newest_utc is not None and len(items) >= self.limit and len(new) == len(items):
+            gap = min(item.created_utc for item in items) - shard.newest_utc
+            missed = max(gap, 0.0) * self._shard_rate(subreddits)
+            shard.missed_estimate += missed
+            shard_missed.labels(shard=shard.name).inc(missed)
+            print(f"⚠️ {shard.name}: listing window overflowed, ~{missed:.0f} items missed")
+
+        if shard.last_poll_at is not None:
+            self._update_rates(subreddits, new, now - shard.last_poll_at)
+            shard.interval = self._interval_for(subreddits)
+        shard.last_poll_at = now
+
+        for item in items:
+            shard.seen[item.fullname] = None
+            shard.newest_utc = max(shard.newest_utc or 0.0, item.created_utc)
+        while len(shard.seen) > self.limit * 3:
+            shard.seen.popitem(last=False)
+
+        yield from sorted(new, key=lambda item: item.created_utc)
+
+    def _update_rates(self, subreddits, new, elapsed):
+        counts = {}
+        for item in new:
+            key = item.subreddit.display_name.lower()
+            counts[key] = counts.get(key, 0) + 1
+        for name in subreddits:
+            key = name.lower()
+            observed = counts.get(key, 0) / max(elapsed, 1.0)
+            self.rates[key] = self.smoothing * observed + (1 - self.smoothing) * self.rates.get(key, observed)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Similarity Threshold Calibration
+Derives per-topic and per-subreddit embedding-similarity thresholds from the
+bots' own history, so fewer candidates are sent to the LLM for verification.
+
+Labels come from items that reached the LLM stage, read from the verdict log
+(<prefix>_llm_verdicts_*.jsonl, always written by the bots, see
+verdict_log.py). Without a verdict log the older files are used:
+    positives: leads in <prefix>_leads_YYYY-MM-DD.json
+    negatives: filter_reason == "llm_verification_failed" in
+               unfiltered_<prefix>_leads_YYYY-MM-DD.json (SAVE_FILTERED_CONTENT)
+Items filtered earlier never got a verdict and are ignored. The bots send a
+sample of the items between the fixed threshold and a calibrated one to the
+LLM anyway and log them with a weight (see verdict_log.py), so a threshold
+that was set too high shows up as weighted leads below it and the next
+calibration lowers it again. The older files have no such sample: their
+scores all lie above the threshold in force, which calibration can only raise.
+
+For each group with enough labels, the threshold is the highest score that
+still keeps target_recall of the group's (weighted) positives; the bots then use the
+lowest of the applicable topic and subreddit thresholds for each item. A
+group also needs min_negatives rejections, and the script refuses to write a
+config at all with fewer than --min-negatives overall: with no negatives
+there is nothing to show a raised threshold saves, only leads it could lose.
+
+python3 similarity_thresholds.py --bot english --target-recall 0.95
+"""
+
+import os
+import glob
+import json
+import math
+import argparse
+from datetime import datetime
+import verdict_log
+
+
+class SimilarityThresholds:
+    """Calibrated thresholds as loaded by the bots"""
+
+    def __init__(self, default=None, topics=None, subreddits=None):
+        self.default = default
+        self.topics = topics or {}
+        self.subreddits = {name.lower(): value for name, value in (subreddits or {}).items()}
+
+    @classmethod
+    def load(cls, path):
+        """Load a calibration file; a missing file means no calibration"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('default'), data.get('topics'), data.get('subreddits'))
+
+    def __len__(self):
+        return len(self.topics) + len(self.subreddits)
+
+    def threshold_for(self, topic, subreddit, fallback):
+        """Lowest calibrated threshold that applies, else the calibrated or given default"""
+        candidates = [
+            value for value in (self.topics.get(topic), self.subreddits.get((subreddit or '').lower()))
+            if value is not None
+        ]
+        if candidates:
+            return min(candidates)
+        return self.default if self.default is not None else fallback
+
+
+# ==== CALIBRATION ====
+def load_labeled_examples(prefix, directory="."):
+    """(score, topic, subreddit, weight, is_lead) for every item the LLM judged"""
+    verdicts = verdict_log.load_verdicts(prefix, directory)
+    if verdicts:
+        return [
+            (verdict['similarity_score'], verdict.get('best_matching_topic'), verdict.get('subreddit'),
+             verdict.get('weight', 1.0), verdict['verdict'])
+            for verdict in verdicts
+        ]
+    examples = []
+    for path in sorted(glob.glob(os.path.join(directory, f"{prefix}_leads_*.json"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for lead in json.load(f):
+                if lead.get('verified_by') == 'prescreen':
+                    continue  # Accepted locally; the LLM never judged it
+                examples.append((lead['similarity_score'], lead.get('best_matching_topic'), lead.get('subreddit'), 1.0, True))
+    for path in sorted(glob.glob(os.path.join(directory, f"unfiltered_{prefix}_leads_*.json"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for item in json.load(f):
+                if item.get('filter_reason') == 'llm_verification_failed':
+                    examples.append((item['similarity_score'], item.get('best_matching_topic'), item.get('subreddit'), 1.0, False))
+    return examples
+
+
+def threshold_at_recall(examples, target_recall):
+    """Highest threshold keeping target_recall of (weighted) positives, and LLM calls it would skip"""
+    positives = sorted(((score, weight) for score, _, _, weight, is_lead in examples if is_lead), reverse=True)
+    if not positives:
+        return None, 0
+    # Items pass when score > threshold, so sit just below the last positive needed for the recall
+    needed = target_recall * sum(weight for _, weight in positives)
+    kept = 0.0
+    for score, weight in positives:
+        kept += weight
+        if kept >= needed - 1e-9:
+            break
+    threshold = score - 1e-6
+    skipped = sum(weight for score, _, _, weight, is_lead in examples if not is_lead and score <= threshold)
+    return round(threshold, 6), round(skipped)
+
+
+def calibrate(examples, target_recall=0.95, min_examples=20, min_positives=5, min_negatives=5):
+    """Build the calibration config from labeled examples"""
+    def group_thresholds(key_index):
+        groups = {}
+        for example in examples:
+            if example[key_index]:
+                groups.setdefault(example[key_index], []).append(example)
+        thresholds, stats = {}, {}
+        for key, group in sorted(groups.items()):
+            positives = sum(1 for example in group if example[-1])
+            if len(group) < min_examples or positives < min_positives or len(group) - positives < min_negatives:
+                continue
+            thresholds[key], skipped = threshold_at_recall(group, target_recall)
+            stats[key] = {'examples': len(group), 'positives': positives, 'llm_calls_skipped': skipped}
+        return thresholds, stats
+
+    default, skipped = threshold_at_recall(examples, target_recall)
+    topics, topic_stats = group_thresholds(1)
+    subreddits, subreddit_stats = group_thresholds(2)
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'target_recall': target_recall,
+        'examples': len(examples),
+        'positives': sum(1 for example in examples if example[-1]),
+        'default': default,
+        'default_llm_calls_skipped': skipped,
+        'topics': topics,
+        'subreddits': subreddits,
+        'stats': {'topics': topic_stats, 'subreddits': subreddit_stats},
+    }
+
+
+def parse_args():
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(description="Calibrate similarity thresholds from past LLM verdicts")
+    parser.add_argument("--bot", choices=["english", "webindexer"], default="english", help="Whose lead files to read")
+    parser.add_argument("--data-dir", default=".", help="Directory containing the daily lead files")
+    parser.add_argument("--target-recall", type=float, default=0.95, help="Fraction of past leads that must still pass")
+    parser.add_argument("--min-examples", type=int, default=20, help="Labeled items needed before a topic/subreddit gets its own threshold")
+    parser.add_argument("--min-positives", type=int, default=5, help="Leads needed before a topic/subreddit gets its own threshold")
+    parser.add_argument("--min-negatives", type=int, default=20, help="LLM rejections needed to write a config at all (5 per topic/subreddit)")
+    parser.add_argument("--output", help="Config path (default: <bot>_similarity_thresholds.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    examples = load_labeled_examples(args.bot, args.data_dir)
+    if not any(example[-1] for example in examples):
+        print(f"⚠️ No {args.bot} leads found in {args.data_dir}; nothing to calibrate")
+        exit(1)
+    negatives = sum(1 for example in examples if not example[-1])
+    if negatives < args.min_negatives:
+        print(f"⚠️ Only {negatives} LLM rejections found (need {args.min_negatives}); "
+              f"let the bot log more verdicts before calibrating")
+        exit(1)
+    config = calibrate(examples, args.target_recall, args.min_examples, args.min_positives)
+    output = args.output or f"{args.bot}_similarity_thresholds.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+
+    llm_judged = len(examples)
+    print(f"🎯 Calibrated from {llm_judged} LLM-judged items ({config['positives']} leads) at {args.target_recall:.0%} recall")
+    print(f"📊 Default threshold: {config['default']:.3f} (would skip about {config['default_llm_calls_skipped']} "
+          f"rejected LLM calls; {llm_judged - config['positives']} rejections logged)")
+    print(f"📊 Topic thresholds: {len(config['topics'])} | Subreddit thresholds: {len(config['subreddits'])}")
+    print(f"💾 Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Sink
+Buffered background writer for the daily lead and filtered-content files.
+put() only enqueues, so the filter thread never waits on disk: a writer
+thread collects records until flush_interval seconds have passed since the
+first one or max_batch are waiting, then commits the batch with one
+read-modify-write per file instead of one per record.
+
+A buffered record is lost if the process dies before its commit. write() is
+for records that must be on disk before the caller moves on (leads, whose
+work item is acknowledged afterwards): it commits straight away and returns
+once the record is written, or raises CommitError and drops the record so
+the caller can redo it.
+
+The files keep their format (one JSON array per day, read by the digests,
+similarity_thresholds.py and prescreen.py). Each commit holds the
+broker.file_lock for the sink's name next to the file, so worker processes
+sharing the files don't lose each other's records, and replaces the file
+atomically. Records that could not be written stay queued for the next
+commit. A daily file that no longer parses as a JSON array (a torn write
+by another tool, manual editing) would fail every commit, so it is renamed
+to <file>.corrupt for inspection and a new array is started. Whatever is buffered is written on close(), which runs at exit;
+exit_on_sigterm() makes a SIGTERM (service stop, container shutdown) exit
+normally so that happens.
+
+Metrics (labelled by sink name):
+    sink_backlog_records{sink}        records waiting to be written
+    sink_commit_seconds{sink}         time to write one batch
+    sink_commit_delay_seconds{sink}   put() to on disk, for each batch's oldest record
+    sink_records_written_total{sink}
+    sink_write_errors_total{sink}
+    sink_corrupt_files_total{sink}    unreadable files set aside
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import signal
+import threading
+from collections import OrderedDict
+import metrics
+import broker
+
+sink_backlog = metrics.gauge("sink_backlog_records", "Records waiting to be written", ["sink"])
+sink_commit_seconds = metrics.histogram("sink_commit_seconds", "Time to write one batch of records", ["sink"])
+sink_commit_delay = metrics.histogram(
+    "sink_commit_delay_seconds", "Delay from put() until the oldest record of a batch is on disk", ["sink"]
+)
+sink_written = metrics.counter("sink_records_written_total", "Records written by a sink", ["sink"])
+sink_errors = metrics.counter("sink_write_errors_total", "Failed batch writes (records are retried)", ["sink"])
+sink_corrupt = metrics.counter("sink_corrupt_files_total", "Unreadable daily files renamed to *.corrupt", ["sink"])
+
+_STOP = object()
+
+
+class CommitError(OSError):
+    """A record passed to write() is not on disk"""
+
+
+class _Receipt:
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class JsonArraySink:
+    def __init__(self, name, flush_interval=2.0, max_batch=200):
+        self.name = name  # Metrics label and lock file name
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._pending = []  # (path, record, queued_at, receipt) taken off the queue, not yet on disk
+        self._thread = None
+        self._start_lock = threading.Lock()
+        sink_backlog.labels(sink=name).set_function(lambda: self._queue.qsize() + len(self._pending))
+
+    def put(self, filename, record):
+        """Queue record for appending to the JSON array in filename; never blocks"""
+        self._ensure_started()
+        # Resolved now: the writer thread must not depend on the caller's working directory
+        self._queue.put((os.path.abspath(filename), record, time.monotonic(), None))
+
+    def write(self, filename, record, timeout=30.0):
+        """Append record to the JSON array in filename now and wait until it is on disk; raises CommitError"""
+        self._ensure_started()
+        receipt = _Receipt()
+        self._queue.put((os.path.abspath(filename), record, time.monotonic(), receipt))
+        self._queue.put(threading.Event())  # Commit now instead of waiting out flush_interval
+        if not receipt.done.wait(timeout):
+            raise CommitError(f"{filename} not written within {timeout:.0f}s")
+        if receipt.error is not None:
+            raise CommitError(f"{filename} not written: {receipt.error}")
+
+    def flush(self, timeout=30.0):
+        """Write everything queued so far; returns False if the writer did not finish in time"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=30.0):
+        """Write what is buffered and stop the writer"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            flushed = []
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    flushed.append(item)
+                    break
+                self._pending.append(item)
+                remaining = deadline - time.monotonic()
+                if len(self._pending) >= self.max_batch or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            self._commit()
+            for done in flushed:
+                done.set()
+
+    def _commit(self):
+        by_path = OrderedDict()
+        for entry in self._pending:
+            by_path.setdefault(entry[0], []).append(entry)
+        for path, entries in by_path.items():
+            started = time.monotonic()
+            try:
+                self._append(path, [entry[1] for entry in entries])
+            except Exception as e:
+                print(f"⚠️ Error writing {len(entries)} records to {path}, will retry: {e}")
+                sink_errors.labels(sink=self.name).inc()
+                # write() callers get the error and redo their record; buffered ones stay queued
+                for entry in entries:
+                    if entry[3] is not None:
+                        entry[3].error = e
+                        entry[3].done.set()
+                self._pending = [entry for entry in self._pending if entry[3] is None or entry[0] != path]
+                continue
+            finished = time.monotonic()
+            sink_commit_seconds.labels(sink=self.name).observe(finished - started)
+            sink_commit_delay.labels(sink=self.name).observe(finished - entries[0][2])
+            sink_written.labels(sink=self.name).inc(len(entries))
+            self._pending = [entry for entry in self._pending if entry[0] != path]
+            for entry in entries:
+                if entry[3] is not None:
+                    entry[3].done.set()
+            print(f"💾 Saved {len(entries)} records to {os.path.basename(path)}")
+
+    def _append(self, path, records):
+        with broker.file_lock(os.path.join(os.path.dirname(path), self.name)):
+            existing = []
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        existing = json.load(f)
+                    if not isinstance(existing, list):
+                        raise ValueError(f"expected a JSON array, found {type(existing).__name__}")
+                except ValueError as e:  # Also invalid JSON or encoding
+                    self._set_aside(path, e)
+                    existing = []
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(existing + records, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def _set_aside(self, path, reason):
+        corrupt_path = f"{path}.corrupt"
+        if os.path.exists(corrupt_path):
+            corrupt_path = f"{path}.{time.strftime('%Y%m%d-%H%M%S')}.corrupt"
+        os.replace(path, corrupt_path)
+        sink_corrupt.labels(sink=self.name).inc()
+        print(f"⚠️ {os.path.basename(path)} is unreadable ({reason}); moved to {corrupt_path}, starting a new file")
+
+
+def exit_on_sigterm():
+    """Turn SIGTERM into a normal exit so atexit handlers (sink flushes) run; call from the main thread"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
@@ -0,0 +1,117 @@
+"""
+Stream Supervisor
+Runs a praw stream on a background thread and keeps it running: when the
+stream raises or ends it is rebuilt after a jittered exponential backoff, and
+when it goes quiet for longer than stale_after seconds it is assumed wedged
+and rebuilt immediately.
+
+The stream factory should build the stream with pause_after set, so praw
+yields None after empty polls and the supervisor gets a chance to check for
+staleness instead of blocking inside praw's own retry loop.
+
+Metrics (labelled by stream name):
+    stream_restarts_total{stream, reason}   reason = error | ended | stale | rebalanced
+    stream_healthy{stream}                  1 while items are arriving
+    stream_last_item_age_seconds{stream}    seconds since the last item
+"""
+
+import time
+import random
+import threading
+import metrics
+
+stream_restarts = metrics.counter("stream_restarts_total", "Stream rebuilds after an error, end or stall", ["stream", "reason"])
+stream_healthy = metrics.gauge("stream_healthy", "1 while the stream is delivering items", ["stream"])
+stream_last_item_age = metrics.gauge("stream_last_item_age_seconds", "Seconds since the stream last delivered an item", ["stream"])
+
+
+def backoff_delay(failures, base_delay=5.0, max_delay=300.0):
+    """Full-jitter exponential backoff: uniform in [0, min(max, base * 2^n)]"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** max(failures - 1, 0)))
+
+
+class StreamSupervisor:
+    """Restarts a stream with backoff and tracks its health"""
+
+    def __init__(self, name, stream_factory, on_item, stale_after=900.0, base_delay=5.0, max_delay=300.0):
+        self.name = name
+        self.stream_factory = stream_factory  # () -> iterator of items (None = empty poll)
+        self.on_item = on_item
+        self.stale_after = stale_after
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = "starting"
+        self.failures = 0
+        self.restarts = 0
+        self.started_at = time.monotonic()
+        self.last_item_at = None
+        self._stop = threading.Event()
+        self._restart = threading.Event()
+        self._thread = None
+        stream_healthy.labels(stream=name).set_function(lambda: 1 if self.state == "healthy" else 0)
+        stream_last_item_age.labels(stream=name).set_function(self.last_item_age)
+
+    def last_item_age(self):
+        """Seconds since the last item (or since start if none yet)"""
+        return time.monotonic() - (self.last_item_at or self.started_at)
+
+    def is_stale(self):
+        return self.last_item_age() > self.stale_after
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"stream-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def restart(self):
+        """Rebuild the stream at its next poll, e.g. after its subreddits changed"""
+        self._restart.set()
+
+    def _consume(self):
+        """Run one stream until it fails, ends or goes stale; return the reason"""
+        self.state = "connecting"
+        connected_at = time.monotonic()
+        for item in self.stream_factory():
+            if self._stop.is_set():
+                return None
+            if self._restart.is_set():
+                self._restart.clear()
+                return "rebalanced"
+            if item is None:
+                # Measure from reconnect too, so a fresh stream gets a full window
+                if time.monotonic() - max(self.last_item_at or 0, connected_at) > self.stale_after:
+                    return "stale"
+                continue
+            self.last_item_at = time.monotonic()
+            self.state = "healthy"
+            self.failures = 0
+            self.on_item(item)
+        return "ended"
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                reason = self._consume()
+            except Exception as e:
+                print(f"⚠️ Error in {self.name} stream: {e}")
+                reason = "error"
+            if reason is None:
+                return
+            self.restarts += 1
+            stream_restarts.labels(stream=self.name, reason=reason).inc()
+            if reason == "rebalanced":
+                print(f"🔁 {self.name} stream restarting for its new subreddits")
+                continue
+            if reason == "stale":
+                # Quiet but not failing: rebuild straight away
+                self.state = "stale"
+                print(f"🔁 {self.name} stream delivered nothing for {self.last_item_age():.0f}s, restarting")
+                continue
+            self.failures += 1
+            self.state = "backoff"
+            delay = backoff_delay(self.failures, self.base_delay, self.max_delay)
+            print(f"🔁 {self.name} stream {reason}, restarting in {delay:.0f}s (attempt {self.failures})")
+            self._stop.wait(delay)
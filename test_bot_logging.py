@@ -0,0 +1,48 @@
+import io
+import json
+import queue
+import logging
+import bot_logging
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _record(event=None):
+    record = logging.LogRecord("bot.test", logging.INFO, __file__, 1, "item %s", (1,), None)
+    if event:
+        record.event = event
+    return record
+
+
+def test_events_are_rate_limited_and_suppressions_reported():
+    clock = _Clock()
+    limit = bot_logging.EventRateLimit(rate=1.0, burst=3, clock=clock)
+    assert [limit.filter(_record('filtered')) for _ in range(10)] == [True] * 3 + [False] * 7
+    assert limit.filter(_record('skipped'))  # Each event has its own budget
+    assert all(limit.filter(_record()) for _ in range(100))  # Un-evented messages always pass
+
+    clock.now = 1.0
+    record = _record('filtered')
+    assert limit.filter(record) and record.suppressed == 7
+
+
+def test_json_lines_and_non_blocking_queue():
+    stream = io.StringIO()
+    log = bot_logging.configure("test_json", json_lines=True, event_rate=0, stream=stream)
+    log.info("🚫 Filtered out: %s", "text", extra={'event': 'filtered', 'reason': 'low_similarity'})
+    bot_logging._stop_listener("test_json")
+    entry = json.loads(stream.getvalue())
+    assert entry['message'] == "🚫 Filtered out: text"
+    assert entry['event'] == 'filtered' and entry['reason'] == 'low_similarity'
+
+    handler = bot_logging._NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.emit(_record())
+    dropped = bot_logging.dropped.value
+    handler.emit(_record())  # Full: dropped instead of waiting
+    assert bot_logging.dropped.value == dropped + 1
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for the distributed-mode broker
+"""
+
+import queue
+import pytest
+import broker
+import corpus
+from test_replay import _records
+
+
+def test_workers_share_items_and_claim_each_lead_once(tmp_path):
+    url = f"sqlite:///{tmp_path}/broker.db"
+    ingest = broker.connect(url)
+    for record in _records()[:4]:
+        ingest.put(corpus.stub_from_record(record))
+
+    workers = [broker.connect(url), broker.connect(url)]
+    leased = [workers[i % 2].get_nowait()[1].fullname for i in range(4)]
+    assert sorted(leased) == sorted(ingest.pending_fullnames())  # Each item leased exactly once
+    for worker in workers:
+        worker.task_done()
+        worker.task_done()
+    assert ingest.qsize() == 0
+
+    ttl = 90 * 86400
+    assert workers[0].claim_lead("learner", "t3_a", ttl)
+    assert not workers[1].claim_lead("learner", "t3_b", ttl)  # Same user from another item
+    assert workers[1].claim_lead("learner", "t3_a", ttl)      # Redelivery of the claiming item
+
+
+def test_workers_leasing_one_item_at_a_time_never_outlive_their_leases(tmp_path):
+    now = [1000.0]
+    url = f"sqlite:///{tmp_path}/broker.db"
+    ingest = broker.connect(url, clock=lambda: now[0])
+    for record in _records()[:6]:
+        ingest.put(corpus.stub_from_record(record))
+    workers = [broker.connect(url, lease_seconds=600, clock=lambda: now[0]) for _ in range(2)]
+
+    # Each worker leases an item only when it starts on it; items take 400s (slow LLM + throttle)
+    delivered = []
+    while ingest.qsize():
+        held = []
+        for worker in workers:
+            try:
+                held.append((worker, worker.get_nowait()[1]))
+            except queue.Empty:
+                pass
+        now[0] += 200
+        for worker, content in held:
+            worker.mark_stage(content, 'llm', [False, "NO"])
+        now[0] += 200
+        for worker, content in held:
+            delivered.append(content.fullname)
+            worker.task_done()
+    assert sorted(delivered) == sorted(corpus.stub_from_record(record)[1].fullname for record in _records()[:6])
+
+
+def test_stalled_worker_loses_its_item_and_cannot_overwrite_it(tmp_path):
+    now = [1000.0]
+    url = f"sqlite:///{tmp_path}/broker.db"
+    ingest = broker.connect(url, clock=lambda: now[0])
+    ingest.put(corpus.stub_from_record(_records()[0]))
+    stalled, healthy = [broker.connect(url, lease_seconds=600, clock=lambda: now[0]) for _ in range(2)]
+
+    _, stale = stalled.get_nowait()
+    now[0] += 700  # Lease expired without progress: the item goes to the other worker
+    _, fresh = healthy.get_nowait()
+    assert fresh.fullname == stale.fullname
+    healthy.mark_stage(fresh, 'llm', [True, "YES"])
+    stalled.mark_stage(stale, 'llm', [False, "NO"])  # Too late: neither renews nor overwrites
+
+    now[0] += 500
+    with pytest.raises(queue.Empty):
+        stalled.get_nowait()  # healthy's lease was renewed by its own progress
+    now[0] += 200
+    assert stalled.get_nowait()[1].pipeline_state == {'llm': [True, "YES"]}
+
+
+def test_unknown_broker_scheme():
+    with pytest.raises(ValueError):
+        broker.connect("redis://localhost:6379/0")
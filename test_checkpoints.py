@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for ingestion checkpoints and backfill
+"""
+
+import checkpoints
+import seen_ids
+import corpus
+
+
+def _post(i, subreddit="EnglishLearning"):
+    return corpus.StubSubmission({
+        'id': f"p{i}", 'type': 'post', 'subreddit': subreddit, 'author': f"user{i}",
+        'title': f"post {i}", 'created_utc': 1736935800.0 + i,
+    })
+
+
+class _FakeSubreddit:
+    def __init__(self, posts):
+        self.posts = posts
+
+    def new(self, limit=None):
+        return iter(sorted(self.posts, key=lambda p: -p.created_utc)[:limit])
+
+
+class _FakeReddit:
+    def __init__(self, posts):
+        self.posts = posts
+
+    def subreddit(self, name):
+        return _FakeSubreddit([p for p in self.posts if p.subreddit.display_name == name])
+
+
+def test_backfill_resumes_after_restart(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = checkpoints.IngestionCheckpoint(path)
+    for i in range(3):
+        assert checkpoint.claim(_post(i).fullname)
+        checkpoint.mark_processed('post', _post(i))
+    checkpoint.save()
+
+    # Posts 3-5 arrived while the bot was down
+    restarted = checkpoints.IngestionCheckpoint(path)
+    reddit = _FakeReddit([_post(i) for i in range(6)] + [_post(9, "IELTS")])
+    missed = list(restarted.backfill(reddit, ["EnglishLearning", "IELTS"], 'post'))
+    assert [p.id for p in missed] == ["p3", "p4", "p5"]
+
+    # The live stream re-delivers recent items; only unseen ones are claimed
+    assert [p.id for p in missed + [_post(2), _post(5), _post(6)] if restarted.claim(p.fullname)] == \
+        ["p3", "p4", "p5", "p6"]
+
+
+def test_seen_ids_rotate_and_survive_restart(tmp_path):
+    path = str(tmp_path / "seen.npz")
+    seen = seen_ids.RotatingBloomFilter(capacity=1000, error_rate=0.001)
+    for i in range(2500):
+        seen.add(f"t3_{i}")
+    size = seen.nbytes
+    seen.save(path)
+
+    restored = seen_ids.RotatingBloomFilter.load(path, capacity=1000, error_rate=0.001)
+    assert restored.nbytes == size
+    # The newest two generations are remembered, the oldest has rotated out
+    assert all(f"t3_{i}" in restored for i in range(1000, 2500))
+    assert sum(f"t3_{i}" in restored for i in range(1000)) < 50
+    assert sum(f"t1_{i}" in restored for i in range(10000)) < 50
+
+
+
+def test_saved_filter_is_a_snapshot_taken_under_the_lock(tmp_path):
+    checkpoint = checkpoints.IngestionCheckpoint(str(tmp_path / "checkpoint.json"), seen_capacity=100)
+    for i in range(150):  # Rotates once
+        checkpoint.mark_processed('post', _post(i))
+    snapshot = checkpoint.seen.copy()
+    checkpoint.mark_processed('post', _post(500))  # Keeps changing while the snapshot is written
+    assert _post(500).fullname not in snapshot and _post(149).fullname in snapshot
+    checkpoint.save()
+
+    restored = seen_ids.RotatingBloomFilter.load(checkpoint.seen_path, capacity=100)
+    assert all(_post(i).fullname in restored for i in (0, 149, 500))
+
+def test_backfill_reaches_items_still_queued_at_a_crash(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = checkpoints.IngestionCheckpoint(path)
+    for i in range(4):
+        assert checkpoint.claim(_post(i).fullname)
+        checkpoint.enqueued('post', _post(i))
+    checkpoint.mark_processed('post', _post(0))
+    # Newer, higher-priority posts finish first; p1 is still queued (or deferred)
+    checkpoint.mark_processed('post', _post(3))
+    checkpoint.mark_processed('post', _post(2))
+    assert checkpoint.positions['post']['englishlearning']['fullname'] == _post(0).fullname
+    checkpoint.save()
+
+    restarted = checkpoints.IngestionCheckpoint(path)
+    reddit = _FakeReddit([_post(i) for i in range(4)])
+    missed = [p for p in restarted.backfill(reddit, ["EnglishLearning"], 'post') if restarted.claim(p.fullname)]
+    assert [p.id for p in missed] == ["p1"]
+
+    # Once the straggler is done the position catches up to the newest finished post
+    checkpoint.mark_processed('post', _post(1))
+    assert checkpoint.positions['post']['englishlearning']['fullname'] == _post(3).fullname
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the Cohere circuit breaker and the deferred-verification queue
+"""
+
+import pytest
+import circuit_breaker
+import deferred_queue
+import replay
+from test_replay import _records
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fail():
+    raise RuntimeError("503 Service Unavailable")
+
+
+def test_breaker_opens_fails_fast_and_probes():
+    clock = _Clock()
+    breaker = circuit_breaker.CircuitBreaker("test", failure_rate=0.5, window=4, min_calls=4, reset_timeout=60, clock=clock)
+    assert breaker.call(lambda: "ok") == "ok"
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            breaker.call(_fail)
+    assert breaker.state == circuit_breaker.OPEN
+
+    calls = []
+    with pytest.raises(circuit_breaker.CircuitOpenError):
+        breaker.call(calls.append, 1)
+    assert not calls and not breaker.available()
+
+    # After the reset timeout one probe goes through; a failed probe re-opens
+    clock.now += 60
+    assert breaker.state == circuit_breaker.HALF_OPEN and breaker.available()
+    with pytest.raises(RuntimeError):
+        breaker.call(_fail)
+    assert breaker.state == circuit_breaker.OPEN
+
+    clock.now += 60
+    assert breaker.call(lambda: "recovered") == "recovered"
+    assert breaker.state == circuit_breaker.CLOSED
+
+
+def test_deferred_queue_survives_restart(tmp_path):
+    path = str(tmp_path / "deferred.log")
+    queue = deferred_queue.DeferredQueue(path, max_attempts=2, min_compact_lines=3)
+    for i in range(3):
+        queue.defer(f"t3_p{i}", 'post', 'llm')
+    taken = queue.take(2)
+    assert [entry['fullname'] for entry in taken] == ["t3_p0", "t3_p1"]
+    assert queue.waiting() == 1
+
+    queue.resolve("t3_p0")                         # Processed after the retry
+    queue.defer("t3_p1", 'post', 'llm')            # Failed again: second attempt
+    assert queue.defer("t3_p1", 'post', 'llm') is False  # Third attempt is over the limit
+    queue.resolve("t3_never_deferred")
+
+    reloaded = deferred_queue.DeferredQueue(path)
+    assert [entry['fullname'] for entry in reloaded.take()] == ["t3_p2"]
+
+
+def test_bot_defers_candidates_while_llm_is_down(tmp_path, monkeypatch):
+    client = replay.FakeCohereClient(llm_yes_rate=1.0)
+    monkeypatch.setattr(client, 'chat', lambda **kwargs: _fail())
+    monkeypatch.setattr(client, 'chat_stream', lambda **kwargs: _fail())
+    bot = replay.prepare_bot("english_main", client)
+    monkeypatch.setattr(bot, 'chat_breaker', circuit_breaker.CircuitBreaker("test_chat", min_calls=2))
+    monkeypatch.setattr(bot, 'deferred', deferred_queue.DeferredQueue())
+
+    report = replay.run_replay(bot, _records(), output_dir=str(tmp_path))
+    outcomes = report['outcomes']
+    # Nothing is let through unverified or reported as rejected by the LLM
+    assert outcomes['leads'] == 0 and outcomes['deferred'] > 0
+    assert 'llm_verification_failed' not in outcomes['filtered']
+    assert bot.chat_breaker.state == circuit_breaker.OPEN
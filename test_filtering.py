@@ -3,6 +3,8 @@
 Test script to verify the improved filtering logic
 """
 
+from english_main import PRACTICE_SEEKING_KEYWORDS, NEGATIVE_KEYWORDS, SEEKING_INDICATORS
+
 # Test cases - should be REJECTED
 test_cases_reject = [
     "Which is totally representative of an entire population and 100% not an isolated case of one person being an asshole.",
@@ -30,58 +32,10 @@ test_cases_accept = [
 def test_filtering_logic():
     """Test the filtering logic"""
     
-    # Simulate the keyword filtering logic
-    practice_seeking_keywords = [
-        # Direct practice requests (first person)
-        'i need', 'i want', 'i am looking', 'i\'m looking', 'looking for', 'need someone',
-        'seeking', 'searching for', 'trying to find', 'anyone want to', 'anyone know',
-        
-        # Practice-specific terms
-        'practice speaking', 'speaking practice', 'conversation practice', 'practice english',
-        'practice partner', 'conversation partner', 'speaking partner', 'language exchange',
-        'study buddy', 'speaking buddy', 'practice with', 'talk with', 'chat with',
-        
-        # Community seeking
-        'discord server', 'discord group', 'english discord', 'practice group', 'study group',
-        'english community', 'speaking club', 'conversation group', 'voice chat',
-        
-        # Questions about practice
-        'how can i practice', 'where can i practice', 'how to practice', 'best way to practice',
-        'apps for practice', 'websites for practice', 'where to practice', 'how do i practice',
-        
-        # Confidence/fear related to speaking
-        'afraid to speak', 'scared to speak', 'nervous about speaking', 'shy to speak',
-        'confidence in speaking', 'embarrassed about', 'anxious about speaking'
-    ]
-    
-    negative_keywords = [
-        # Commercial/spam
-        'translate', 'translation service', 'homework help', 'essay writing service',
-        'pay for', 'selling', 'buy my', 'crypto', 'bitcoin', 'investment',
-        'spam', 'advertisement', 'promotion', 'affiliate', 'referral code',
-        
-        # General discussion/debate (not seeking practice)
-        'totally representative', 'isolated case', 'asshole', 'population',
-        'heard something recently', 'generally due to', 'step back', 'forest for the trees',
-        'in my opinion', 'i think that', 'personally i believe', 'from my experience',
-        'it depends on', 'there are many factors', 'it varies', 
-        
-        # Academic/theoretical discussions
-        'research shows', 'studies indicate', 'according to', 'evidence suggests',
-        'linguistically speaking', 'from a linguistic perspective', 'grammar rules',
-        'language acquisition theory', 'second language acquisition',
-        
-        # Giving advice (not seeking)
-        'you should', 'i recommend', 'try this', 'what works for me',
-        'in my experience', 'i suggest', 'my advice would be'
-    ]
-    
-    seeking_indicators = [
-        'i need', 'i want', 'i am looking', 'i\'m looking', 'looking for',
-        'how can i', 'where can i', 'how do i', 'where do i', 'help me',
-        'anyone know', 'does anyone', 'can someone', 'recommendations for',
-        'suggestions for', 'advice on', 'tips for'
-    ]
+    # Use the bot's own keyword lists rather than a copy of them
+    practice_seeking_keywords = PRACTICE_SEEKING_KEYWORDS
+    negative_keywords = NEGATIVE_KEYWORDS
+    seeking_indicators = SEEKING_INDICATORS
     
     def should_accept(text):
         """Test if text should be accepted"""
@@ -0,0 +1,65 @@
+import corpus
+import freshness
+import work_queue
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 10000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _post(subreddit="EnglishLearning"):
+    return corpus.StubSubmission({'id': 'f1', 'type': 'post', 'subreddit': subreddit, 'created_utc': 9900.0})
+
+
+def test_breakdown_splits_time_to_lead_by_stage():
+    clock = _Clock()
+    tracker = freshness.FreshnessTracker(alert_seconds=120, clock=clock, sleep=clock.sleep)
+    post = _post()
+    tracker.ingested(post)          # 100s after posting
+    clock.now += 3
+    tracker.sleep(2)                # Consumer throttles while the post waits
+    tracker.dequeued(post)
+    clock.now += 10
+    alerts = freshness.freshness_alerts.labels(subreddit='englishlearning').value
+
+    seconds = tracker.observe(post, {'embedding': 0.5, 'llm': 8.0})
+    assert seconds == {
+        'poll_lag': 100.0, 'queue_wait': 3.0, 'throttle': 2.0,
+        'embedding': 0.5, 'llm': 8.0, 'processing': 1.5, 'total': 115.0,
+    }
+    assert freshness.freshness_alerts.labels(subreddit='englishlearning').value == alerts
+    assert freshness.lead_freshness.labels(subreddit='englishlearning', stage='llm').count >= 1
+
+    late = _post()
+    tracker.ingested(late)
+    tracker.dequeued(late)
+    clock.now += 30
+    assert tracker.observe(late, {})['total'] == 145.0
+    assert freshness.freshness_alerts.labels(subreddit='englishlearning').value == alerts + 1
+
+    # Items that never went through the live queue (replays) have no breakdown
+    assert tracker.observe(_post(), {}) is None
+
+
+def test_ingest_time_survives_the_durable_queue(tmp_path):
+    queue = work_queue.DurableWorkQueue(str(tmp_path / "queue.db"))
+    post = _post()
+    post.ingested_at = 9950.0
+    queue.put(('post', post))
+    _, leased = queue.get(timeout=1)
+    assert leased.ingested_at == 9950.0
+
+
+def test_report_percentiles_per_subreddit():
+    breakdowns = [('a', {'total': float(n)}) for n in range(1, 101)] + [('b', {'total': 500.0})]
+    table = freshness.report(breakdowns)
+    assert table['a']['total'] == {'count': 100, 'p50': 50.0, 'p90': 90.0, 'p99': 99.0}
+    assert table['all']['total']['count'] == 101
+    assert table['b']['total']['p50'] == 500.0
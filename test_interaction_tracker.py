@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Tests for the heap-based interaction cooldown tracker
+"""
+
+import interaction_tracker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cooldown_and_incremental_expiry():
+    clock = _Clock()
+    tracker = interaction_tracker.InteractionTracker(cooldown_seconds=100, clock=clock)
+    tracker.record("alice")
+    clock.now += 60
+    tracker.record("bob")
+    tracker.record("alice")  # Re-interaction restarts alice's cooldown
+
+    clock.now += 50
+    assert not tracker.can_interact("alice") and not tracker.can_interact("bob")
+    assert tracker.can_interact("carol")
+    assert tracker.expire() == 0  # alice's first entry is superseded, not expired
+
+    clock.now += 60
+    assert tracker.can_interact("alice") and tracker.can_interact("bob")
+    assert tracker.expire() == 2
+    assert len(tracker) == 0 and not tracker._heap
+
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Tests for keyword gate scanning
+"""
+
+import keyword_gates
+import english_main
+import webindexer_main
+from test_filtering import test_cases_accept
+
+
+def test_scan_matches_substrings_per_gate_in_order():
+    gates = keyword_gates.KeywordGates(seeking=['looking for', 'vs '], negative=['spam'])
+    assert gates.scan("spam looking for vs z") == {'seeking': ['looking for', 'vs '], 'negative': ['spam']}
+    assert gates.scan("nothing") == {'seeking': [], 'negative': []}
+
+
+def test_unreadable_items_are_left_to_process_content():
+    for bot in (english_main, webindexer_main):
+        assert bot.scan_keywords(object(), 'comment') is None
+
+    class _Comment:
+        body = test_cases_accept[0]
+    hits = english_main.scan_keywords(_Comment(), 'comment')
+    assert hits == english_main.KEYWORD_GATES.scan(test_cases_accept[0].lower())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for the TTL lead registry and its append log
+"""
+
+import json
+import lead_registry
+from datetime import datetime
+
+
+class _Clock:
+    def __init__(self):
+        self.now = datetime(2025, 1, 15).timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+def test_registry_expires_migrates_and_compacts(tmp_path):
+    clock = _Clock()
+    legacy = tmp_path / "identified_leads.json"
+    legacy.write_text(json.dumps({
+        "old_lead": datetime(2024, 6, 1).isoformat(),
+        "recent_lead": datetime(2025, 1, 10).isoformat(),
+    }))
+    path = str(tmp_path / "identified_leads.log")
+
+    registry = lead_registry.LeadRegistry(path, 30 * 86400, legacy_path=str(legacy), clock=clock, min_compact_lines=4)
+    assert "recent_lead" in registry and "old_lead" not in registry
+    for i in range(3):
+        registry.add(f"user{i}")
+    assert "user0" in registry
+
+    # Re-engagement TTL passes; the next append finds 5 log lines for 1 live lead and compacts
+    clock.now += 31 * 86400
+    registry.add("user5")
+    assert "recent_lead" not in registry and "user0" not in registry
+
+    with open(path) as f:
+        assert [line.split("\t")[0] for line in f] == ["user5"]
+    reloaded = lead_registry.LeadRegistry(path, 30 * 86400, legacy_path=str(legacy), clock=clock)
+    assert len(reloaded) == 1 and "user5" in reloaded
+
+
+def test_expiring_in_memory_leaves_the_log_to_its_own_compaction(tmp_path):
+    clock = _Clock()
+    path = tmp_path / "identified_leads.log"
+    registry = lead_registry.LeadRegistry(str(path), 30 * 86400, clock=clock, min_compact_lines=4)
+    for i in range(3):
+        registry.add(f"user{i}")
+    before = path.read_text()
+
+    clock.now += 31 * 86400
+    assert registry.expire() == 3 and len(registry) == 0
+    assert path.read_text() == before  # Memory pressure does not rewrite the file
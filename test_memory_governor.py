@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory budget governor
+"""
+
+import gc
+import memory_governor
+
+
+def test_budget_triggers_evictors_and_gc_pauses_are_timed():
+    evicted = []
+    governor = memory_governor.MemoryGovernor(budget_mb=1)  # Any real process is over 1MB
+    governor.pause_timer.install()
+    governor.track("items", lambda: 3)
+    governor.add_evictor("cache", lambda: evicted.append(True))
+    try:
+        assert governor.check()
+        assert evicted == [True]
+        assert governor.over_budget  # Expiring wasn't enough, so intake has to wait
+        assert governor.sizes() == {"items": 3}
+        assert governor.pause_timer.max_pause > 0
+        assert memory_governor.gc_pause.labels(generation="2").count >= 1
+    finally:
+        gc.callbacks.remove(governor.pause_timer)
+
+    assert not memory_governor.MemoryGovernor(budget_mb=0).check()
+
+
+def test_intake_waits_for_the_backlog_to_drain_only_while_over_budget():
+    governor = memory_governor.MemoryGovernor(budget_mb=1)
+    assert governor.wait_for_headroom(lambda: 100, poll=0.01) < 0.01  # Within budget: never waits
+
+    governor.over_budget = True
+    backlog = [3, 2, 1, 0]
+    assert governor.wait_for_headroom(lambda: backlog.pop(0), poll=0.01) >= 0.03
+    assert governor.wait_for_headroom(lambda: 0, poll=0.01) < 0.01  # Nothing queued: the budget can't be helped by waiting
+
+
+def test_startup_heap_is_frozen_out_of_collections():
+    gc.unfreeze()
+    startup_objects = [{"model": i} for i in range(1000)]
+    try:
+        memory_governor.freeze_startup_heap()
+        assert gc.get_freeze_count() >= len(startup_objects)
+    finally:
+        gc.unfreeze()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the metrics registry and exporters
+"""
+
+import json
+import threading
+import urllib.request
+
+import metrics
+
+
+def test_counters_are_thread_safe_and_labelled():
+    registry = metrics.MetricsRegistry()
+    filtered = registry.counter("items_filtered_total", "Filtered items", ["reason"])
+
+    def work():
+        for _ in range(1000):
+            filtered.labels(reason="low_similarity").inc()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    filtered.labels(reason="negative_keywords").inc()
+
+    assert filtered.labels(reason="low_similarity").value == 4000
+    assert filtered.total() == 4001
+    assert 'items_filtered_total{reason="negative_keywords"} 1' in registry.render_prometheus()
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.MetricsRegistry()
+    latency = registry.histogram("stage_duration_seconds", "Stage latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.labels(stage="llm").observe(value)
+
+    text = registry.render_prometheus()
+    assert 'stage_duration_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'stage_duration_seconds_bucket{stage="llm",le="1.0"} 3' in text
+    assert 'stage_duration_seconds_bucket{stage="llm",le="+Inf"} 4' in text
+    assert latency.labels(stage="llm").quantile(0.5) == 1.0
+
+
+
+def test_histogram_snapshot_is_consistent_while_observing():
+    registry = metrics.MetricsRegistry()
+    latency = registry.histogram("stage_duration_seconds", "Stage latency", buckets=(0.5, 2.0))
+    stop = threading.Event()
+
+    def work():
+        while not stop.is_set():
+            latency.observe(1.0)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(2000):
+            snapshot = latency.snapshot()["all"]
+            assert snapshot["sum"] == snapshot["count"]  # Every observation is 1.0
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+def test_http_endpoint_and_snapshot(tmp_path):
+    registry = metrics.MetricsRegistry()
+    registry.counter("leads_found_total", "Leads").inc(3)
+    registry.gauge("queue_depth", "Queue depth").set_function(lambda: 7)
+
+    server = metrics.start_http_server(0, registry=registry)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+        assert "leads_found_total 3" in body
+        assert "queue_depth 7" in body
+    finally:
+        server.shutdown()
+
+    path = tmp_path / "metrics.json"
+    metrics.write_snapshot(str(path), registry)
+    snapshot = json.loads(path.read_text())
+    assert snapshot["metrics"]["leads_found_total"] == 3
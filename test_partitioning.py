@@ -0,0 +1,63 @@
+import corpus
+import partitioning
+
+SUBREDDITS = [f"sub{i}" for i in range(300)]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_adding_an_instance_only_moves_subreddits_to_it():
+    before = partitioning.HashRing(["0", "1", "2"])
+    after = partitioning.HashRing(["0", "1", "2", "3"])
+    moved = [name for name in SUBREDDITS if before.owner(name) != after.owner(name)]
+    assert all(after.owner(name) == "3" for name in moved)
+    assert 0.1 < len(moved) / len(SUBREDDITS) < 0.4
+
+    without_1 = partitioning.HashRing(["0", "2"])
+    assert all(before.owner(name) == "1" for name in SUBREDDITS if before.owner(name) != without_1.owner(name))
+
+
+def test_static_instances_split_the_list():
+    owned = [
+        partitioning.SubredditPartition(SUBREDDITS, i, instance_count=3).refresh()[0]
+        for i in range(3)
+    ]
+    assert sorted(sum(owned, [])) == sorted(SUBREDDITS)
+    assert all(owned)
+
+
+def test_lease_handover_and_failover(tmp_path):
+    clock = _Clock()
+    a = partitioning.SubredditPartition(SUBREDDITS, "a", lease_dir=str(tmp_path), lease_seconds=90, clock=clock)
+    b = partitioning.SubredditPartition(SUBREDDITS, "b", lease_dir=str(tmp_path), lease_seconds=90, clock=clock)
+
+    assert len(a.refresh()[0]) == len(SUBREDDITS)  # Alone: everything
+    assert b.refresh() == ([], [])                 # Waits until a has seen it join
+
+    moving = [name for name in SUBREDDITS if partitioning.HashRing(["a", "b"]).owner(name) == "b"]
+    post = corpus.StubSubmission({'id': 'p1', 'type': 'post', 'subreddit': moving[0], 'created_utc': 1500.0})
+    a.record('post', post)
+    acquired, released = a.refresh()
+    assert acquired == [] and released == moving
+    assert not a.owns(moving[0])
+
+    acquired, _ = b.refresh()
+    assert acquired == moving
+    assert set(a.owned).isdisjoint(b.owned) and len(a.owned) + len(b.owned) == len(SUBREDDITS)
+    # b picks up where a stopped ingesting
+    assert b.handoff_positions(moving)['post'][moving[0]]['fullname'] == 't3_p1'
+
+    # b dies: once its lease expires a takes everything back
+    clock.now += 60
+    a.refresh()
+    clock.now += 60
+    assert a.owns(a.owned_subreddits()[0])  # Renewed at +60, so still valid
+    acquired, _ = a.refresh()
+    assert sorted(acquired) == sorted(moving)
+    assert len(a.owned) == len(SUBREDDITS)
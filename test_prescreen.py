@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the local pre-screen classifier
+"""
+
+import numpy as np
+import prescreen
+import replay
+import verdict_log
+from test_replay import _records
+
+
+def test_prescreen_decides_confident_items_locally(tmp_path):
+    rng = np.random.default_rng(1)
+    direction = rng.normal(size=32)
+    embeddings = rng.normal(size=(300, 32))
+    y = (embeddings @ direction + rng.normal(scale=2.0, size=300) > 0).astype(float)
+    similarities = rng.uniform(0.5, 0.7, size=300)
+    X = prescreen._features(embeddings, similarities)
+
+    probabilities = prescreen.out_of_fold_probabilities(X, y)
+    accept_above, reject_below = prescreen.choose_cutoffs(probabilities, y, target_precision=0.95, max_missed=0.05)
+    assert reject_below < accept_above <= 1.0
+    assert y[probabilities >= accept_above].mean() >= 0.95
+    assert y[probabilities < reject_below].sum() <= 0.05 * y.sum()
+
+    weights, bias = prescreen.fit_logistic(X, y)
+    path = str(tmp_path / "prescreen.npz")
+    prescreen.PrescreenModel(weights, bias, accept_above, reject_below, "embed-english-v3.0").save(path)
+    assert prescreen.PrescreenModel.load(path, "another-model") is None
+    model = prescreen.PrescreenModel.load(path, "embed-english-v3.0")
+
+    verdicts = [model.decide(embedding, sim)[0] for embedding, sim in zip(embeddings, similarities)]
+    assert verdicts.count('uncertain') < len(verdicts)  # Some items never need the LLM
+    assert model.decide(direction * 10, 0.6)[0] == 'accept'
+    assert model.decide(-direction * 10, 0.6)[0] == 'reject'
+
+
+def test_logged_weights_count_in_the_cutoffs():
+    # 40 leads between 0.80 and 0.99, and one rejection at 0.85 that was sampled from 50 local accepts
+    probabilities = np.append(np.linspace(0.80, 0.99, 40), 0.85)
+    y = np.append(np.ones(40), 0.0)
+    assert prescreen.choose_cutoffs(probabilities, y, target_precision=0.95)[0] == 0.80
+    item_weights = np.append(np.ones(40), 50.0)
+    assert prescreen.choose_cutoffs(probabilities, y, target_precision=0.95, item_weights=item_weights)[0] > 0.85
+
+    rng = np.random.default_rng(2)
+    X = prescreen._features(rng.normal(size=(41, 8)), probabilities)
+    unweighted, _ = prescreen.fit_logistic(X, y)
+    assert np.allclose(prescreen.fit_logistic(X, y, np.ones(41))[0], unweighted)  # Unit weights change nothing
+    # Classes stay balanced; weights shift the fit among the items of a class
+    assert not np.allclose(prescreen.fit_logistic(X, y, np.append(50.0, np.ones(40)))[0], unweighted)
+
+
+def test_bot_logs_every_llm_verdict_with_the_embedding_it_decided_on(tmp_path):
+    client = replay.FakeCohereClient(llm_yes_rate=0.5)
+    bot = replay.prepare_bot("english_main", client)
+    max_tokens, bot.EMBED_MAX_TOKENS = bot.EMBED_MAX_TOKENS, 8  # Several chunks per text
+    bot.llm_verdicts = verdict_log.VerdictLog("english", bot.EMBED_MODEL, directory=str(tmp_path))
+    try:
+        replay.run_replay(bot, _records(), output_dir=str(tmp_path / "replay"))
+    finally:
+        bot.llm_verdicts.close()
+        bot.llm_verdicts = None
+        bot.EMBED_MAX_TOKENS = max_tokens
+
+    verdicts = verdict_log.load_verdicts("english", str(tmp_path), bot.EMBED_MODEL)
+    assert len(verdicts) == client.chat_calls and {v['verdict'] for v in verdicts} == {True, False}
+    targets = bot.target_embeddings / np.linalg.norm(bot.target_embeddings, axis=1, keepdims=True)
+    for verdict in verdicts:
+        embedding = np.asarray(verdict['embedding'])
+        best = float(np.max(targets @ (embedding / np.linalg.norm(embedding))))
+        assert abs(best - verdict['similarity_score']) < 1e-3  # The best chunk, not the first
+
+    items = prescreen.load_training_items("english", str(tmp_path), bot.EMBED_MODEL)
+    assert [(label, weight) for _, _, label, weight in items] == [(int(v["verdict"]), v["weight"]) for v in verdicts]
+    assert prescreen.load_training_items("english", str(tmp_path), "another-model") == []
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for per-item stage spans and the runtime profiler toggle
+"""
+
+import os
+import time
+import pytest
+
+import metrics
+import profiling
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+def test_trace_observes_each_stage_once_per_item():
+    histogram = metrics.MetricsRegistry().histogram("stage_seconds", "Stage latency", ["stage"])
+    trace = profiling.ItemTrace(histogram)
+    for _ in range(3):
+        with trace.span('praw_attributes'):
+            time.sleep(0.001)
+    trace.record('file_write', 0.25)
+    trace.record('file_write', 0.5)
+    assert histogram.labels(stage='file_write').count == 0  # Nothing observed mid-item
+
+    total = trace.finish()
+    writes = histogram.labels(stage='file_write')
+    assert (writes.count, writes.sum) == (1, 0.75)
+    attributes = histogram.labels(stage='praw_attributes')
+    assert attributes.count == 1 and attributes.sum == trace.spans['praw_attributes'] >= 0.003
+    assert histogram.labels(stage='total').sum == total == trace.spans['total']
+    assert trace.as_ms()['file_write'] == 750.0
+
+
+def test_toggle_dumps_a_profile_per_run(tmp_path):
+    with pytest.raises(ValueError):
+        profiling.ProfilerToggle("perf")
+
+    toggle = profiling.ProfilerToggle("sample", str(tmp_path), label="test", sample_interval=0.001)
+    assert toggle.toggle() is None and toggle.active
+    _busy(0.05)
+    path = toggle.toggle()
+    assert not toggle.active and path.endswith(".collapsed")
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines and any("_busy (test_profiling.py" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    toggle = profiling.ProfilerToggle("cprofile", str(tmp_path / "cprofile"), label="test")
+    toggle.toggle()
+    _busy(0.01)
+    path = toggle.toggle()
+    assert path.endswith(".prof") and os.path.getsize(path) > 0
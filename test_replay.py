@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline replay harness and corpus format
+"""
+
+import corpus
+import replay
+from test_filtering import test_cases_accept, test_cases_reject
+
+
+def _records():
+    records = []
+    for i, text in enumerate(test_cases_accept + test_cases_reject):
+        records.append({
+            'id': f"p{i}", 'type': 'post', 'subreddit': 'EnglishLearning', 'author': f"user{i}",
+            'title': text, 'selftext': '', 'url': None, 'score': 1,
+            'created_utc': 1736935800.0 + i, 'permalink': f"/r/EnglishLearning/comments/p{i}/",
+        })
+    records.append({
+        'id': 'c1', 'type': 'comment', 'subreddit': 'EnglishLearning', 'author': 'AutoModerator',
+        'body': 'I need speaking practice', 'score': 1, 'created_utc': 1736935900.0,
+        'permalink': '/r/EnglishLearning/comments/p0/_/c1/',
+    })
+    return records
+
+
+def test_corpus_round_trip(tmp_path):
+    path = str(tmp_path / "corpus.jsonl.gz")
+    corpus.write_corpus(path, _records())
+    records = list(corpus.read_corpus(path))
+    assert records == _records()
+
+    content_type, stub = corpus.stub_from_record(records[-1])
+    assert content_type == 'comment'
+    assert stub.author in ['automoderator']
+    assert stub.fullname == 't1_c1'
+
+
+def test_replay_runs_real_pipeline(tmp_path):
+    client = replay.FakeCohereClient(llm_yes_rate=1.0)
+    bot = replay.prepare_bot("english_main", client)
+    report = replay.run_replay(bot, _records(), output_dir=str(tmp_path))
+
+    outcomes = report['outcomes']
+    assert report['items'] == len(_records())
+    assert not outcomes['errors']
+    # Every accept case passes the keyword gates; the AutoModerator comment is skipped
+    assert outcomes['leads'] + sum(outcomes['filtered'].values()) == len(_records()) - 1
+    assert outcomes['filtered'].get('no_practice_keywords', 0) + outcomes['filtered'].get('negative_keywords', 0) \
+        + outcomes['filtered'].get('no_seeking_language', 0) == len(test_cases_reject)
+    assert 'keyword_scan' in report['stages'] and 'embedding' in report['stages']
+    assert report['provider_calls']['embed'] == len(_records()) - 1
+
+
+def test_corpus_recorder_writes_replayable_files(tmp_path):
+    recorder = corpus.CorpusRecorder(str(tmp_path), prefix="test", flush_interval=0.05)
+    for record in _records():
+        content_type, stub = corpus.stub_from_record(record)
+        recorder.record(stub, content_type)
+    recorder.close()
+
+    files = sorted(tmp_path.glob("test-*.jsonl.gz"))
+    assert len(files) == 1 and recorder.recorded == len(_records()) and not recorder.dropped
+    assert list(corpus.read_corpus(str(files[0]))) == _records()
+
+
+def test_replay_scores_labelled_records(tmp_path):
+    records = _records()
+    for record in records:
+        record['label'] = record['title'] in test_cases_accept if 'title' in record else False
+    bot = replay.prepare_bot("english_main", replay.FakeCohereClient(llm_yes_rate=1.0))
+    report = replay.run_replay(bot, records, output_dir=str(tmp_path))
+
+    labels = report['labels']
+    assert labels['labeled'] == len(records) and labels['positives'] == len(test_cases_accept)
+    assert 0 < labels['recall'] <= 1 and labels['precision'] == 1.0
+
+
+def test_streamed_verdicts_stop_early_on_rejections(tmp_path, monkeypatch):
+    reports = {}
+    for streaming in (False, True):
+        bot = replay.prepare_bot("english_main", replay.FakeCohereClient(llm_yes_rate=0.5))
+        monkeypatch.setattr(bot, "LLM_STREAMING", streaming)
+        reports[streaming] = replay.run_replay(bot, _records(), output_dir=str(tmp_path / str(streaming)))
+
+    assert reports[True]['outcomes']['leads'] == reports[False]['outcomes']['leads']
+    assert reports[True]['outcomes']['filtered'] == reports[False]['outcomes']['filtered']
+    assert reports[True]['provider_calls']['chat'] == reports[False]['provider_calls']['chat']
+    assert reports[True]['provider_calls']['chat_tokens'] < reports[False]['provider_calls']['chat_tokens']
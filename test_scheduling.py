@@ -0,0 +1,87 @@
+import sqlite3
+import corpus
+import scheduling
+import work_queue
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _item(item_id, content_type='comment', subreddit='a', created_utc=99000.0):
+    record = {'id': item_id, 'type': content_type, 'subreddit': subreddit, 'created_utc': created_utc}
+    return corpus.stub_from_record(record)
+
+
+def _scored(scorer, item_id, content_type='comment', keyword_hits=None, **fields):
+    content_type, content = _item(item_id, content_type, **fields)
+    content.priority = scorer.score(content_type, content, keyword_hits)
+    return content_type, content
+
+
+def test_fresh_keyword_posts_overtake_the_backlog():
+    scorer = scheduling.PriorityScorer(boost_gates=('practice',), penalty_gates=('negative',))
+    queue = scheduling.PriorityContentQueue()
+    for i in range(5):
+        queue.put(_scored(scorer, f"c{i}"))
+    queue.put(_scored(scorer, "spam", 'post', {'practice': ['speaking'], 'negative': ['sale']}))
+    queue.put(_scored(scorer, "lead", 'post', {'practice': ['speaking', 'partner']}))
+    queue.put(_scored(scorer, "old", 'post', {'practice': ['speaking']}, created_utc=90000.0))
+
+    order = [queue.get_nowait()[1].id for _ in range(queue.qsize())]
+    # Negative keywords cancel the post's lead; equal priorities stay FIFO; "old" is hours older than the rest
+    assert order == ["lead", "c0", "c1", "c2", "c3", "c4", "spam", "old"]
+
+
+def test_subreddits_that_yield_leads_score_higher():
+    scorer = scheduling.PriorityScorer()
+    for i in range(200):
+        scorer.record_outcome("good", i % 10 == 0)
+        scorer.record_outcome("quiet", False)
+    assert scorer.relative_yield("good") > 1.5 > 1.0 > scorer.relative_yield("quiet")
+    assert scorer.score('comment', _item("g", subreddit="Good")[1]) > scorer.score('comment', _item("q", subreddit="quiet")[1])
+
+
+def test_durable_queue_leases_by_priority(tmp_path):
+    path = str(tmp_path / "queue.db")
+    # A queue file from before priorities existed is upgraded in place
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE items (id INTEGER PRIMARY KEY AUTOINCREMENT, fullname TEXT NOT NULL, content_type TEXT NOT NULL,"
+        " record TEXT NOT NULL, state TEXT NOT NULL DEFAULT '{}', leased_until REAL NOT NULL DEFAULT 0,"
+        " deliveries INTEGER NOT NULL DEFAULT 0)"
+    )
+    db.commit()
+    db.close()
+
+    queue = work_queue.DurableWorkQueue(path)
+    for item_id, priority in (("low", 1.0), ("high", 5.0), ("mid", 3.0)):
+        content_type, content = _item(item_id)
+        content.priority = priority
+        queue.put((content_type, content))
+    leased = [queue.get_nowait()[1] for _ in range(3)]
+    assert [content.id for content in leased] == ["high", "mid", "low"]
+    assert leased[0].priority == 5.0
+
+
+def test_stale_items_are_shed_or_deferred_only_under_sustained_overload():
+    clock = _Clock()
+    shedder = scheduling.LoadShedder(deadline_seconds=600, overload_backlog=100, overload_seconds=60, clock=clock)
+    _, stale = _item("s", created_utc=clock.now - 3600)
+    _, fresh = _item("f", created_utc=clock.now - 30)
+
+    assert shedder.decide(stale, False, 500) is None   # Backlog just appeared
+    clock.now += 61
+    assert shedder.decide(fresh, False, 500) is None
+    assert shedder.decide(stale, False, 500) == 'shed'
+    assert shedder.decide(stale, True, 500) == 'defer'
+    stale.priority = scheduling.DEFERRED_PRIORITY
+    assert shedder.decide(stale, True, 500) is None    # Deferred once already
+
+    assert shedder.decide(stale, False, 10) is None    # Backlog cleared
+    clock.now += 61
+    assert shedder.decide(stale, False, 500) is None   # Overload has to last again
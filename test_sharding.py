@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for activity-based sharding and missed-item estimates
+"""
+
+import sharding
+import corpus
+
+
+def _post(i, subreddit):
+    return corpus.StubSubmission({'id': f"p{i}", 'type': 'post', 'subreddit': subreddit, 'created_utc': float(i)})
+
+
+class _FakeMultireddit:
+    def __init__(self, reddit, names):
+        self.reddit = reddit
+        self.names = names
+
+    def new(self, limit=None):
+        posts = [p for p in self.reddit.posts if p.subreddit.display_name in self.names]
+        return iter(sorted(posts, key=lambda p: -p.created_utc)[:limit])
+
+
+class _FakeReddit:
+    def __init__(self):
+        self.posts = []
+
+    def subreddit(self, name):
+        return _FakeMultireddit(self, name.split("+"))
+
+
+def test_busy_subreddits_get_their_own_shards():
+    rates = {"programming": 4.0, "technology": 3.0, "webdev": 0.5, "freelance": 0.1, "solopreneur": 0.01}
+    shards = sharding.plan_shards(list(rates) + ["webdev"], rates, capacity=5.0, max_shards=8)
+    assert shards == [["programming", "webdev", "freelance", "solopreneur"], ["technology"]]
+    assert len(sharding.plan_shards(list(rates), rates, capacity=0.2, max_shards=3)) == 3
+
+
+def test_overflowing_window_reports_missed_items():
+    reddit = _FakeReddit()
+    ingestion = sharding.ShardedIngestion(reddit, ["busy"], 'post', on_item=None, limit=10)
+    ingestion.rates = {"busy": 1.0}
+    shard = sharding._Shard("posts-test")
+    shard.reset(["busy"])
+
+    reddit.posts = [_post(i, "busy") for i in range(10)]
+    assert [p.id for p in ingestion._poll_once(shard)] == [f"p{i}" for i in range(10)]
+    reddit.posts += [_post(i, "busy") for i in range(10, 15)]
+    assert [p.id for p in ingestion._poll_once(shard)] == [f"p{i}" for i in range(10, 15)]
+    assert shard.missed_estimate == 0
+
+    # 30 more arrive before the next poll; only the newest 10 are visible
+    reddit.posts += [_post(i, "busy") for i in range(15, 45)]
+    assert len(list(ingestion._poll_once(shard))) == 10
+    assert shard.missed_estimate > 0
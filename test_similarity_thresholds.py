@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for similarity threshold calibration
+"""
+
+import sys
+import json
+import pytest
+
+import corpus
+import similarity_thresholds
+import verdict_log
+
+
+def _item(score, topic, subreddit, **extra):
+    return dict(similarity_score=score, best_matching_topic=topic, subreddit=subreddit, **extra)
+
+
+def test_calibration_keeps_recall_and_skips_llm_calls(tmp_path):
+    leads = [_item(0.60 + i / 100, "I need speaking practice", "EnglishLearning") for i in range(20)]
+    rejected = [_item(0.51 + i / 100, "I need speaking practice", "EnglishLearning", filter_reason='llm_verification_failed')
+                for i in range(10)]
+    rejected.append(_item(0.30, "x", "IELTS", filter_reason='low_similarity'))  # Never reached the LLM
+    (tmp_path / "english_leads_2025-01-15.json").write_text(json.dumps(leads))
+    (tmp_path / "unfiltered_english_leads_2025-01-15.json").write_text(json.dumps(rejected))
+
+    examples = similarity_thresholds.load_labeled_examples("english", str(tmp_path))
+    assert len(examples) == 30
+    config = similarity_thresholds.calibrate(examples, target_recall=0.95, min_examples=20, min_positives=5)
+
+    # 19 of 20 leads (>= 0.61) still pass; all 10 rejections (<= 0.60) no longer reach the LLM
+    assert sum(1 for lead in leads if lead['similarity_score'] > config['default']) == 19
+    assert config['default_llm_calls_skipped'] == 10
+    assert set(config['subreddits']) == {"EnglishLearning"}
+
+    path = tmp_path / "thresholds.json"
+    path.write_text(json.dumps(config))
+    thresholds = similarity_thresholds.SimilarityThresholds.load(str(path))
+    assert thresholds.threshold_for("I need speaking practice", "englishlearning", 0.5) == config['default']
+    assert thresholds.threshold_for("other topic", "IELTS", 0.5) == config['default']
+    assert similarity_thresholds.SimilarityThresholds.load(str(tmp_path / "missing.json")).threshold_for("t", "s", 0.5) == 0.5
+
+
+def test_calibration_reads_the_verdict_log_and_needs_negatives(tmp_path, monkeypatch):
+    log = verdict_log.VerdictLog("english", "embed-english-v3.0", directory=str(tmp_path))
+    for i in range(30):
+        _, content = corpus.stub_from_record({'id': f"v{i}", 'type': 'post', 'subreddit': 'EnglishLearning'})
+        log.record(content, 0.55 + i / 100, "I need speaking practice", [0.1, 0.2], i >= 3)
+    log.close()
+    # Older files are ignored once there is a verdict log
+    (tmp_path / "english_leads_2025-01-15.json").write_text(json.dumps([_item(0.9, "x", "IELTS")]))
+
+    examples = similarity_thresholds.load_labeled_examples("english", str(tmp_path))
+    assert len(examples) == 30 and sum(1 for *_, is_lead in examples if not is_lead) == 3
+    config = similarity_thresholds.calibrate(examples, min_examples=20, min_positives=5)
+    assert config['subreddits'] == {} and config['topics'] == {}  # 3 rejections are too few for an override
+
+    output = tmp_path / "thresholds.json"
+    monkeypatch.setattr(sys, 'argv', ["similarity_thresholds.py", "--data-dir", str(tmp_path), "--output", str(output)])
+    with pytest.raises(SystemExit):
+        similarity_thresholds.main()
+    assert not output.exists()
+
+
+def test_weighted_samples_below_the_threshold_bring_it_down(tmp_path):
+    log = verdict_log.VerdictLog("english", "embed-english-v3.0", directory=str(tmp_path))
+    for i in range(40):  # Above the calibrated threshold of 0.70: every item reached the LLM
+        _, content = corpus.stub_from_record({'id': f"a{i}", 'type': 'post', 'subreddit': 'EnglishLearning'})
+        log.record(content, 0.71 + i / 200, "I need speaking practice", [0.1], i % 4 != 0)
+    for i in range(4):  # Between 0.5 and 0.70: only the 5% sample reached it, each standing for 20 items
+        _, content = corpus.stub_from_record({'id': f"b{i}", 'type': 'post', 'subreddit': 'EnglishLearning'})
+        log.record(content, 0.60 + i / 100, "I need speaking practice", [0.1], i % 2 == 0, weight=20)
+    log.close()
+
+    examples = similarity_thresholds.load_labeled_examples("english", str(tmp_path))
+    config = similarity_thresholds.calibrate(examples, target_recall=0.95)
+    # 40 weighted leads lie below 0.70 next to 30 above it: keeping 95% of them needs the lowest sample
+    assert config['default'] < 0.60
+    unweighted = [(score, topic, subreddit, 1.0, is_lead) for score, topic, subreddit, _, is_lead in examples]
+    assert similarity_thresholds.calibrate(unweighted, target_recall=0.95)['default'] > 0.60
+
+
+def test_exploration_samples_a_stable_share_of_items():
+    sampled = [f"t3_{i}" for i in range(10000) if verdict_log.sampled(f"t3_{i}", 0.05, 'similarity')]
+    assert 400 < len(sampled) < 600
+    assert all(verdict_log.sampled(fullname, 0.05, 'similarity') for fullname in sampled)  # Same on redelivery
+    assert not any(verdict_log.sampled(f"t3_{i}", 0, 'similarity') for i in range(100))
@@ -0,0 +1,61 @@
+import json
+import pytest
+import sink
+
+
+def test_records_are_batched_and_flushed(tmp_path):
+    path = tmp_path / "leads.json"
+    path.write_text(json.dumps([{'n': -1}]))
+    writer = sink.JsonArraySink("test_leads", flush_interval=60, max_batch=1000)
+    for n in range(50):
+        writer.put(str(path), {'n': n})
+    assert len(json.loads(path.read_text())) == 1  # Still buffered
+
+    assert writer.flush()
+    assert [record['n'] for record in json.loads(path.read_text())] == list(range(-1, 50))
+
+
+def test_close_writes_each_file_once(tmp_path, monkeypatch):
+    writes = []
+    writer = sink.JsonArraySink("test_filtered", flush_interval=60)
+    original = writer._append
+    monkeypatch.setattr(writer, '_append', lambda path, records: writes.append(path) or original(path, records))
+    for n in range(10):
+        writer.put(str(tmp_path / f"day{n % 2}.json"), {'n': n})
+    writer.close()
+
+    assert sorted(writes) == [str(tmp_path / "day0.json"), str(tmp_path / "day1.json")]
+    assert [record['n'] for record in json.loads((tmp_path / "day1.json").read_text())] == [1, 3, 5, 7, 9]
+
+
+def test_corrupt_file_is_set_aside_instead_of_failing_forever(tmp_path):
+    path = tmp_path / "leads.json"
+    path.write_text('[{"n": 0}, {"n"')  # Torn write
+    (tmp_path / "leads.json.corrupt").write_text("older")
+    writer = sink.JsonArraySink("test_corrupt", flush_interval=60)
+    writer.put(str(path), {'n': 1})
+    assert writer.flush()
+
+    assert json.loads(path.read_text()) == [{'n': 1}]
+    assert not writer._pending
+    set_aside = sorted(p.name for p in tmp_path.glob("leads.json.*corrupt"))
+    assert len(set_aside) == 2 and (tmp_path / "leads.json.corrupt").read_text() == "older"
+    assert sink.sink_corrupt.labels(sink="test_corrupt").value == 1
+    writer.close()
+
+
+def test_write_returns_once_on_disk_and_raises_instead_of_retrying(tmp_path):
+    path = tmp_path / "leads.json"
+    writer = sink.JsonArraySink("test_write", flush_interval=60)
+    writer.put(str(path), {'n': 0})
+    writer.write(str(path), {'n': 1})  # Doesn't wait out the flush interval
+    assert json.loads(path.read_text()) == [{'n': 0}, {'n': 1}]
+
+    failing = tmp_path / "missing-dir" / "leads.json"
+    writer.put(str(failing), {'n': 2})
+    with pytest.raises(sink.CommitError):
+        writer.write(str(failing), {'n': 3})
+    # The caller redoes its own record; only the buffered one is still waiting to be retried
+    assert [entry[1] for entry in writer._pending] == [{'n': 2}]
+    writer._pending.clear()
+    writer.close()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for the self-healing stream supervisor
+"""
+
+import time
+import stream_supervisor
+
+
+def test_backoff_delay_is_bounded():
+    for failures in range(1, 20):
+        assert 0 <= stream_supervisor.backoff_delay(failures, 5, 300) <= min(300, 5 * 2 ** (failures - 1))
+
+
+def test_supervisor_restarts_failed_and_stale_streams():
+    attempts = []
+    received = []
+
+    def factory():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise ConnectionError("stream dropped")
+        if len(attempts) == 2:
+            yield "a"
+            while True:  # Wedged: only empty polls from here on
+                time.sleep(0.01)
+                yield None
+        yield "b"
+        while True:
+            time.sleep(0.01)
+            yield None
+
+    supervisor = stream_supervisor.StreamSupervisor(
+        "test", factory, received.append, stale_after=0.1, base_delay=0.01, max_delay=0.02
+    ).start()
+    deadline = time.monotonic() + 5
+    while received != ["a", "b"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    supervisor.stop()
+
+    assert received == ["a", "b"]
+    restarts = stream_supervisor.stream_restarts
+    assert restarts.labels(stream="test", reason="error").value == 1
+    assert restarts.labels(stream="test", reason="stale").value >= 1
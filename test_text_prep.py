@@ -0,0 +1,30 @@
+import replay
+import text_prep
+from test_filtering import test_cases_accept
+
+
+def test_normalize_strips_markup_and_urls():
+    text = "**Need** a [speaking partner](https://example.com/x)!\n\n> see https://t.co/abc &amp; more\n- my_var"
+    assert text_prep.normalize(text) == "Need a speaking partner! see & more my_var"
+
+
+def test_chunks_stay_within_budget_and_overlap():
+    words = [f"word{i}" for i in range(1000)]
+    pieces = text_prep.chunks(" ".join(words), 100, max_chunks=4, overlap=10)
+    assert len(pieces) == 4
+    assert all(text_prep.estimate_tokens(piece) <= 100 for piece in pieces)
+    assert pieces[0].split()[-1] in pieces[1].split()
+    assert text_prep.truncate(" ".join(words), 100) == pieces[0]
+    assert text_prep.chunks("", 100) == [""]
+
+
+def test_long_post_is_scored_by_its_best_chunk(monkeypatch):
+    bot = replay.prepare_bot("english_main", replay.FakeCohereClient())
+    post = " ".join(["lorem ipsum dolor sit amet"] * 150) + " " + test_cases_accept[0]
+
+    monkeypatch.setattr(bot, "EMBED_MAX_CHUNKS", 1)
+    _, truncated, _, _ = bot.is_relevant_comment(post.lower())
+    monkeypatch.setattr(bot, "EMBED_MAX_CHUNKS", 4)
+    _, chunked, _, embedding = bot.is_relevant_comment(post.lower())
+    assert chunked > truncated
+    assert embedding.shape == (bot.cohere_client.dim,)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for the topic embedding artifact cache
+"""
+
+import numpy as np
+
+import topic_embeddings
+
+
+def test_artifact_is_reused_until_topics_change(tmp_path):
+    calls = []
+
+    def compute(topics):
+        calls.append(list(topics))
+        return np.arange(len(topics) * 4, dtype=np.float32).reshape(len(topics), 4)
+
+    topics = ["need speaking practice", "looking for conversation partner"]
+    first = topic_embeddings.get_topic_embeddings("embed-test", topics, compute, str(tmp_path))
+    second = topic_embeddings.get_topic_embeddings("embed-test", topics, compute, str(tmp_path))
+
+    assert len(calls) == 1
+    assert isinstance(second, np.memmap)
+    assert np.array_equal(first, second)
+
+    changed = topics + ["study buddy for English"]
+    third = topic_embeddings.get_topic_embeddings("embed-test", changed, compute, str(tmp_path))
+    assert len(calls) == 2
+    assert third.shape == (3, 4)
+
+
+def test_artifact_path_depends_on_model_and_topics():
+    topics = ["a", "b"]
+    assert topic_embeddings.artifact_path("m1", topics) != topic_embeddings.artifact_path("m2", topics)
+    assert topic_embeddings.artifact_path("m1", topics) != topic_embeddings.artifact_path("m1", ["b", "a"])
+
+
+def test_read_bot_settings_does_not_execute_bot():
+    settings = topic_embeddings.read_bot_settings("english_main.py")
+    assert settings["EMBED_PROVIDER"] == "cohere"
+    assert settings["EMBED_MODEL"] == "embed-english-v3.0"
+    assert "I need speaking practice" in settings["TARGET_TOPICS"]
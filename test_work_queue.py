@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable SQLite work queue
+"""
+
+import queue
+import pytest
+import corpus
+import checkpoints
+import work_queue
+from test_replay import _records
+
+
+def test_unacked_items_resume_after_restart_with_stages(tmp_path):
+    path = str(tmp_path / "work.db")
+    records = _records()[:3]
+    first = work_queue.DurableWorkQueue(path)
+    for record in records:
+        first.put(corpus.stub_from_record(record))
+    assert first.qsize() == 3
+
+    content_type, done = first.get(timeout=1)
+    first.task_done()
+    _, in_progress = first.get_nowait()
+    first.mark_stage(in_progress, 'llm', [True, "YES - reason"])
+    assert in_progress.pipeline_state == {'llm': [True, "YES - reason"]}
+    first.close()  # Crash: the second item was leased but never acknowledged
+
+    second = work_queue.DurableWorkQueue(path)
+    assert second.pending_fullnames() == [in_progress.fullname, "t3_p2"]
+    _, resumed = second.get(timeout=1)
+    assert resumed.fullname == in_progress.fullname
+    assert resumed.title == records[1]['title']
+    assert resumed.pipeline_state == {'llm': [True, "YES - reason"]}
+    second.task_done()
+    second.get_nowait()
+    second.task_done()
+    with pytest.raises(queue.Empty):
+        second.get(timeout=0.05)
+    assert second.qsize() == 0
+
+
+def test_expired_lease_is_redelivered(tmp_path):
+    path = str(tmp_path / "work.db")
+    producer = work_queue.DurableWorkQueue(path)
+    producer.put(corpus.stub_from_record(_records()[0]))
+    worker = work_queue.DurableWorkQueue(path, lease_seconds=0.0, reclaim=False)
+    first = worker.get_nowait()[1]
+    # The lease ran out without an ack, so another consumer gets the item again
+    other = work_queue.DurableWorkQueue(path, reclaim=False)
+    assert other.get_nowait()[1].fullname == first.fullname
+
+
+def test_marking_a_stage_renews_the_lease(tmp_path):
+    now = [1000.0]
+    path = str(tmp_path / "work.db")
+    worker = work_queue.DurableWorkQueue(path, lease_seconds=600, clock=lambda: now[0])
+    worker.put(corpus.stub_from_record(_records()[0]))
+    other = work_queue.DurableWorkQueue(path, reclaim=False, clock=lambda: now[0])
+    _, content = worker.get_nowait()
+    now[0] += 500
+    worker.mark_stage(content, 'llm', [True, "YES"])  # A slow item still in progress
+    now[0] += 500
+    with pytest.raises(queue.Empty):
+        other.get_nowait()
+
+
+def test_released_item_is_delivered_again_with_its_stages(tmp_path):
+    queue_ = work_queue.DurableWorkQueue(str(tmp_path / "work.db"))
+    queue_.put(corpus.stub_from_record(_records()[0]))
+    _, content = queue_.get(timeout=1)
+    queue_.mark_stage(content, 'lead')
+    queue_.release()  # Its lead could not be written
+
+    _, again = queue_.get_nowait()
+    assert again.fullname == content.fullname and again.pipeline_state == {'lead': True}
+    queue_.task_done()
+    assert queue_.qsize() == 0
+
+
+def test_resumed_items_hold_the_checkpoint_until_processed(tmp_path):
+    path = str(tmp_path / "work.db")
+    records = [dict(record, created_utc=1736935800.0 + i) for i, record in enumerate(_records()[:3])]
+    first = work_queue.DurableWorkQueue(path)
+    for record in records:
+        first.put(corpus.stub_from_record(record))
+    first.close()  # Crash with all three still queued
+
+    second = work_queue.DurableWorkQueue(path)
+    checkpoint = checkpoints.IngestionCheckpoint(str(tmp_path / "checkpoint.json"))
+    resumed = second.pending_items()
+    assert [(content_type, content.fullname) for content_type, content in resumed] == \
+        [('post', "t3_p0"), ('post', "t3_p1"), ('post', "t3_p2")]
+    for content_type, content in resumed:
+        assert checkpoint.claim(content.fullname)
+        checkpoint.enqueued(content_type, content)
+
+    # The newest item finishing first must not move the position past the two still queued
+    checkpoint.mark_processed('post', resumed[2][1])
+    assert checkpoint.positions['post'].get('englishlearning') is None
+    checkpoint.mark_processed('post', resumed[0][1])
+    assert checkpoint.positions['post']['englishlearning']['fullname'] == "t3_p0"
@@ -0,0 +1,84 @@
+"""
+Text Preparation
+Cleans post and comment text before it is embedded or put into an LLM prompt,
+and keeps it within a token budget so long posts don't inflate latency,
+payload size and token cost or run into model limits.
+
+    normalize(text)          markdown links -> their label, URLs and markdown
+                             syntax removed, HTML entities decoded, whitespace
+                             collapsed
+    truncate(text, n)        the first ~n tokens
+    chunks(text, n, k)       up to k consecutive ~n-token pieces, overlapping by
+                             `overlap` tokens, for max-sim pooling over a long post
+
+Token counts are estimated locally (about 4 characters per token, at least
+one per word) since the Cohere tokenizer is a network call; budgets should
+leave some headroom under the model's real limit.
+"""
+
+import re
+import html
+
+# Cohere embed models truncate inputs past 512 tokens
+DEFAULT_EMBED_TOKENS = 512
+
+_MARKDOWN_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_URL = re.compile(r"(?:https?://|www\.)\S+")
+_CODE_FENCE = re.compile(r"```|~~~")
+_LINE_MARKUP = re.compile(r"^\s*(?:#{1,6}|>+|[-*+]|\d+[.)])\s+", re.M)
+_INLINE_MARKUP = re.compile(r"\*\*|__|~~|`|(?<!\w)[*_](?=\S)|(?<=\S)[*_](?!\w)")
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\S+")
+
+
+def normalize(text):
+    """Plain single-spaced text without URLs or markdown syntax"""
+    text = html.unescape(text or "")
+    text = _MARKDOWN_LINK.sub(r"\1", text)
+    text = _URL.sub(" ", text)
+    text = _CODE_FENCE.sub(" ", text)
+    text = _LINE_MARKUP.sub("", text)
+    text = _INLINE_MARKUP.sub("", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def word_tokens(word):
+    """Estimated tokens in one whitespace-separated word"""
+    return max(1, (len(word) + 3) // 4)
+
+
+def estimate_tokens(text):
+    return sum(word_tokens(word) for word in _WORD.findall(text))
+
+
+def truncate(text, max_tokens):
+    """The longest run of leading words that fits in max_tokens"""
+    return chunks(text, max_tokens, max_chunks=1)[0]
+
+
+def chunks(text, max_tokens, max_chunks=1, overlap=32):
+    """
+    Consecutive pieces of at most max_tokens each, at word boundaries, with
+    `overlap` tokens repeated between neighbours; text past max_chunks pieces
+    is dropped. Always returns at least one (possibly empty) piece.
+    """
+    words = _WORD.findall(text)
+    pieces = []
+    start = 0
+    while start < len(words) and len(pieces) < max_chunks:
+        end = start
+        used = 0
+        while end < len(words) and (end == start or used + word_tokens(words[end]) <= max_tokens):
+            used += word_tokens(words[end])
+            end += 1
+        pieces.append(" ".join(words[start:end]))
+        if end >= len(words):
+            break
+        # Step back over up to `overlap` tokens so a sentence cut at a boundary appears whole in one piece
+        back = end
+        carried = 0
+        while back - 1 > start and carried + word_tokens(words[back - 1]) <= overlap:
+            back -= 1
+            carried += word_tokens(words[back])
+        start = back
+    return pieces or [""]
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Topic Embedding Artifacts
+Pre-computes the TARGET_TOPICS embedding matrix of each bot and stores it as a
+versioned .npy file keyed by embedding model name and a hash of the topic list.
+The bots memory-map the matching artifact at startup and only recompute the
+embeddings (and write a new artifact) when the topic list or model changes.
+
+Build the artifacts once after editing TARGET_TOPICS:
+python3 topic_embeddings.py english_main.py webindexer_main.py main.py
+"""
+
+import os
+import re
+import ast
+import json
+import hashlib
+import argparse
+from dotenv import load_dotenv
+import numpy as np
+
+# Load environment variables
+load_dotenv()
+
+ARTIFACT_DIR = os.environ.get("TOPIC_EMBEDDINGS_DIR", "topic_embeddings")
+ARTIFACT_VERSION = 1  # Bump when the on-disk layout changes
+
+
+def topic_list_hash(topics):
+    """Stable short hash of an ordered topic list"""
+    payload = json.dumps(list(topics), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def artifact_path(model_name, topics, artifact_dir=ARTIFACT_DIR):
+    """Path of the artifact for this model/topic-list combination"""
+    model_slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+    filename = f"v{ARTIFACT_VERSION}_{model_slug}_{topic_list_hash(topics)}.npy"
+    return os.path.join(artifact_dir, filename)
+
+
+def load_topic_embeddings(model_name, topics, artifact_dir=ARTIFACT_DIR):
+    """Memory-map a previously built artifact, or return None if there is none"""
+    path = artifact_path(model_name, topics, artifact_dir)
+    if not os.path.exists(path):
+        return None
+    embeddings = np.load(path, mmap_mode="r")
+    if embeddings.ndim != 2 or embeddings.shape[0] != len(topics):
+        print(f"⚠️ Ignoring malformed topic embedding artifact {path}")
+        return None
+    return embeddings
+
+
+def save_topic_embeddings(model_name, topics, embeddings, artifact_dir=ARTIFACT_DIR):
+    """Atomically write the artifact for this model/topic-list combination"""
+    path = artifact_path(model_name, topics, artifact_dir)
+    os.makedirs(artifact_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.asarray(embeddings, dtype=np.float32))
+    os.replace(tmp_path, path)
+    return path
+
+
+def get_topic_embeddings(model_name, topics, compute_fn, artifact_dir=ARTIFACT_DIR):
+    """
+    Return the topic embedding matrix, memory-mapped from the artifact when it
+    exists. Otherwise compute it with compute_fn(topics) and store the artifact
+    for the next launch.
+    """
+    embeddings = load_topic_embeddings(model_name, topics, artifact_dir)
+    if embeddings is not None:
+        print(f"📂 Loaded topic embeddings from {artifact_path(model_name, topics, artifact_dir)}")
+        return embeddings
+
+    print(f"🔄 No topic embedding artifact for {model_name}, computing {len(topics)} embeddings...")
+    embeddings = np.asarray(compute_fn(topics), dtype=np.float32)
+    try:
+        path = save_topic_embeddings(model_name, topics, embeddings, artifact_dir)
+        print(f"💾 Topic embeddings saved to {path}")
+    except OSError as e:
+        print(f"⚠️ Could not save topic embedding artifact: {e}")
+    return embeddings
+
+
+# ==== EMBEDDING PROVIDERS ====
+def cohere_embed_fn(client, model_name):
+    """Topic embedding function backed by the Cohere embed API"""
+    def embed(topics):
+        response = client.embed(
+            texts=list(topics),
+            model=model_name,
+            input_type='search_document'
+        )
+        return response.embeddings
+    return embed
+
+
+def sentence_transformers_embed_fn(model_name):
+    """Topic embedding function backed by a local SentenceTransformer model"""
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    return model.encode
+
+
+def read_bot_settings(bot_file):
+    """
+    Read TARGET_TOPICS, EMBED_MODEL and EMBED_PROVIDER from a bot script
+    without executing it (the bots connect to Reddit on import).
+    """
+    with open(bot_file, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=bot_file)
+
+    settings = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if isinstance(target, ast.Name) and target.id in ("TARGET_TOPICS", "EMBED_MODEL", "EMBED_PROVIDER"):
+                settings[target.id] = ast.literal_eval(node.value)
+
+    missing = {"TARGET_TOPICS", "EMBED_MODEL", "EMBED_PROVIDER"} - settings.keys()
+    if missing:
+        raise ValueError(f"{bot_file} does not define {', '.join(sorted(missing))}")
+    return settings
+
+
+def build_for_bot(bot_file, artifact_dir=ARTIFACT_DIR, force=False):
+    """Build (or verify) the topic embedding artifact for one bot script"""
+    settings = read_bot_settings(bot_file)
+    topics = settings["TARGET_TOPICS"]
+    model_name = settings["EMBED_MODEL"]
+    provider = settings["EMBED_PROVIDER"]
+    path = artifact_path(model_name, topics, artifact_dir)
+
+    if not force and load_topic_embeddings(model_name, topics, artifact_dir) is not None:
+        print(f"✅ {bot_file}: artifact up to date ({path})")
+        return path
+
+    if provider == "cohere":
+        import cohere
+        api_key = os.environ.get("COHERE_API_KEY", "")
+        if not api_key:
+            raise RuntimeError("COHERE_API_KEY is required to build Cohere topic embeddings")
+        compute_fn = cohere_embed_fn(cohere.Client(api_key), model_name)
+    elif provider == "sentence-transformers":
+        compute_fn = sentence_transformers_embed_fn(model_name)
+    else:
+        raise ValueError(f"Unknown EMBED_PROVIDER {provider!r} in {bot_file}")
+
+    embeddings = np.asarray(compute_fn(topics), dtype=np.float32)
+    save_topic_embeddings(model_name, topics, embeddings, artifact_dir)
+    print(f"💾 {bot_file}: built {embeddings.shape[0]}x{embeddings.shape[1]} topic embeddings ({path})")
+    return path
+
+
+def parse_args():
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(description="Build topic embedding artifacts for the bots")
+    parser.add_argument("bots", nargs="+", help="Bot scripts to build artifacts for (e.g. english_main.py)")
+    parser.add_argument("--artifact-dir", default=ARTIFACT_DIR, help="Directory to store .npy artifacts in")
+    parser.add_argument("--force", action="store_true", help="Recompute even if an artifact already exists")
+    return parser.parse_args()
+
+
+def main():
+    """Build artifacts for every bot given on the command line"""
+    args = parse_args()
+    failed = False
+    for bot_file in args.bots:
+        try:
+            build_for_bot(bot_file, args.artifact_dir, args.force)
+        except Exception as e:
+            print(f"⚠️ {bot_file}: {e}")
+            failed = True
+    if failed:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Verdict Log
+Every verdict the LLM itself gives, YES and NO, appended as one JSON line to
+<prefix>_llm_verdicts_YYYY-MM-DD.jsonl. Unlike the filtered-content files
+(SAVE_FILTERED_CONTENT, off by default) it is always written, so prescreen.py
+and similarity_thresholds.py always have negatives to learn from.
+
+Each line holds what the bot decided on, not a re-embedding of the text:
+
+    {"fullname": "t3_abc123", "subreddit": "EnglishLearning", "verdict": false,
+     "similarity_score": 0.61, "best_matching_topic": "...",
+     "embed_model": "embed-english-v3.0", "embedding": [0.0123, ...],
+     "weight": 1.0}
+
+embedding is the best-matching chunk's vector (the one the similarity gate
+and the pre-screen use), rounded to 4 decimals to keep lines small. Items
+the pre-screen decided locally never reach the LLM and are not logged.
+Worker processes pass a suffix so each appends to its own file.
+
+Items a gate filtered never reach the LLM either, so a log of only what
+passed would let calibration raise a threshold but never see what it cuts.
+The bots therefore send a small fixed share of those items to the LLM
+anyway (sampled()) and log them with "weight": 1 / rate, the number of
+items each one stands for; weighted, the log covers everything above the
+fixed similarity threshold. Lines without a weight count once.
+"""
+
+import os
+import glob
+import json
+import zlib
+import threading
+from datetime import datetime
+
+
+class VerdictLog:
+    def __init__(self, prefix, embed_model, directory=".", suffix=""):
+        self.prefix = prefix
+        self.embed_model = embed_model
+        self.directory = directory
+        self.suffix = suffix
+        self._day = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def path(self, day):
+        return os.path.join(self.directory, f"{self.prefix}_llm_verdicts_{day}{self.suffix}.jsonl")
+
+    def record(self, content, similarity_score, topic, embedding, verdict, weight=1.0):
+        """Append one LLM verdict with the embedding the bot decided on"""
+        line = json.dumps({
+            'fullname': content.fullname,
+            'subreddit': content.subreddit.display_name,
+            'verdict': bool(verdict),
+            'similarity_score': round(float(similarity_score), 6),
+            'best_matching_topic': topic,
+            'embed_model': self.embed_model,
+            'embedding': [round(float(value), 4) for value in embedding],
+            'weight': round(float(weight), 4),
+        })
+        day = datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            try:
+                if day != self._day:
+                    if self._file is not None:
+                        self._file.close()
+                    self._file = open(self.path(day), 'a', encoding='utf-8')
+                    self._day = day
+                self._file.write(line + "\n")
+                self._file.flush()
+            except OSError as e:
+                print(f"⚠️ Error logging LLM verdict: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._day = None
+
+
+def sampled(fullname, rate, salt=""):
+    """
+    True for a fixed share (rate) of items, decided by their fullname so a
+    redelivered item, or the same item on another worker, is sampled alike.
+    """
+    if rate <= 0:
+        return False
+    return zlib.crc32(f"{salt}:{fullname}".encode('utf-8')) % 10000 < rate * 10000
+
+
+def load_verdicts(prefix, directory=".", embed_model=None):
+    """Logged verdicts, oldest file first; only those from embed_model if given"""
+    verdicts = []
+    for path in sorted(glob.glob(os.path.join(directory, f"{prefix}_llm_verdicts_*.jsonl"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    verdict = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                if embed_model and verdict.get('embed_model') != embed_model:
+                    continue
+                verdicts.append(verdict)
+    return verdicts
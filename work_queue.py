@@ -0,0 +1,197 @@
+"""
+Work Queue
+Durable replacement for the in-memory content_queue (WORK_QUEUE_FILE). Queued
+items are stored in SQLite as corpus records, so a crash, deploy or OOM loses
+nothing that was ingested: after a restart every unacknowledged item is
+delivered again, highest content.priority first (see scheduling.py) and
+oldest first among equal priorities.
+
+Delivery is lease-based. get() leases the first available item for
+lease_seconds and returns it as a corpus stub; task_done() acknowledges
+(deletes) the oldest leased item, which is queue.Queue's protocol for a single
+consumer. An item whose lease runs out without an ack is delivered again, so
+delivery is at-least-once. Pipeline stages that must not run twice (an LLM
+verdict already paid for, a reply already sent) are recorded with
+mark_stage() while the item is leased and come back on a redelivered item as
+content.pipeline_state. Marking a stage also renews the item's lease, unless
+it already ran out and the item went to another consumer. release() hands the
+oldest leased item back unacknowledged, for a consumer that could not finish
+it (its lead did not reach the disk); it is delivered again. Consumers lease one
+item at a time as they process it: a batch leased up front can outlive its
+leases and be delivered to a second worker.
+
+The database runs in WAL mode with synchronous=NORMAL: each commit appends to
+the WAL without an fsync, which keeps enqueues in the tens of thousands per
+second and survives process crashes (a power loss can drop the last commits).
+"""
+
+import json
+import time
+import queue
+import sqlite3
+import threading
+from collections import deque
+import corpus
+
+
+class DurableWorkQueue:
+    def __init__(self, path, lease_seconds=600.0, reclaim=True, poll_interval=0.5, clock=time.time):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval  # Re-check for items from other writers or expired leases
+        self.clock = clock
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " fullname TEXT NOT NULL,"
+            " content_type TEXT NOT NULL,"
+            " record TEXT NOT NULL,"
+            " state TEXT NOT NULL DEFAULT '{}',"
+            " leased_until REAL NOT NULL DEFAULT 0,"
+            " deliveries INTEGER NOT NULL DEFAULT 0,"
+            " priority REAL NOT NULL DEFAULT 0)"
+        )
+        if 'priority' not in [row[1] for row in self._db.execute("PRAGMA table_info(items)")]:
+            self._db.execute("ALTER TABLE items ADD COLUMN priority REAL NOT NULL DEFAULT 0")  # Queue from an older version
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_order ON items (priority DESC, id)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS leads (username TEXT PRIMARY KEY, fullname TEXT NOT NULL, identified_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._leased = deque()  # (id, fullname) handed out by get(), acked in order by task_done()
+        self._leased_ids = {}   # fullname -> id, for mark_stage()
+        if reclaim:
+            # Sole consumer: whatever the previous run had leased is ours to redo now
+            self._db.execute("UPDATE items SET leased_until = 0")
+
+    def qsize(self):
+        """Items not yet acknowledged (waiting or in progress)"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def pending_fullnames(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT fullname FROM items ORDER BY id")]
+
+    def pending_items(self):
+        """Every unacknowledged item as (content_type, stub), oldest first"""
+        with self._lock:
+            rows = self._db.execute("SELECT record FROM items ORDER BY id").fetchall()
+        return [corpus.stub_from_record(json.loads(row[0])) for row in rows]
+
+    def put(self, item, block=True, timeout=None):
+        """Enqueue (content_type, content); block/timeout exist for queue.Queue compatibility"""
+        content_type, content = item
+        record = corpus.record_from_content(content, content_type)
+        record['ingested_at'] = getattr(content, 'ingested_at', None)  # Kept for freshness tracking
+        with self._available:
+            self._db.execute(
+                "INSERT INTO items (fullname, content_type, record, priority) VALUES (?, ?, ?, ?)",
+                (content.fullname, content_type, json.dumps(record), getattr(content, 'priority', 0.0)),
+            )
+            self._available.notify()
+
+    def get(self, block=True, timeout=None):
+        """Lease the first available item as (content_type, stub); raises queue.Empty"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while True:
+                item = self._lease()
+                if item is not None:
+                    return item
+                wait = self.poll_interval if deadline is None else min(self.poll_interval, deadline - time.monotonic())
+                if not block or wait <= 0:
+                    raise queue.Empty
+                self._available.wait(wait)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def _lease(self):
+        now = self.clock()
+        self._db.execute("BEGIN IMMEDIATE")  # Serialises leasing across processes sharing the file
+        try:
+            row = self._db.execute(
+                "SELECT id, content_type, record, state, priority, deliveries FROM items WHERE leased_until <= ? "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE items SET leased_until = ?, deliveries = deliveries + 1 WHERE id = ?",
+                    (now + self.lease_seconds, row[0]),
+                )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        item_id, content_type, record, state, priority, deliveries = row
+        record = json.loads(record)
+        content_type, content = corpus.stub_from_record(record)
+        content.pipeline_state = json.loads(state)
+        content.ingested_at = record.get('ingested_at')
+        content.priority = priority
+        self._leased.append((item_id, content.fullname))
+        self._leased_ids[content.fullname] = (item_id, deliveries + 1)
+        return content_type, content
+
+    def mark_stage(self, content, stage, value=True):
+        """Record a finished pipeline stage of a leased item and renew its lease"""
+        state = dict(getattr(content, 'pipeline_state', {}))
+        state[stage] = value
+        content.pipeline_state = state
+        with self._lock:
+            leased = self._leased_ids.get(content.fullname)
+            if leased is not None:
+                # deliveries still matching means no other consumer has leased it since
+                self._db.execute(
+                    "UPDATE items SET state = ?, leased_until = ? WHERE id = ? AND deliveries = ?",
+                    (json.dumps(state), self.clock() + self.lease_seconds, *leased),
+                )
+
+    def claim_lead(self, username, fullname, ttl_seconds):
+        """
+        True if no consumer of this queue reported username within ttl_seconds,
+        or the earlier claim was for this same item (a redelivery); records the claim.
+        """
+        now = self.clock()
+        with self._lock:
+            claimed = self._db.execute(
+                "INSERT INTO leads (username, fullname, identified_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET fullname = excluded.fullname, identified_at = excluded.identified_at "
+                "WHERE leads.identified_at <= ?",
+                (username, fullname, now, now - ttl_seconds),
+            ).rowcount == 1
+            if not claimed:
+                row = self._db.execute("SELECT fullname FROM leads WHERE username = ?", (username,)).fetchone()
+                claimed = row is not None and row[0] == fullname
+            return claimed
+
+    def task_done(self):
+        """Acknowledge the oldest leased item; it will not be delivered again"""
+        with self._lock:
+            item_id, fullname = self._leased.popleft()
+            if self._leased_ids.get(fullname, (None,))[0] == item_id:
+                del self._leased_ids[fullname]
+            self._db.execute("DELETE FROM items WHERE id = ?", (item_id,))
+
+    def release(self):
+        """Give the oldest leased item back without acknowledging it; it is delivered again"""
+        with self._lock:
+            item_id, fullname = self._leased.popleft()
+            leased = self._leased_ids.get(fullname)
+            if leased is not None and leased[0] == item_id:
+                del self._leased_ids[fullname]
+                # Unless the lease already ran out and another consumer has the item
+                self._db.execute("UPDATE items SET leased_until = 0 WHERE id = ? AND deliveries = ?", leased)
+            self._available.notify()
+
+    def close(self):
+        with self._lock:
+            self._db.close()